@@ -0,0 +1,394 @@
+"""
+MMA 吞吐基准：扫描 K/N/M、lhs 位宽（S8/S16）与量化模式，固件用 mcycle 统计 dsa_matmul_execute() 的周期数
+
+用法: python3 bench_mma.py [-j N] [--sizes 16 64 256 | --shapes 16x32x64 ...] [--dtypes s8 s16]
+                           [--quant per-tensor per-channel] [--out-dir DIR]
+                           [--baseline PATH [--tolerance 0.05]] [--save-baseline PATH]
+                           [--chain L [--chain-mode M] | --strided] [--placements SPEC ... | all]
+每个扫描点由 generate_test_case_complex.py 生成一个单用例存档，按 run_tests.py 的流程（-j 并行）编译仿真，
+从日志中的 "[PERF <i>] cycles=<n>" 行取周期数，写出 bench.csv / bench.json（周期、MACs/cycle、总线字节数，
+按 mma_perf_model.bus_bytes() 计，与周期模型的 read_beats / write_beats 一致）。
+给出 --baseline 时逐点与基线比较，周期数超过基线 (1 + tolerance) 倍即判定为性能回退，返回非零。
+
+--chain L [--chain-mode dependent|independent]：每个扫描点改为 L 层连续矩阵乘法（generate_test_case.py --chain，
+S8 per-tensor），固件先逐条执行再连续发射，报告逐条周期数（call_cycles）、两种方式的总周期数与
+overlap = 1 - pipelined / serial，即 ping-pong 缓冲隐藏掉的配置与写回延迟所占比例；cycles 取连续发射的总周期数。
+
+--strided：每个扫描点的同一组数据再以随机行填充与字节偏移放置一次（test_case_layout.py，键名带 "-strided"），
+报告该布局的步长/偏移、稠密布局的周期数 dense_cycles 与 penalty = cycles / dense_cycles - 1，即子视图张量的额外开销。
+
+--placements SPEC [SPEC ...] | all：每个扫描点按各放置方式（test_case_place.py，如 "lhs=ilm,dst=ram"，all 为四个
+操作数在 ILM / DTCM / 外部 RAM 上的 81 种组合）各仿真一次，键名带 "@<放置方式>"，报告 place 与相对同一扫描点
+最快放置方式的 slowdown = cycles / best_cycles - 1，并在日志中给出每个扫描点最快与最慢的放置方式。
+
+仿真前按链接脚本 MEMORY 块的区域长度估计每个扫描点（及放置方式）在 ILM / DTCM / 外部 RAM 上的占用
+（test_case_place.footprint()），放不下的点不仿真，在日志与 bench.json 的 "skipped" 中列出原因，不计为失败。
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+
+from generate_test_case import generate_chain
+from generate_test_case_complex import generate_case
+from mma_perf_model import DTYPES, QUANT_MODES, bus_bytes, parse_shape
+from run_tests import (LINKER_SCRIPT, MAX_FAIL_LINES, SIM_ROOT_DIR, SPLIT_MEMORY, TIMEOUT_SECONDS,
+                       firmware_lines, iterate_results, log_message, prepare_campaign)
+from test_case_archive import ARCHIVE_SUFFIX, save_case_archive, seed_generators
+from test_case_layout import LAYOUT_KEYS, case_layout, is_strided, random_layout
+from test_case_place import all_placements, footprint, format_placement, overflow_regions, parse_placement
+
+# split_memory.py 不在包内，按 run_tests.py 调用的同一路径导入其链接脚本解析
+sys.path.insert(0, os.path.dirname(SPLIT_MEMORY))
+from split_memory import load_ld_regions  # noqa: E402
+
+GENERATOR = "generate_test_case_complex.py"
+CHAIN_GENERATOR = "generate_test_case.py"
+OUT_DIR = os.path.join(SIM_ROOT_DIR, "bench_results")
+DEFAULT_SIZES = [16, 32, 64, 128, 256]
+DEFAULT_TOLERANCE = 0.05
+
+# 固件在 dsa_matmul_execute() 前后读取 mcycle，逐用例输出一行
+PERF_RE = re.compile(r'^\[PERF (\d+)\] cycles=(\d+)')
+# --chain：逐条执行与连续发射各输出一行总周期数
+CHAIN_RE = re.compile(r'^\[CHAIN (serial|pipelined)\] calls=(\d+) cycles=(\d+)')
+
+CSV_FIELDS = ['key', 'K', 'N', 'M', 'lhs_dtype', 'quant_mode', 'result', 'cycles',
+              'macs', 'macs_per_cycle', 'bytes', 'bytes_per_cycle']
+CHAIN_FIELDS = ['chain', 'call_cycles', 'serial_cycles', 'pipelined_cycles', 'overlap']
+STRIDED_FIELDS = list(LAYOUT_KEYS) + ['dense_cycles', 'penalty']
+STRIDED_SUFFIX = "-strided"
+PLACE_FIELDS = ['place', 'best_cycles', 'slowdown']
+
+
+def point_key(K, N, M, lhs_dtype, quant_mode):
+    dtype = next(name for name, value in DTYPES.items() if value == lhs_dtype)
+    quant = next(name for name, value in QUANT_MODES.items() if value == quant_mode)
+    return f"{K}x{N}x{M}-{dtype}-{quant}"
+
+
+def chain_key(K, N, M, length, mode):
+    return f"{K}x{N}x{M}-chain{length}-{mode}"
+
+
+def sweep_points(args):
+    shapes = args.shapes or [(s, s, s) for s in args.sizes]
+    if args.chain:
+        return [(K, N, M, DTYPES['s8'], QUANT_MODES['per-tensor']) for K, N, M in shapes]
+    return [(K, N, M, DTYPES[d], QUANT_MODES[q]) for K, N, M in shapes for d in args.dtypes for q in args.quant]
+
+
+def read_cycles(log_path):
+    """返回日志中第一个用例的周期数，未找到 PERF 行时返回 None"""
+    if not os.path.exists(log_path):
+        return None
+    with open(log_path, encoding='utf-8', errors='replace') as f:
+        for line in firmware_lines(f):
+            match = PERF_RE.match(line)
+            if match:
+                return int(match.group(2))
+    return None
+
+
+def read_chain_cycles(log_path):
+    """返回 (逐条执行时各条的周期数列表, {'serial': n, 'pipelined': n})，未找到的项为空"""
+    calls, totals = [], {}
+    if not os.path.exists(log_path):
+        return calls, totals
+    with open(log_path, encoding='utf-8', errors='replace') as f:
+        for line in firmware_lines(f):
+            match = PERF_RE.match(line)
+            if match and 'serial' not in totals:
+                calls.append(int(match.group(2)))
+            match = CHAIN_RE.match(line)
+            if match:
+                totals[match.group(1)] = int(match.group(3))
+    return calls, totals
+
+
+def entry_key(point, cases, place):
+    """报告行的键：扫描点，--placements 时带 "@<放置方式>"，跨步布局带 STRIDED_SUFFIX"""
+    key = point_key(*point)
+    if place:
+        key += f"@{place}"
+    if is_strided(cases[0]):
+        key += STRIDED_SUFFIX
+    return key
+
+
+def region_lengths():
+    """链接脚本 MEMORY 块中各区域的长度，与 run_tests.py 改写镜像时使用同一链接脚本"""
+    return {name: region['size'] for name, region in load_ld_regions(LINKER_SCRIPT).items()}
+
+
+def chain_row(row, layers, mode, log_path):
+    """把链的各层尺寸、逐条周期数与两种方式的总周期数填入报告行"""
+    calls, totals = read_chain_cycles(log_path)
+    serial, pipelined = totals.get('serial'), totals.get('pipelined')
+    row['key'] = chain_key(row['K'], row['N'], row['M'], len(layers), mode)
+    row['chain'] = f"{len(layers)}-{mode}"
+    row['call_cycles'] = ' '.join(str(c) for c in calls)
+    row['serial_cycles'] = serial
+    row['pipelined_cycles'] = pipelined
+    row['overlap'] = round(1 - pipelined / serial, 4) if serial and pipelined else None
+    row['cycles'] = pipelined
+    row['macs'] = sum(layer['K'] * layer['N'] * layer['M'] for layer in layers)
+    row['bytes'] = sum(bus_bytes(K=layer['K'], N=layer['N'], M=layer['M']) for layer in layers)
+    for key, total in (('macs_per_cycle', row['macs']), ('bytes_per_cycle', row['bytes'])):
+        row[key] = round(total / pipelined, 4) if pipelined else None
+    return row
+
+
+def strided_penalty(rows, run_log):
+    """--strided 的点与同一扫描点的稠密布局比较周期数"""
+    dense = {row['key']: row for row in rows}
+    for row in rows:
+        if not row['key'].endswith(STRIDED_SUFFIX):
+            continue
+        base = dense.get(row['key'][:-len(STRIDED_SUFFIX)])
+        row['dense_cycles'] = base['cycles'] if base else None
+        row['penalty'] = None
+        if row['dense_cycles'] and row['cycles']:
+            row['penalty'] = round(row['cycles'] / row['dense_cycles'] - 1, 4)
+        log_message(run_log, f"{row['key']}: stride {row['lhs_stride']}/{row['rhs_stride']}/{row['dst_stride']} B, "
+                             f"offset {row['lhs_offset']}/{row['rhs_offset']}/{row['dst_offset']} B (lhs/rhs/dst), "
+                             f"{row['dense_cycles']} -> {row['cycles']} 周期, penalty={row['penalty']}")
+
+
+def parse_placements(specs):
+    """--placements 的参数 -> 放置方式列表，"all" 展开为全部组合"""
+    if specs == ["all"]:
+        return all_placements()
+    placements = []
+    for spec in specs:
+        try:
+            placements.append(parse_placement(spec))
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e))
+    return placements
+
+
+def placement_spread(rows, run_log):
+    """同一扫描点（含布局）的各放置方式与其中最快的一种比较周期数"""
+    groups = {}
+    for row in rows:
+        base, _, rest = row['key'].partition('@')
+        groups.setdefault(base + rest[len(row['place']):], []).append(row)
+    for key, group in groups.items():
+        timed = sorted((row for row in group if row['cycles']), key=lambda row: row['cycles'])
+        best = timed[0]['cycles'] if timed else None
+        for row in group:
+            row['best_cycles'] = best
+            row['slowdown'] = round(row['cycles'] / best - 1, 4) if best and row['cycles'] else None
+        if timed:
+            log_message(run_log, f"{key}: 最快 {timed[0]['place']} {timed[0]['cycles']} 周期，"
+                                 f"最慢 {timed[-1]['place']} {timed[-1]['cycles']} 周期 "
+                                 f"(+{timed[-1]['slowdown'] * 100:.1f}%)")
+
+
+def run_sweep(args, points, out_dir, run_log):
+    """
+    为每个扫描点写单用例（--chain 时为一条链，--strided 时另加一个跨步布局）存档并仿真，
+    返回 (报告行列表, [{'key', 'reason'}] 放不下而跳过的点)。给出 --placements 时每个布局再按各放置方式各写一个存档
+    """
+    campaign = {
+        'generator': CHAIN_GENERATOR if args.chain else GENERATOR,
+        'log_dir': out_dir,
+        'exception_dir': out_dir,
+        'iterations': 0,
+        'timeout': TIMEOUT_SECONDS,
+        'data_only': False,
+        'batch': 1,
+        'bin': False,
+        'strided': False,
+        'dump_dst': False,
+        'max_fail_lines': MAX_FAIL_LINES,
+        'heartbeat': True,
+        'screen': False,
+        'seed': args.seed,
+        'archives': {},
+    }
+    seed_generators(args.seed)
+    placements = [format_placement(place) for place in args.placements] if args.placements else [None]
+    entries = []  # [(扫描点, 存档中的用例, 放置方式)]
+    for point in points:
+        K, N, M, lhs_dtype, quant_mode = point
+        if args.chain:
+            entries.append((point, generate_chain(args.chain, args.chain_mode == "dependent", dims=(K, N, M)), None))
+            continue
+        case = generate_case(dims=(K, N, M), lhs_dtype=lhs_dtype, quant_mode=quant_mode)
+        layouts = [case, dict(case, **random_layout(case))] if args.strided else [case]
+        entries += [(point, [layout], place) for layout in layouts for place in placements]
+
+    # 单用例的初始化数组在 .data（DTCM，初值在 ILM），链在 .test_case_data（外部 RAM）且每层各有输出缓冲区
+    lengths = region_lengths()
+    fitting, skipped = [], []
+    for point, cases, place in entries:
+        usage = footprint(cases, 'extram' if args.chain else 'ram', parse_placement(place) if place else None,
+                          shared_dst=not args.chain)
+        errors = overflow_regions(usage, lengths)
+        if errors:
+            skipped.append({'key': entry_key(point, cases, place), 'reason': '; '.join(errors)})
+            log_message(run_log, f"{skipped[-1]['key']}: 跳过，{skipped[-1]['reason']}")
+        else:
+            fitting.append((point, cases, place))
+    entries = fitting
+
+    campaign['iterations'] = len(entries)
+    for i, (point, cases, place) in enumerate(entries, start=1):
+        path = os.path.join(out_dir, f"point_{i}{ARCHIVE_SUFFIX}")
+        if args.chain:
+            save_case_archive(path, cases, {'generator': CHAIN_GENERATOR, 'seed': args.seed,
+                                            'batch': args.chain, 'reserve': False, 'bin': False,
+                                            'min_dim': 1, 'chain': args.chain_mode})
+        else:
+            save_case_archive(path, cases, {'generator': GENERATOR, 'seed': args.seed, 'batch': 1,
+                                            'reserve': False, 'bin': False, 'min_dim': 1, 'place': place})
+        campaign['archives'][i] = path
+
+    rows = []
+    for i, result, _ in iterate_results(campaign, args.jobs, run_log):
+        (K, N, M, lhs_dtype, quant_mode), cases, place = entries[i - 1]
+        cycles = read_cycles(os.path.join(out_dir, f"log_{i}.txt"))
+        macs = K * N * M
+        # 与 mma_perf_model.features() 的 read_beats / write_beats 同一口径（跨步布局按实际步长与偏移计）
+        moved = bus_bytes(K=K, N=N, M=M, lhs_dtype=lhs_dtype, quant_mode=quant_mode, **case_layout(cases[0]))
+        row = {
+            'key': entry_key((K, N, M, lhs_dtype, quant_mode), cases, place),
+            'K': K, 'N': N, 'M': M, 'lhs_dtype': lhs_dtype, 'quant_mode': quant_mode,
+            'result': result, 'cycles': cycles, 'macs': macs,
+            'macs_per_cycle': round(macs / cycles, 4) if cycles else None,
+            'bytes': moved,
+            'bytes_per_cycle': round(moved / cycles, 4) if cycles else None,
+        }
+        if place:
+            row['place'] = place
+        if is_strided(cases[0]):
+            row.update(case_layout(cases[0]))
+        if args.chain:
+            chain_row(row, cases, args.chain_mode, os.path.join(out_dir, f"log_{i}.txt"))
+            log_message(run_log, f"{row['key']}: {result}, serial={row['serial_cycles']}, "
+                                 f"pipelined={row['pipelined_cycles']}, overlap={row['overlap']}, "
+                                 f"calls=[{row['call_cycles']}]")
+        else:
+            log_message(run_log, f"{row['key']}: {result}, cycles={cycles}, MACs/cycle={row['macs_per_cycle']}")
+        rows.append(row)
+    if args.strided:
+        strided_penalty(rows, run_log)
+    if args.placements:
+        placement_spread(rows, run_log)
+    return rows, skipped
+
+
+def write_report(rows, skipped, out_dir):
+    csv_path = os.path.join(out_dir, "bench.csv")
+    fields = CSV_FIELDS + (CHAIN_FIELDS if rows and 'chain' in rows[0] else [])
+    if any(row['key'].endswith(STRIDED_SUFFIX) for row in rows):
+        fields += STRIDED_FIELDS
+    if any('place' in row for row in rows):
+        fields += PLACE_FIELDS
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    json_path = os.path.join(out_dir, "bench.json")
+    with open(json_path, 'w') as f:
+        json.dump({'points': rows, 'skipped': skipped}, f, indent=2)
+    return csv_path, json_path
+
+
+def compare_baseline(rows, baseline_path, tolerance, run_log):
+    """逐点比较周期数，返回回退的点数；基线中没有的点只提示"""
+    with open(baseline_path) as f:
+        baseline = {row['key']: row for row in json.load(f)['points']}
+    regressions = 0
+    for row in rows:
+        base = baseline.get(row['key'])
+        if base is None or not base.get('cycles'):
+            log_message(run_log, f"[BASELINE] {row['key']}: 基线中没有该点")
+            continue
+        if not row['cycles']:
+            regressions += 1
+            log_message(run_log, f"[REGRESSION] {row['key']}: 未得到周期数（{row['result']}）")
+            continue
+        ratio = row['cycles'] / base['cycles']
+        if ratio > 1 + tolerance:
+            regressions += 1
+            log_message(run_log, f"[REGRESSION] {row['key']}: {base['cycles']} -> {row['cycles']} 周期 "
+                                 f"(+{(ratio - 1) * 100:.1f}%，阈值 {tolerance * 100:.1f}%)")
+        elif ratio < 1 - tolerance:
+            log_message(run_log, f"[IMPROVED] {row['key']}: {base['cycles']} -> {row['cycles']} 周期")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MMA 吞吐基准（mcycle 周期数）")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="并行 worker 数（默认 1，串行）")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="方阵尺寸列表 (K = N = M)")
+    group.add_argument("--shapes", type=parse_shape, nargs="+", metavar="KxNxM", help="任意形状列表")
+    parser.add_argument("--dtypes", nargs="+", choices=sorted(DTYPES), default=sorted(DTYPES), help="lhs 位宽")
+    parser.add_argument("--quant", nargs="+", choices=list(QUANT_MODES), default=list(QUANT_MODES),
+                        help="量化模式")
+    parser.add_argument("--seed", type=int, default=0, help="用例数据的随机种子")
+    parser.add_argument("--out-dir", default=OUT_DIR, help="报告、日志与用例存档的输出目录")
+    parser.add_argument("--baseline", metavar="PATH", help="与此前保存的 bench.json 比较")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"允许的周期数增长比例（默认 {DEFAULT_TOLERANCE}）")
+    parser.add_argument("--save-baseline", metavar="PATH", help="把本次结果另存为基线")
+    parser.add_argument("--chain", type=int, metavar="L",
+                        help="每个扫描点为 L 层连续矩阵乘法（S8 per-tensor），比较逐条执行与连续发射的周期数")
+    parser.add_argument("--chain-mode", choices=("dependent", "independent"), default="dependent",
+                        help="dependent：上一层输出作为下一层 lhs（默认）；independent：各层数据独立")
+    parser.add_argument("--strided", action="store_true",
+                        help="每个扫描点另以随机行填充与字节偏移的布局仿真一次，报告相对稠密布局的周期开销")
+    parser.add_argument("--placements", nargs="+", metavar="SPEC",
+                        help='按各放置方式（如 "lhs=ilm,rhs=extram,dst=ram"，或 all 表示全部 81 种组合）'
+                             '分别仿真每个扫描点，报告相对最快放置方式的周期开销')
+    parser.add_argument("--rebuild-model", action="store_true", help="忽略模型哈希，强制重新编译 Verilator 模型")
+    args = parser.parse_args()
+    if args.chain is not None and args.chain < 1:
+        parser.error("--chain 必须 >= 1")
+    if args.chain and args.strided:
+        parser.error("--chain 不能与 --strided 同时使用")
+    if args.placements:
+        if args.chain:
+            parser.error("--chain 不能与 --placements 同时使用")
+        try:
+            args.placements = parse_placements(args.placements)
+        except argparse.ArgumentTypeError as e:
+            parser.error(str(e))
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    points = sweep_points(args)
+    with open(os.path.join(args.out_dir, "run_log.txt"), 'w', encoding='utf-8') as run_log:
+        if not prepare_campaign(run_log, rebuild_model=args.rebuild_model):
+            return 1
+        rows, skipped = run_sweep(args, points, args.out_dir, run_log)
+        csv_path, json_path = write_report(rows, skipped, args.out_dir)
+        log_message(run_log, f"报告: {csv_path}, {json_path}")
+        if skipped:
+            log_message(run_log, f"{len(skipped)} 个扫描点放不下，已跳过（不计为失败）")
+
+        status = 0
+        failed = [row['key'] for row in rows if row['result'] != "pass"]
+        if failed:
+            log_message(run_log, f"{len(failed)} 个扫描点未通过: {', '.join(failed)}")
+            status = 1
+        if args.baseline:
+            regressions = compare_baseline(rows, args.baseline, args.tolerance, run_log)
+            log_message(run_log, f"基线比较: {regressions} 个点性能回退")
+            if regressions:
+                status = 1
+        if args.save_baseline:
+            with open(args.save_baseline, 'w') as f:
+                json.dump({'points': rows}, f, indent=2)
+            log_message(run_log, f"基线已保存: {args.save_baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
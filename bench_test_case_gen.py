@@ -0,0 +1,81 @@
+"""
+测试用例生成器微基准：对比逐元素写入（原实现）与 c_array 整数组格式化的耗时
+
+用法: python3 bench_test_case_gen.py [--complex] [--sizes 32 64 128 256] [--legacy-max 256]
+每个尺寸使用 K = N = M = size 的方阵，并校验两种实现输出的 test_case.c 完全一致。
+原实现在循环内对整个矩阵做 flatten()，耗时随元素数平方增长，可用 --legacy-max 限制其运行的最大尺寸。
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import generate_test_case
+import generate_test_case_complex
+
+
+def legacy_write_array(f, declaration, array, per_line, order='C'):
+    """原实现：逐元素 flatten + 写入"""
+    count = array.size
+    f.write(declaration + ' = {\n')
+    for i in range(count):
+        f.write(f'  {int(array.flatten(order=order)[i])}')
+        if i < count - 1:
+            f.write(',')
+        if (i + 1) % per_line == 0:
+            f.write('\n')
+        else:
+            f.write(' ')
+    f.write('};\n\n')
+
+
+def legacy_write_c_file(gen, case, c_path):
+    """用原实现替换 c_array.write_c_array 后生成 test_case.c"""
+    saved = gen.write_c_array
+    gen.write_c_array = legacy_write_array
+    try:
+        gen.write_c_file(case, c_path)
+    finally:
+        gen.write_c_array = saved
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测试用例生成器 C 数组输出微基准")
+    parser.add_argument("--complex", action="store_true", help="使用 generate_test_case_complex.py")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[32, 64, 128, 192, 256], help="方阵尺寸列表")
+    parser.add_argument("--legacy-max", type=int, default=256, help="原实现只在尺寸不超过该值时运行")
+    args = parser.parse_args()
+
+    gen = generate_test_case_complex if args.complex else generate_test_case
+    np.random.seed(0)
+
+    print(f"{'size':>6} {'elements':>10} {'legacy (s)':>12} {'c_array (s)':>12} {'speedup':>9}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        new_path = os.path.join(tmp_dir, "new.c")
+        old_path = os.path.join(tmp_dir, "old.c")
+        for size in args.sizes:
+            case = gen.generate_case(dims=(size, size, size))
+            elements = 3 * size * size + size
+            new_time = time_call(gen.write_c_file, case, new_path)
+
+            if size <= args.legacy_max:
+                old_time = time_call(legacy_write_c_file, gen, case, old_path)
+                with open(new_path) as f_new, open(old_path) as f_old:
+                    if f_new.read() != f_old.read():
+                        raise SystemExit(f"输出不一致 (size={size})")
+                print(f"{size:>6} {elements:>10} {old_time:>12.4f} {new_time:>12.4f} {old_time / new_time:>8.1f}x")
+            else:
+                print(f"{size:>6} {elements:>10} {'-':>12} {new_time:>12.4f} {'-':>9}")
+
+
+if __name__ == "__main__":
+    main()
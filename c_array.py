@@ -0,0 +1,26 @@
+"""
+C 数组初始化列表格式化 - 供 generate_test_case.py / generate_test_case_complex.py 共用
+
+整个数组一次性格式化为字符串（tolist + join，线性时间），每个数组只调用一次 write。
+输出格式与原先逐元素写入完全一致：
+  每行以两个空格开头，同一行的元素之间为逗号加三个空格，每 per_line 个元素后以逗号换行；
+  最后一个元素后无逗号，最后一行满 per_line 个元素时以换行结束，否则以一个空格结束。
+"""
+
+import numpy as np
+
+
+def format_c_array(array, per_line, order='C'):
+    """把数组按 order 展平后格式化为 C 初始化列表的内容（不含花括号）"""
+    values = np.asarray(array).ravel(order=order).tolist()
+    if not values:
+        return ''
+    tokens = [str(int(v)) for v in values]
+    rows = ['  ' + ',   '.join(tokens[i:i + per_line]) for i in range(0, len(tokens), per_line)]
+    tail = '\n' if len(tokens) % per_line == 0 else ' '
+    return ',\n'.join(rows) + tail
+
+
+def write_c_array(f, declaration, array, per_line, order='C'):
+    """写入完整的数组定义：declaration = { ... };"""
+    f.write(declaration + ' = {\n' + format_c_array(array, per_line, order) + '};\n\n')
@@ -1,8 +1,12 @@
 #include "Vtb_top.h"
+#include "Vtb_top__Dpi.h"
 #include "verilated.h"
 #include "verilated_vcd_c.h"
+#include <fstream>
 #include <iostream>
+#include <iterator>
 #include <string>
+#include <vector>
 
 #ifdef JTAGVPI
 #include "jtagServer.h"
@@ -10,8 +14,64 @@
 
 vluint64_t tick = 0;
 
+// +mem_bin: 直接装载 split_memory.py --bin 生成的 <itcm_init>_{ilm,ram,extram}.bin，
+// tb_top.v 通过 DPI 按字读取，跳过 $readmemh 文本解析和逐字节拷贝
+static const char *mem_bin_regions[] = {"ilm", "ram", "extram"};
+static std::vector<unsigned char> mem_bin_data[3];
+static int mem_bin_ok = 0;
+
+static void load_mem_bins(int argc, char **argv)
+{
+    std::string prefix;
+    int enable = 0;
+    for (int i = 0; i < argc; i++)
+    {
+        if (strcmp(argv[i], "+mem_bin") == 0)
+            enable = 1;
+        if (strncmp(argv[i], "+itcm_init=", 11) == 0)
+            prefix = argv[i] + 11;
+    }
+    if (!enable || prefix.empty())
+        return;
+
+    for (int r = 0; r < 3; r++)
+    {
+        std::string path = prefix + "_" + mem_bin_regions[r] + ".bin";
+        std::ifstream f(path, std::ios::binary);
+        if (!f)
+        {
+            std::cout << "mem_bin: " << path << " not found, fall back to $readmemh\n";
+            return;
+        }
+        mem_bin_data[r].assign(std::istreambuf_iterator<char>(f), std::istreambuf_iterator<char>());
+    }
+    mem_bin_ok = 1;
+    std::cout << "mem_bin: loaded " << prefix << "_{ilm,ram,extram}.bin\n";
+}
+
+int tb_mem_bin_loaded()
+{
+    return mem_bin_ok;
+}
+
+// 返回区域 region 第 index 个字（bytes 字节，小端），超出镜像部分为 0
+long long tb_mem_bin_word(int region, int index, int bytes)
+{
+    const std::vector<unsigned char> &data = mem_bin_data[region];
+    size_t base = (size_t)index * bytes;
+    unsigned long long word = 0;
+    for (int b = bytes - 1; b >= 0; b--)
+    {
+        word <<= 8;
+        if (base + b < data.size())
+            word |= data[base + b];
+    }
+    return (long long)word;
+}
+
 int main(int argc, char **argv) {
     Verilated::commandArgs(argc, argv);
+    load_mem_bins(argc, argv);
     Vtb_top *soc = new Vtb_top;
 
     // check if trace is enabled
@@ -152,6 +152,92 @@ module tb_top #(
   end
 
 
+  // +heartbeat=<cycles>: 每隔 N 个周期输出一次心跳（周期数与已执行指令数），
+  // run_tests.py 据此区分仿真卡死与慢速推进；未指定时不输出
+  integer heartbeat_interval;
+  reg [31:0] heartbeat_cnt;
+  initial begin
+      heartbeat_interval = 0;
+      if ($value$plusargs("heartbeat=%d", heartbeat_interval)) begin
+          $display("heartbeat every %0d cycles", heartbeat_interval);
+      end
+  end
+
+  always @(posedge clk or negedge rst_n)
+  begin
+    if(rst_n == 1'b0) begin
+        heartbeat_cnt <= 32'b0;
+    end
+    else if (heartbeat_interval > 0) begin
+        if (heartbeat_cnt >= heartbeat_interval - 1) begin
+            heartbeat_cnt <= 32'b0;
+            $display("[HEARTBEAT] cycle=%0d instret=%0d", cycle_count, valid_ir_cycle);
+            $fflush();
+        end
+        else begin
+            heartbeat_cnt <= heartbeat_cnt + 1'b1;
+        end
+    end
+  end
+
+
+  // +dump_pc=<hex> +dump_addr=<hex> +dump_len=<bytes> +dump_file=<path>：每当 dump_pc（固件 tb_dump_dst() 入口）
+  // 提交，把 [dump_addr, dump_addr + dump_len) 的内容以十六进制写为 dump_file 的一行；
+  // 地址与长度由 run_tests.py --dump-dst 从 ELF 符号表读取，主机据此比较输出，固件不再逐元素比较
+  `define MEM_ILM_BASE    32'h80000000
+  `define MEM_RAM_BASE    32'h90000000
+  `define MEM_EXTRAM_BASE 32'h00080000
+
+  reg [31:0] mem_dump_pc;
+  reg [31:0] mem_dump_addr;
+  integer mem_dump_len;
+  integer mem_dump_fd;
+  integer mem_dump_i;
+  reg [8*300:1] mem_dump_file;
+  initial begin
+      mem_dump_fd = 0;
+      if ($value$plusargs("dump_pc=%h", mem_dump_pc) && $value$plusargs("dump_addr=%h", mem_dump_addr)
+          && $value$plusargs("dump_len=%d", mem_dump_len) && $value$plusargs("dump_file=%s", mem_dump_file)) begin
+          mem_dump_fd = $fopen(mem_dump_file, "w");
+          $display("dump %0d bytes @%h at pc %h to %0s", mem_dump_len, mem_dump_addr, mem_dump_pc, mem_dump_file);
+      end
+  end
+
+  // 按字节读取 ITCM（64 位字）、DTCM 与外部 RAM（32 位字）
+  function [7:0] mem_byte(input [31:0] addr);
+      reg [63:0] word;
+      begin
+          if (addr >= `MEM_RAM_BASE)
+              word = `DTCM.mem_r[(addr - `MEM_RAM_BASE) >> 2] >> (8 * addr[1:0]);
+          else if (addr >= `MEM_ILM_BASE)
+              word = `ITCM.mem_r[(addr - `MEM_ILM_BASE) >> 3] >> (8 * addr[2:0]);
+          else
+              word = `EXT_RAM.mem_r[(addr - `MEM_EXTRAM_BASE) >> 2] >> (8 * addr[1:0]);
+          mem_byte = word[7:0];
+      end
+  endfunction
+
+  wire mem_dump_hit = pc_vld[0] & (pc == mem_dump_pc) & (mem_dump_fd != 0);
+  reg mem_dump_hit_r;
+  always @(posedge clk or negedge rst_n)
+  begin
+    if(rst_n == 1'b0) begin
+        mem_dump_hit_r <= 1'b0;
+    end
+    else begin
+        mem_dump_hit_r <= mem_dump_hit;
+        // 同一条指令可能连续多拍有效，只在上升沿导出一次
+        if (mem_dump_hit & ~mem_dump_hit_r) begin
+            for (mem_dump_i = 0; mem_dump_i < mem_dump_len; mem_dump_i = mem_dump_i + 1) begin
+                $fwrite(mem_dump_fd, "%h", mem_byte(mem_dump_addr + mem_dump_i));
+            end
+            $fwrite(mem_dump_fd, "\n");
+            $fflush(mem_dump_fd);
+        end
+    end
+  end
+
+
   // Randomly force the external interrupt
   `define EXT_IRQ u_e203_soc_top.u_e203_subsys_top.u_e203_subsys_main.plic_ext_irq
   `define SFT_IRQ u_e203_soc_top.u_e203_subsys_top.u_e203_subsys_main.clint_sft_irq
@@ -316,10 +402,29 @@ module tb_top #(
 
   integer i;
 
+  // 由 tb_top.cc 实现：+mem_bin 时已装载 split_memory.py --bin 生成的区域镜像
+  import "DPI-C" function int tb_mem_bin_loaded();
+  import "DPI-C" function longint tb_mem_bin_word(input int region, input int index, input int bytes);
+
     reg [7:0] ext_mem [0:(131072*4)-1];
     reg [7:0] itcm_mem [0:(`E203_ITCM_RAM_DP*8)-1];
     reg [7:0] dtcm_mem [0:(`E203_DTCM_RAM_DP*4)-1];
     initial begin
+    if (tb_mem_bin_loaded() != 0) begin
+      // 直接按字装载二进制镜像（0: ilm, 1: ram, 2: extram）
+      for (i=0;i<(`E203_ITCM_RAM_DP);i=i+1) begin
+          `ITCM.mem_r[i] = tb_mem_bin_word(0, i, 8);
+      end
+
+      for (i=0;i<(`E203_DTCM_RAM_DP);i=i+1) begin
+          `DTCM.mem_r[i] = tb_mem_bin_word(1, i, 4);
+      end
+
+      for (i=0;i<(131072);i=i+1) begin
+          `EXT_RAM.mem_r[i] = tb_mem_bin_word(2, i, 4);
+      end
+    end
+    else begin
       $readmemh({testcase, "_ilm.verilog"}, itcm_mem);
       $readmemh({testcase, "_ram.verilog"}, dtcm_mem);
       $readmemh({testcase, "_extram.verilog"}, ext_mem);
@@ -348,6 +453,7 @@ module tb_top #(
           `EXT_RAM.mem_r[i][16+7:16] = ext_mem[i*4+2];
           `EXT_RAM.mem_r[i][24+7:24] = ext_mem[i*4+3];
       end
+    end
 
         $display("ITCM 0x00: %h", `ITCM.mem_r[8'h00]);
         $display("ITCM 0x01: %h", `ITCM.mem_r[8'h01]);
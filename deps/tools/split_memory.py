@@ -1,16 +1,37 @@
 #!/usr/bin/env python3
 """
-内存分割脚本 - 将.verilog或.hex文件分割为ilm、extram和ram三部分
-用法: python3 split_memory.py <verilog_file|hex_file>
+内存分割脚本 - 将.elf、.verilog或.hex文件分割为ilm、extram和ram三部分
+用法: python3 split_memory.py <elf_file|verilog_file|hex_file>
+      python3 split_memory.py <elf_file> --patch <patch.json>
+      python3 split_memory.py <verilog_file> --elf <elf_file> --patch <patch.json>
+      （按 ELF 符号地址改写测试数据后再分割，见 test_case_patch.py）
+      加 --bin 时额外为每个区域生成按区域大小补 0 的原始二进制镜像 <name>_<region>.bin，
+      供 Verilator 仿真器以 +mem_bin 直接装载（见 tb_verilator/tb_top.cc）。
+      加 --cache 时按 <name>_split.json 清单判断：输入、补丁、区域配置和脚本版本都未变化则直接返回，
+      否则只重新生成内容有变化（或输出文件缺失）的区域。
+      内存区域默认为 MEMORY_REGIONS，可用 --ld <链接脚本> 从 MEMORY 块读取，或用 --regions <json> 指定；
+      任何可加载字节落在所有区域之外都会报错，不再静默丢弃。
+      python3 split_memory.py <elf_file> --symbols <name> [<name> ...]
+      只输出各符号的 {name: [地址, 大小]}（JSON），不分割镜像（run_tests.py --dump-dst 使用）。
+直接输入 ELF 时读取 PT_LOAD 段（按 p_paddr 加载地址），无需 objcopy 生成的文本镜像。
 """
 
 import sys
 import os
 import re
+import json
+import struct
+import bisect
+import hashlib
 from pathlib import Path
 from typing import Dict, Tuple, Optional
 
-# 定义内存区域配置
+import numpy as np
+
+# 缓存清单格式版本，输出格式变化时递增
+SPLIT_CACHE_VERSION = 1
+
+# 默认内存区域配置（与 gcc_hbirdv2_ilm.ld 的 MEMORY 块一致），可用 --ld / --regions 覆盖
 MEMORY_REGIONS = {
     'ilm': {
         'start': 0x80000000,
@@ -26,113 +47,262 @@ MEMORY_REGIONS = {
     }
 }
 
+# .mem 每行的字节数：ITCM 为 64 位宽，其余 32 位。链接脚本不含位宽，配置中未给出 word_bytes 时按此取值
+DEFAULT_WORD_BYTES = {'ilm': 8}
+WORD_BYTES = 4
+
+
+def parse_size(value, symbols: Optional[Dict[str, int]] = None) -> int:
+    """
+    解析 0x80000000 / 4096 / 256K / 1M 形式的地址或长度，
+    也支持链接脚本中已定义符号（如 __ROM_BASE）以及它们的加减
+    """
+    if isinstance(value, int):
+        return value
+    symbols = symbols or {}
+    total = 0
+    for sign, term in re.findall(r'([+-]?)\s*([^+\-\s]+)', str(value)):
+        match = re.fullmatch(r'(0[xX][0-9a-fA-F]+|\d+)([kKmM]?)', term)
+        if match:
+            number = int(match.group(1), 0) * {'': 1, 'K': 1024, 'M': 1024 * 1024}[match.group(2).upper()]
+        elif term in symbols:
+            number = symbols[term]
+        else:
+            raise ValueError(f"Unsupported address/length expression: {value!r}")
+        total += -number if sign == '-' else number
+    return total
+
+
+def load_ld_regions(ld_file) -> Dict[str, dict]:
+    """从链接脚本的 MEMORY { name (attr) : ORIGIN = x, LENGTH = y } 块读取区域"""
+    with open(ld_file, 'r') as f:
+        text = re.sub(r'/\*.*?\*/', ' ', f.read(), flags=re.S)
+    block = re.search(r'\bMEMORY\s*\{(.*?)\}', text, flags=re.S)
+    if not block:
+        raise ValueError(f"No MEMORY block found in {ld_file}")
+
+    # MEMORY 块之前的简单符号赋值，如 __ROM_BASE = 0x20000000;
+    symbols = {}
+    for name, value in re.findall(r'^\s*(\w+)\s*=\s*([^;]+);', text[:block.start()], flags=re.M):
+        symbols[name] = parse_size(value, symbols)
+
+    regions = {}
+    entry_re = re.compile(r'(\w+)\s*(?:\([^)]*\))?\s*:\s*(?:ORIGIN|org|o)\s*=\s*([^,]+?)\s*,'
+                          r'\s*(?:LENGTH|len|l)\s*=\s*([^\n;]+)')
+    for line in block.group(1).splitlines():
+        if not line.strip():
+            continue
+        match = entry_re.search(line)
+        if not match:
+            raise ValueError(f"Unsupported MEMORY entry in {ld_file}: {line.strip()}")
+        regions[match.group(1)] = {'start': parse_size(match.group(2), symbols),
+                                   'size': parse_size(match.group(3), symbols)}
+    return regions
+
+
+def load_json_regions(json_file) -> Dict[str, dict]:
+    """读取区域配置 {name: {"start": ..., "size": ..., "word_bytes": ...}}，数值可写作 "0x..." / "256K" """
+    with open(json_file, 'r') as f:
+        config = json.load(f)
+    regions = {}
+    for name, entry in config.items():
+        regions[name] = {'start': parse_size(entry['start']), 'size': parse_size(entry['size'])}
+        if 'word_bytes' in entry:
+            regions[name]['word_bytes'] = int(entry['word_bytes'])
+    return regions
+
+
+def normalize_regions(regions: Dict[str, dict]) -> Dict[str, dict]:
+    """补全 end / word_bytes 并检查区域不重叠"""
+    result = {}
+    for name, config in regions.items():
+        config = dict(config)
+        if config['size'] <= 0:
+            raise ValueError(f"Region {name} has non-positive size")
+        config['end'] = config['start'] + config['size'] - 1
+        config.setdefault('word_bytes', DEFAULT_WORD_BYTES.get(name, WORD_BYTES))
+        result[name] = config
+
+    ordered = sorted(result.items(), key=lambda item: item[1]['start'])
+    for (name_a, a), (name_b, b) in zip(ordered, ordered[1:]):
+        if a['end'] >= b['start']:
+            raise ValueError(f"Memory regions {name_a} and {name_b} overlap")
+    return result
+
 
 class HexParser:
-    """Intel HEX格式解析器"""
+    """Intel HEX格式解析器（流式，逐条记录解码并校验）"""
     
     @staticmethod
-    def parse_hex_line(line: str) -> Optional[Tuple[int, bytes]]:
+    def parse_hex_line(line: str) -> Optional[Tuple[int, int, bytes]]:
         """
-        解析Intel HEX格式的一行
-        返回: (address, data_bytes) 或 None
+        解析Intel HEX格式的一行并校验
+        返回: (record_type, address, data_bytes)，非记录行返回 None
         """
         line = line.strip()
         if not line.startswith(':'):
             return None
         
-        try:
-            # Intel HEX格式: :LLAAAATT[DD...]CC
-            # LL = 字节数, AAAA = 地址, TT = 记录类型, DD = 数据, CC = 校验和
-            byte_count = int(line[1:3], 16)
-            address = int(line[3:7], 16)
-            record_type = int(line[7:9], 16)
-            
-            # 只处理数据记录 (type 00)
-            if record_type != 0x00:
-                return None
-            
-            # 提取数据字节
-            data_bytes = bytes.fromhex(line[9:9+byte_count*2])
-            
-            return (address, data_bytes)
-        except (ValueError, IndexError):
-            return None
+        # Intel HEX格式: :LLAAAATT[DD...]CC
+        # LL = 字节数, AAAA = 地址, TT = 记录类型, DD = 数据, CC = 校验和
+        record = bytes.fromhex(line[1:])
+        if len(record) < 5 or len(record) != record[0] + 5:
+            raise ValueError(f"bad record length: {line}")
+        # 所有字节（含校验和）之和的低 8 位必须为 0
+        if sum(record) & 0xFF:
+            raise ValueError(f"checksum mismatch: {line}")
+        
+        address = (record[1] << 8) | record[2]
+        return (record[3], address, record[4:-1])
     
     @staticmethod
-    def read_hex_file(filepath: Path) -> Dict[int, int]:
+    def iter_hex_runs(filepath: Path):
         """
-        读取整个hex文件，返回地址到字节的映射
-        返回: {absolute_address: byte_value}
+        按文件顺序读取hex文件，把地址连续的数据记录合并后逐段产出
+        产出: (absolute_address, data_bytes)
         """
-        memory = {}
-        extended_address = 0
+        base_address = 0
+        run_start = None
+        run = bytearray()
         
         with open(filepath, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if not line.startswith(':'):
+            for line_no, line in enumerate(f, 1):
+                try:
+                    parsed = HexParser.parse_hex_line(line)
+                except ValueError as e:
+                    raise ValueError(f"{filepath}:{line_no}: {e}") from None
+                if parsed is None:
                     continue
+                record_type, address, data = parsed
                 
-                try:
-                    byte_count = int(line[1:3], 16)
-                    address = int(line[3:7], 16)
-                    record_type = int(line[7:9], 16)
-                    
-                    # 扩展线性地址记录 (type 04)
-                    if record_type == 0x04:
-                        extended_address = int(line[9:13], 16) << 16
+                # 数据记录 (type 00)
+                if record_type == 0x00:
+                    full_address = base_address + address
+                    if run_start is not None and run_start + len(run) == full_address:
+                        run += data
                         continue
-                    
-                    # 数据记录 (type 00)
-                    if record_type == 0x00:
-                        full_address = extended_address + address
-                        data_hex = line[9:9+byte_count*2]
-                        
-                        for i in range(byte_count):
-                            byte_val = int(data_hex[i*2:i*2+2], 16)
-                            memory[full_address + i] = byte_val
-                    
-                    # 文件结束记录 (type 01)
-                    elif record_type == 0x01:
-                        break
-                        
-                except (ValueError, IndexError):
-                    continue
-        
-        # 打印地址范围
-        if memory:
-            min_addr = min(memory.keys())
-            max_addr = max(memory.keys())
-            print(f"  Data range: 0x{min_addr:08x} - 0x{max_addr:08x} ({len(memory)} bytes)")
+                    if run:
+                        yield run_start, bytes(run)
+                    run_start = full_address
+                    run = bytearray(data)
+                
+                # 扩展段地址记录 (type 02)：段地址 * 16
+                elif record_type == 0x02:
+                    base_address = int.from_bytes(data, 'big') << 4
+                
+                # 扩展线性地址记录 (type 04)：高 16 位地址
+                elif record_type == 0x04:
+                    base_address = int.from_bytes(data, 'big') << 16
+                
+                # 文件结束记录 (type 01)
+                elif record_type == 0x01:
+                    break
         
-        return memory
+        if run:
+            yield run_start, bytes(run)
+
+
+class ElfReader:
+    """最小化的 ELF32 小端解析器，只读取符号表和 PT_LOAD 程序头/段内容"""
+
+    SHT_SYMTAB = 2
+    PT_LOAD = 1
+
+    def __init__(self, filepath: Path):
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        if data[:4] != b'\x7fELF' or data[4] != 1 or data[5] != 1:
+            raise ValueError(f"{filepath} is not a little-endian ELF32 file")
+
+        (e_phoff, e_shoff) = struct.unpack_from('<II', data, 0x1C)
+        (e_phentsize, e_phnum, e_shentsize, e_shnum) = struct.unpack_from('<HHHH', data, 0x2A)
+
+        # 程序头: (vaddr, paddr, memsz)，用于把运行地址 (VMA) 换算为加载地址 (LMA)
+        # 以及 (paddr, offset, filesz)，即需要装入内存镜像的文件内容（.bss 部分不在文件中）
+        self.data = data
+        self.segments = []
+        self.load_segments = []
+        for i in range(e_phnum):
+            p_type, p_offset, p_vaddr, p_paddr, p_filesz, p_memsz = struct.unpack_from(
+                '<IIIIII', data, e_phoff + i * e_phentsize)
+            if p_type == self.PT_LOAD and p_memsz:
+                self.segments.append((p_vaddr, p_paddr, p_memsz))
+            if p_type == self.PT_LOAD and p_filesz:
+                self.load_segments.append((p_paddr, p_offset, p_filesz))
+
+        # 符号表: name -> (value, size)
+        self.symbols = {}
+        sections = [struct.unpack_from('<IIIIIIIIII', data, e_shoff + i * e_shentsize) for i in range(e_shnum)]
+        for sh in sections:
+            if sh[1] != self.SHT_SYMTAB:
+                continue
+            sym_off, sym_size, sym_entsize = sh[4], sh[5], sh[9]
+            str_off = sections[sh[6]][4]
+            for off in range(sym_off, sym_off + sym_size, sym_entsize):
+                st_name, st_value, st_size = struct.unpack_from('<III', data, off)
+                if st_name == 0:
+                    continue
+                end = data.index(b'\0', str_off + st_name)
+                self.symbols[data[str_off + st_name:end].decode()] = (st_value, st_size)
+
+    def symbol(self, name: str) -> Tuple[int, int]:
+        if name not in self.symbols:
+            raise KeyError(f"Symbol {name} not found in ELF")
+        return self.symbols[name]
+
+    def iter_load_runs(self):
+        """按程序头顺序产出每个 PT_LOAD 段的 (加载地址, 内容)"""
+        view = memoryview(self.data)
+        for paddr, offset, filesz in self.load_segments:
+            yield paddr, view[offset:offset + filesz]
+
+    def vma_to_lma(self, addr: int) -> int:
+        for vaddr, paddr, memsz in self.segments:
+            if vaddr <= addr < vaddr + memsz:
+                return addr - vaddr + paddr
+        return addr
 
 
 class MemorySplitter:
-    def __init__(self, input_file: str):
+    def __init__(self, input_file: str, emit_bin: bool = False, cache: bool = False,
+                 regions: Optional[Dict[str, dict]] = None):
         self.input_file = Path(input_file)
         self.dir = self.input_file.parent
         self.basename = self.input_file.stem
         suffix = self.input_file.suffix.lower()
         self.is_hex = suffix == '.hex'
+        self.emit_bin = emit_bin
+        self.cache = cache
+        self.manifest_file = self.dir / f"{self.basename}_split.json"
+        self.is_elf = suffix == '.elf'
+        # 输出十六进制大小写与输入一致：objcopy 的 .verilog 为大写，hex 路径输出小写，
+        # ELF 输入与 objcopy -O verilog 的结果一致（大写）
+        self.upper = not self.is_hex
+        self.case_detected = self.is_hex or self.is_elf
+        # 数据补丁 {absolute_lma: byte_value}，在分割时替换原镜像中的字节
+        self.overrides = {}
+        self.override_addrs = []
+        self.applied_overrides = set()
+        # 落在所有区域之外的字节：(字节数, 首个地址)
+        self.unmapped_bytes = 0
+        self.first_unmapped = None
         
         # 初始化内存区域配置，自动计算end
-        self.memory_regions = {}
-        for name, config in MEMORY_REGIONS.items():
-            self.memory_regions[name] = config.copy()
-            self.memory_regions[name]['end'] = config['start'] + config['size'] - 1
+        self.memory_regions = normalize_regions(regions if regions is not None else MEMORY_REGIONS)
+        # 按起始地址排序，用于二分查找区域
+        self.region_order = sorted(self.memory_regions, key=lambda n: self.memory_regions[n]['start'])
+        self.region_starts = [self.memory_regions[n]['start'] for n in self.region_order]
         
         # 初始化每个区域的数据结构
         self.regions = {}
         for region_name in self.memory_regions.keys():
             self.regions[region_name] = {
-                'bytes': {},  # 字典存储字节数据 {relative_addr: byte_hex}
+                # 按输入顺序排列的连续数据段 [relative_start, bytearray]，相邻连续的数据合并为一段
+                'segments': [],
                 'count': 0,
-                'min_addr': None,
-                'max_addr': None,
-                'last_addr': None,
                 'verilog_file': self.dir / f"{self.basename}_{region_name}.verilog",
                 'mem_file': self.dir / f"{self.basename}_{region_name}.mem",
+                'bin_file': self.dir / f"{self.basename}_{region_name}.bin",
             }
     
     def check_output_exists(self) -> bool:
@@ -140,98 +310,141 @@ class MemorySplitter:
         for region in self.regions.values():
             if region['verilog_file'].exists() or region['mem_file'].exists():
                 return True
+            if self.emit_bin and region['bin_file'].exists():
+                return True
         return False
     
+    def load_patch(self, patch_file: str, elf_file: Optional[str] = None):
+        """读取补丁文件，按 ELF 符号地址展开为逐字节的改写表（未指定 elf_file 时使用输入的 ELF）"""
+        with open(patch_file, 'r') as f:
+            patch = json.load(f)
+        elf = ElfReader(Path(elf_file) if elf_file else self.input_file)
+
+        for entry in patch['entries']:
+            base, size = elf.symbol(entry['symbol'])
+            if 'addr_of' in entry:
+                data = struct.pack('<I', elf.symbol(entry['addr_of'])[0])
+            else:
+                data = bytes.fromhex(entry['data'])
+            offset = entry.get('offset', 0)
+            if offset + len(data) > size:
+                raise ValueError(f"Patch for {entry['symbol']} ({offset + len(data)} bytes) "
+                                 f"exceeds symbol size ({size} bytes)")
+            lma = elf.vma_to_lma(base + offset)
+            for i, byte_val in enumerate(data):
+                self.overrides[lma + i] = byte_val
+
+        print(f"Loaded {len(self.overrides)} patched bytes from {patch_file}")
+
     def get_region_for_address(self, addr: int) -> Optional[str]:
         """根据地址返回所属的内存区域名称"""
-        for region_name, config in self.memory_regions.items():
-            if config['start'] <= addr <= config['end']:
-                return region_name
+        idx = bisect.bisect_right(self.region_starts, addr) - 1
+        if idx < 0:
+            return None
+        region_name = self.region_order[idx]
+        if addr <= self.memory_regions[region_name]['end']:
+            return region_name
         return None
     
-    def process_byte(self, addr: int, byte_hex: str, verilog_handlers: Dict):
-        """处理单个字节数据"""
-        region_name = self.get_region_for_address(addr)
-        if region_name is None:
+    def apply_overrides(self, addr: int, data: bytearray):
+        """把落在 [addr, addr + len) 内的补丁字节写入 data"""
+        lo = bisect.bisect_left(self.override_addrs, addr)
+        hi = bisect.bisect_left(self.override_addrs, addr + len(data))
+        for patch_addr in self.override_addrs[lo:hi]:
+            data[patch_addr - addr] = self.overrides[patch_addr]
+            self.applied_overrides.add(patch_addr)
+
+    def add_run(self, addr: int, data: bytes):
+        """按区域切分一段连续数据并追加到对应区域，区域外的部分记入 unmapped_bytes"""
+        end = addr + len(data)
+        while addr < end:
+            region_name = self.get_region_for_address(addr)
+            if region_name is None:
+                # 跳到下一个区域起点（或数据末尾）
+                idx = bisect.bisect_right(self.region_starts, addr)
+                next_start = self.region_starts[idx] if idx < len(self.region_starts) else end
+                if self.first_unmapped is None:
+                    self.first_unmapped = addr
+                self.unmapped_bytes += min(next_start, end) - addr
+                data = data[min(next_start, end) - addr:]
+                addr = min(next_start, end)
+                continue
+
+            config = self.memory_regions[region_name]
+            chunk_end = min(end, config['end'] + 1)
+            chunk = bytearray(data[:chunk_end - addr])
+            if self.override_addrs:
+                self.apply_overrides(addr, chunk)
+
+            region = self.regions[region_name]
+            relative_addr = addr - config['start']
+            segments = region['segments']
+            if segments and segments[-1][0] + len(segments[-1][1]) == relative_addr:
+                segments[-1][1] += chunk
+            else:
+                segments.append([relative_addr, chunk])
+            region['count'] += len(chunk)
+
+            data = data[chunk_end - addr:]
+            addr = chunk_end
+
+    def detect_case(self, data_str: str):
+        """根据第一段含字母的数据确定输入的大小写"""
+        if self.case_detected:
             return
-        
-        region = self.regions[region_name]
-        relative_addr = addr - MEMORY_REGIONS[region_name]['start']
-        
-        # 检查是否需要输出地址标记
-        if region['last_addr'] is None or relative_addr != region['last_addr'] + 1:
-            verilog_handlers[region_name].write(f"@{relative_addr:08x}\n")
-        
-        # 写入数据
-        verilog_handlers[region_name].write(f"{byte_hex}\n")
-        
-        # 更新数据结构
-        region['bytes'][relative_addr] = byte_hex
-        region['count'] += 1
-        region['last_addr'] = relative_addr
-        
-        # 更新最小最大地址
-        if region['min_addr'] is None or relative_addr < region['min_addr']:
-            region['min_addr'] = relative_addr
-        if region['max_addr'] is None or relative_addr > region['max_addr']:
-            region['max_addr'] = relative_addr
-    
+        letters = [c for c in data_str if c.isalpha()]
+        if letters:
+            self.upper = letters[0].isupper()
+            self.case_detected = True
+
+    def hex_text(self, data: bytes, sep: str) -> str:
+        text = data.hex(sep) if sep else data.hex()
+        return text.upper() if self.upper else text
+
+    def start_split(self):
+        self.override_addrs = sorted(self.overrides)
+        self.applied_overrides = set()
+
     def parse_and_split(self):
         """解析输入文件并分割到不同区域"""
         print(f"Processing {self.input_file}...")
         for region_name, config in self.memory_regions.items():
             print(f"{region_name.upper()} range: 0x{config['start']:08x} - 0x{config['end']:08x}")
         
-        # 打开所有输出文件
-        verilog_handlers = {}
-        for region_name, region in self.regions.items():
-            verilog_handlers[region_name] = open(region['verilog_file'], 'w')
-        
-        try:
-            current_addr = 0
-            
-            with open(self.input_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    
-                    # 跳过空行和注释
-                    if not line or line.startswith('//'):
-                        continue
-                    
-                    # 处理地址行 @address
-                    addr_match = re.match(r'^@([0-9a-fA-F]+)\s*$', line)
-                    if addr_match:
-                        current_addr = int(addr_match.group(1), 16)
-                        continue
-                    
-                    # 处理带地址的数据行 @address data...
-                    addr_data_match = re.match(r'^@([0-9a-fA-F]+)\s+((?:[0-9a-fA-F]{2}\s*)+)', line)
-                    if addr_data_match:
-                        current_addr = int(addr_data_match.group(1), 16)
-                        data_str = addr_data_match.group(2)
+        self.start_split()
+        current_addr = 0
+        with open(self.input_file, 'r') as f:
+            for line in f:
+                line = line.strip()
+                
+                # 跳过空行和注释
+                if not line or line.startswith('//'):
+                    continue
+                
+                # 处理地址行 @address
+                addr_match = re.match(r'^@([0-9a-fA-F]+)\s*$', line)
+                if addr_match:
+                    current_addr = int(addr_match.group(1), 16)
+                    continue
+                
+                # 处理带地址的数据行 @address data...
+                addr_data_match = re.match(r'^@([0-9a-fA-F]+)\s+((?:[0-9a-fA-F]{2}\s*)+)', line)
+                if addr_data_match:
+                    current_addr = int(addr_data_match.group(1), 16)
+                    data_str = addr_data_match.group(2)
+                else:
+                    # 处理纯数据行
+                    data_match = re.match(r'^((?:[0-9a-fA-F]{2}\s*)+)', line)
+                    if data_match:
+                        data_str = data_match.group(1)
                     else:
-                        # 处理纯数据行
-                        data_match = re.match(r'^((?:[0-9a-fA-F]{2}\s*)+)', line)
-                        if data_match:
-                            data_str = data_match.group(1)
-                        else:
-                            continue
-                    
-                    # 提取所有字节
-                    bytes_list = re.findall(r'[0-9a-fA-F]{2}', data_str)
-                    for byte_hex in bytes_list:
-                        self.process_byte(current_addr, byte_hex, verilog_handlers)
-                        current_addr += 1
-        
-        finally:
-            # 关闭所有文件
-            for handler in verilog_handlers.values():
-                handler.close()
-        
-        # 输出统计信息
-        print("\nMemory split completed:")
-        for region_name, region in self.regions.items():
-            print(f"  {region_name.upper()}: {region['verilog_file']} ({region['count']} entries)")
+                        continue
+                
+                # 整行一次解码为字节串
+                self.detect_case(data_str)
+                data = bytes.fromhex(data_str)
+                self.add_run(current_addr, data)
+                current_addr += len(data)
     
     def process_hex_file(self):
         """处理hex文件"""
@@ -239,80 +452,191 @@ class MemorySplitter:
         for region_name, config in self.memory_regions.items():
             print(f"{region_name.upper()} range: 0x{config['start']:08x} - 0x{config['end']:08x}")
         
-        # 读取hex文件
-        memory = HexParser.read_hex_file(self.input_file)
+        # 按文件顺序流式读取，连续记录直接追加到各区域的数据段
+        self.start_split()
+        total = 0
+        min_addr = max_addr = None
+        for addr, data in HexParser.iter_hex_runs(self.input_file):
+            self.add_run(addr, data)
+            total += len(data)
+            min_addr = addr if min_addr is None else min(min_addr, addr)
+            max_addr = addr + len(data) - 1 if max_addr is None else max(max_addr, addr + len(data) - 1)
         
-        if not memory:
+        if total == 0:
             print("Warning: No data found in hex file")
             return
         
-        print(f"Loaded {len(memory)} bytes from hex file")
-        
-        # 打开所有输出文件
-        verilog_handlers = {}
-        for region_name, region in self.regions.items():
-            verilog_handlers[region_name] = open(region['verilog_file'], 'w')
-        
-        try:
-            # 按地址排序处理
-            sorted_addresses = sorted(memory.keys())
-            
-            for addr in sorted_addresses:
-                byte_val = memory[addr]
-                byte_hex = f"{byte_val:02x}"
-                self.process_byte(addr, byte_hex, verilog_handlers)
-        
-        finally:
-            # 关闭所有文件
-            for handler in verilog_handlers.values():
-                handler.close()
+        print(f"  Data range: 0x{min_addr:08x} - 0x{max_addr:08x} ({total} bytes)")
+        print(f"Loaded {total} bytes from hex file")
+    
+    def process_elf_file(self):
+        """直接读取ELF的PT_LOAD段"""
+        print(f"Processing ELF file {self.input_file}...")
+        for region_name, config in self.memory_regions.items():
+            print(f"{region_name.upper()} range: 0x{config['start']:08x} - 0x{config['end']:08x}")
         
-        # 输出统计信息
+        elf = ElfReader(self.input_file)
+        self.start_split()
+        for paddr, data in elf.iter_load_runs():
+            print(f"  PT_LOAD: 0x{paddr:08x} - 0x{paddr + len(data) - 1:08x} ({len(data)} bytes)")
+            self.add_run(paddr, data)
+    
+    def write_verilog_files(self, names):
+        """每个区域一次性写出：每段以 @地址 开头，一行一个字节"""
+        for region_name in names:
+            region = self.regions[region_name]
+            with open(region['verilog_file'], 'w') as f:
+                if region['count'] == 0:
+                    f.write(f"// No {region_name.upper()} data found\n")
+                    continue
+                f.write(''.join("@%08x\n%s\n" % (start, self.hex_text(data, '\n'))
+                                for start, data in region['segments']))
+    
+    def print_summary(self):
+        """输出统计信息"""
         print("\nMemory split completed:")
         for region_name, region in self.regions.items():
             print(f"  {region_name.upper()}: {region['verilog_file']} ({region['count']} entries)")
     
-    def generate_mem_files(self):
+    def region_image(self, region) -> Tuple[int, bytearray]:
+        """把区域内各段按输入顺序叠加为连续镜像（后写覆盖先写，空洞补 0），返回 (起始地址, 镜像)"""
+        segments = region['segments']
+        min_addr = min(start for start, _ in segments)
+        max_addr = max(start + len(data) for start, data in segments)
+        image = bytearray(max_addr - min_addr)
+        for start, data in segments:
+            image[start - min_addr:start - min_addr + len(data)] = data
+        return min_addr, image
+
+    def generate_mem_files(self, names):
         """生成.mem格式文件
            - ILM: 64位一行（8字节，小端序）
            - 其他: 32位一行（4字节，小端序）
         """
-        for region_name, region in self.regions.items():
+        for region_name in names:
+            region = self.regions[region_name]
             with open(region['mem_file'], 'w') as f:
-                if region['min_addr'] is None:
+                if region['count'] == 0:
                     f.write("// No data found\n")
                     continue
 
-                addr = region['min_addr']
-                step = 8 if region_name == 'ilm' else 4  # ILM 64位一行，其余32位一行
-                while addr <= region['max_addr']:
-                    # 按小端序组合：收集 step 个字节后整体反转
-                    bytes_vals = [region['bytes'].get(addr + i, '00') for i in range(step)]
-                    word = "".join(reversed(bytes_vals)) + "\n"
-                    f.write(word)
-                    addr += step
+                step = self.memory_regions[region_name]['word_bytes']  # ILM 64位一行，其余32位一行
+                _, image = self.region_image(region)
+                image += bytes(-len(image) % step)
+                # 按小端序组合：每 step 个字节整体反转
+                words = np.frombuffer(bytes(image), dtype=np.uint8).reshape(-1, step)[:, ::-1]
+                text = self.hex_text(words.tobytes(), '')
+                width = step * 2
+                f.write('\n'.join(text[i:i + width] for i in range(0, len(text), width)) + '\n')
     
-    def add_placeholders(self):
-        """为空的区域添加占位符"""
-        for region_name, region in self.regions.items():
-            if region['count'] == 0:
-                with open(region['verilog_file'], 'w') as f:
-                    f.write(f"// No {region_name.upper()} data found\n")
+    def generate_bin_files(self, names):
+        """生成原始二进制镜像：每个区域固定为区域配置中的大小，空洞补 0"""
+        for region_name in names:
+            region = self.regions[region_name]
+            image = bytearray(self.memory_regions[region_name]['size'])
+            for start, data in region['segments']:
+                image[start:start + len(data)] = data
+            with open(region['bin_file'], 'wb') as f:
+                f.write(image)
     
+    def output_files(self, region_name):
+        region = self.regions[region_name]
+        files = [region['verilog_file'], region['mem_file']]
+        if self.emit_bin:
+            files.append(region['bin_file'])
+        return files
+
+    def cache_key(self) -> dict:
+        """输入镜像、补丁、区域配置、输出选项和脚本本身的摘要，任一变化都需要重新分割"""
+        with open(self.input_file, 'rb') as f:
+            input_hash = hashlib.sha256(f.read()).hexdigest()
+        patch = hashlib.sha256(json.dumps(sorted(self.overrides.items())).encode()).hexdigest()
+        with open(__file__, 'rb') as f:
+            tool_hash = hashlib.sha256(f.read()).hexdigest()
+        return {
+            'version': SPLIT_CACHE_VERSION,
+            'tool': tool_hash,
+            'input': input_hash,
+            'patch': patch,
+            'regions': {name: [cfg['start'], cfg['size'], cfg['word_bytes']]
+                        for name, cfg in self.memory_regions.items()},
+            'bin': self.emit_bin,
+        }
+
+    def region_digest(self, region_name) -> str:
+        """区域内容摘要：各数据段的地址、长度、内容以及输出大小写"""
+        h = hashlib.sha256(b'U' if self.upper else b'l')
+        for start, data in self.regions[region_name]['segments']:
+            h.update(struct.pack('<II', start, len(data)))
+            h.update(data)
+        return h.hexdigest()
+
+    def load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
     def run(self):
         """执行完整的分割流程"""
-        if self.check_output_exists():
+        if not self.cache and self.check_output_exists():
             print("Output files already exist, aborting to avoid overwrite.")
             return 0
         
         try:
-            if self.is_hex:
+            manifest = {}
+            if self.cache:
+                key = self.cache_key()
+                manifest = self.load_manifest()
+                all_exist = all(f.exists() for name in self.regions for f in self.output_files(name))
+                if manifest.get('key') == key and all_exist:
+                    print(f"{self.input_file} unchanged since last split, skipping ({self.manifest_file.name})")
+                    return 0
+                # 先删除清单，中途失败时下次不会误判为最新
+                if self.manifest_file.exists():
+                    self.manifest_file.unlink()
+                if not self.emit_bin:
+                    for region in self.regions.values():
+                        if region['bin_file'].exists():
+                            region['bin_file'].unlink()
+
+            if self.is_elf:
+                self.process_elf_file()
+            elif self.is_hex:
                 self.process_hex_file()
             else:
                 self.parse_and_split()
+
+            if self.unmapped_bytes:
+                raise ValueError(f"{self.unmapped_bytes} loadable bytes fall outside all memory regions "
+                                 f"(first at 0x{self.first_unmapped:08x}); "
+                                 f"check the region config (--ld / --regions)")
+
+            missing = set(self.overrides) - self.applied_overrides
+            if missing:
+                raise ValueError(f"{len(missing)} patched bytes not present in image "
+                                 f"(first at 0x{min(missing):08x})")
+            
+            # 缓存模式下只重新生成内容有变化或输出缺失的区域
+            digests = {name: self.region_digest(name) for name in self.regions}
+            old_digests = manifest.get('digests', {})
+            names = [name for name in self.regions
+                     if not self.cache or old_digests.get(name) != digests[name]
+                     or not all(f.exists() for f in self.output_files(name))]
+            
+            self.write_verilog_files(names)
+            self.print_summary()
+            self.generate_mem_files(names)
+            if self.emit_bin:
+                self.generate_bin_files(names)
             
-            self.generate_mem_files()
-            self.add_placeholders()
+            if self.cache:
+                kept = [name.upper() for name in self.regions if name not in names]
+                print(f"Cache: regenerated {len(names)} region(s)"
+                      + (f", unchanged: {', '.join(kept)}" if kept else ""))
+                with open(self.manifest_file, 'w') as f:
+                    json.dump({'key': key, 'digests': digests}, f, indent=2)
             return 0
         except Exception as e:
             print(f"Error: {e}", file=sys.stderr)
@@ -323,36 +647,79 @@ class MemorySplitter:
 
 def main():
     import argparse
-    parser = argparse.ArgumentParser(description="内存分割脚本 - 将.verilog或.hex文件分割为ilm、extram和ram三部分")
-    parser.add_argument("input_file", help="输入的.verilog或.hex文件路径")
+    parser = argparse.ArgumentParser(description="内存分割脚本 - 将.elf、.verilog或.hex文件分割为ilm、extram和ram三部分")
+    parser.add_argument("input_file", help="输入的.elf、.verilog或.hex文件路径")
     parser.add_argument("--force", action="store_true", help="覆盖已存在的输出文件")
+    parser.add_argument("--elf", help="与输入镜像对应的 ELF 文件，用于解析补丁中的符号地址（输入为 .elf 时可省略）")
+    parser.add_argument("--patch", help="测试数据补丁文件 (JSON)，输入不是 .elf 时需同时指定 --elf")
+    parser.add_argument("--bin", action="store_true", help="额外生成各区域的原始二进制镜像 (.bin)")
+    parser.add_argument("--ld", help="从链接脚本的 MEMORY 块读取内存区域")
+    parser.add_argument("--regions", help="从 JSON 文件读取内存区域 {name: {start, size, word_bytes}}")
+    parser.add_argument("--cache", action="store_true",
+                        help="按缓存清单跳过未变化的输入，只重新生成内容有变化的区域（不需要 --force）")
+    parser.add_argument("--symbols", nargs="+", metavar="NAME",
+                        help="只以 JSON 输出 ELF 中这些符号的地址与大小，不分割镜像")
     args = parser.parse_args()
 
     input_file = args.input_file
+    suffix = Path(input_file).suffix.lower()
+    if args.patch and not args.elf and suffix != '.elf':
+        print("Error: --patch requires --elf")
+        return 1
+
     if not os.path.isfile(input_file):
         print(f"Error: File {input_file} not found")
         return 1
 
+    if args.symbols:
+        try:
+            elf = ElfReader(Path(input_file))
+            print(json.dumps({name: list(elf.symbol(name)) for name in args.symbols}))
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        return 0
+
     # 检查文件格式
-    suffix = Path(input_file).suffix.lower()
-    if suffix not in ['.hex', '.verilog']:
-        print(f"Warning: File extension {suffix} not recognized, expected .hex or .verilog")
+    if suffix not in ['.elf', '.hex', '.verilog']:
+        print(f"Warning: File extension {suffix} not recognized, expected .elf, .hex or .verilog")
 
-    splitter = MemorySplitter(input_file)
-    if splitter.check_output_exists() and not args.force:
+    if args.ld and args.regions:
+        print("Error: --ld and --regions are mutually exclusive")
+        return 1
+    try:
+        if args.ld:
+            regions = load_ld_regions(args.ld)
+        elif args.regions:
+            regions = load_json_regions(args.regions)
+        else:
+            regions = None
+        splitter = MemorySplitter(input_file, emit_bin=args.bin, cache=args.cache, regions=regions)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if splitter.check_output_exists() and not (args.force or args.cache):
         print("Output files already exist, aborting to avoid overwrite.\n如需覆盖请加 --force 参数。")
         return 0
 
     # 如果需要覆盖，先删除已存在的输出文件
     if args.force:
         for region in splitter.regions.values():
-            for fpath in [region['verilog_file'], region['mem_file']]:
+            # 未指定 --bin 时也删除旧的 .bin，避免仿真器以 +mem_bin 装载到过期镜像
+            for fpath in [region['verilog_file'], region['mem_file'], region['bin_file']]:
                 try:
                     if fpath.exists():
                         fpath.unlink()
                 except Exception:
                     pass
 
+    if args.patch:
+        try:
+            splitter.load_patch(args.patch, args.elf)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+
     return splitter.run()
 
 
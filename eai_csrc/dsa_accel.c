@@ -143,3 +143,26 @@ uint32_t dsa_matmul_execute(const dsa_matmul_config_t *config) {
     
     return status;
 }
+
+/**
+ * 配置并发射矩阵乘法，不等待完成
+ */
+uint32_t dsa_matmul_issue(const dsa_matmul_config_t *config) {
+    uint32_t status;
+
+    /* 参数校验 */
+    if (!config) {
+        return DSA_ERR_NULL_PTR;
+    }
+
+    /* 配置CSR寄存器 */
+    status = configure_csr_registers(config);
+    if (status != DSA_SUCCESS) {
+        return status;
+    }
+
+    /* 发射指令，不读取状态码 */
+    DSA_MAT_MULT_T_NOWAIT((uint32_t)(uintptr_t)config->dst_ptr, dsa_build_cfg_word(config));
+
+    return DSA_SUCCESS;
+}
@@ -173,6 +173,20 @@ typedef struct {
     : "r"(dst_addr), "r"(cfg) \
     : "memory")
 
+/**
+ * 发射矩阵乘法指令但不等待结果（rd = x0，状态码丢弃）
+ * 指令进入 inst_pingpong_buf 后 CPU 即可继续执行，用于连续发射多条矩阵乘法；
+ * 按序写回，最后一条用 DSA_MAT_MULT_T 取回状态码即可确认此前各条均已完成
+ * @param dst_addr 输出起始地址
+ * @param cfg 配置字
+ */
+#define DSA_MAT_MULT_T_NOWAIT(dst_addr, cfg) \
+  __asm__ volatile ( \
+    ".insn r 0x2B, 0x7, 0x01, x0, %0, %1\n" /* mat_mult_t x0, rs1, rs2 */ \
+    : \
+    : "r"(dst_addr), "r"(cfg) \
+    : "memory")
+
 /* ========== 高层API ========== */
 
 /**
@@ -182,6 +196,14 @@ typedef struct {
  */
 uint32_t dsa_matmul_execute(const dsa_matmul_config_t *config);
 
+/**
+ * 配置并发射矩阵乘法，不等待完成
+ * 之后的 dsa_matmul_execute() 返回时，此前发射的各条指令均已写回
+ * @param config 矩阵乘法配置结构
+ * @return 状态码(0=已发射，否则为参数错误)
+ */
+uint32_t dsa_matmul_issue(const dsa_matmul_config_t *config);
+
 /**
  * 构建配置字
  * @param config 矩阵乘法配置结构
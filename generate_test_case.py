@@ -1,196 +1,367 @@
 import numpy as np
 import os
 import random
+import sys
 
-# 随机生成矩阵尺寸 (128~256)
-K = random.randint(4, 256)
-N = random.randint(4, 256)
-M = random.randint(4, 256)
+from c_array import write_c_array
+from requant import compute_requant_params, requantize_array
+from test_case_bin import remove_bin_outputs
+from test_case_cli import (build_parser, check_cases, check_options, load_cases, record_cases, write_debug_file,
+                           write_outputs)
+from test_case_layout import ALIGNED_ATTR, buffer_sizes, case_layout, is_strided, padded_buffer
+from test_case_place import place_attr
+from test_case_patch import TEST_CASE_SECTION
 
-# 随机生成 lhs (A)、rhs (B) 的 int8 内容
-lhs = np.random.randint(-128, 128, size=(K, N), dtype=np.int8)
-rhs = np.random.randint(-128, 128, size=(N, M), dtype=np.int8)
+# 随机尺寸范围，--reserve 模式按上限预留 .test_case_data 段空间
+MIN_DIM = 4
+MAX_DIM = 256
 
-# 随机生成 bias (int32)
-bias = np.random.randint(-10000, 10000, size=M, dtype=np.int32)
-# bias 随机或为 0，这里先简单设为 0
-# bias = np.zeros(M, dtype=np.int32)
+# --batch 模式下所有用例数据（.test_case_data，位于 512K 的 extram）的总预算，
+# 其余空间留给 .rodata、共用的 dst_data 及 .bss
+BATCH_DATA_BUDGET = 320 * 1024
 
-# 计算累加结果 (int32)
-sum_result = np.dot(lhs.astype(np.int32), rhs.astype(np.int32))  # [K, M]
-result = sum_result + bias  # broadcasting
 
-def compute_requant_params(acc: np.ndarray):
+def generate_case(max_dim=MAX_DIM, dims=None, lhs=None):
     """
-    根据累加结果范围，生成 dst_mult 和 dst_shift，使得
-      output = (acc * dst_mult + (1 << (shift-1))) >> shift
-    落在 int8 范围内且不完全溢出。
+    随机生成一组测试数据及其预期输出；dims=(K, N, M) 时使用固定尺寸，
+    给定 lhs（K x N 的 int8 矩阵，如上一层的输出）时不再随机生成 lhs
     """
-    acc_min = int(acc.min())
-    acc_max = int(acc.max())
-    max_abs = max(abs(acc_min), abs(acc_max))
-    if max_abs == 0:
-        # 全 0，任意量化都行，返回恒等
-        return 1, 0
-
-    # 我们使用右移 (shift >= 0)，不进行小数放大，保证简单可靠
-    # 目标：max_abs * mult / 2^shift <= 127 且 mult 尽量大
-    # 先枚举适当范围的 shift，选出最大的 mult
-    best_mult = 1
-    best_shift = 0
-    max_shift = 31  # int32 足够
-    for s in range(max_shift + 1):
-        # mult <= 127 * 2^s / max_abs
-        num = 127 * (1 << s)
-        mult = num // max_abs  # floor
-        if mult < 1:
-            continue
-        # 记录 mult 最大的组合
-        if mult > best_mult:
-            best_mult = mult
-            best_shift = s
-
-    return int(best_mult), int(best_shift)
-
-def requantize_array(acc: np.ndarray, mult: int, shift: int) -> np.ndarray:
+    if dims is not None:
+        K, N, M = dims
+    else:
+        # 随机生成矩阵尺寸 (4~max_dim)
+        K = random.randint(MIN_DIM, max_dim)
+        N = random.randint(MIN_DIM, max_dim)
+        M = random.randint(MIN_DIM, max_dim)
+
+    # 随机生成 lhs (A)、rhs (B) 的 int8 内容
+    if lhs is None:
+        lhs = np.random.randint(-128, 128, size=(K, N), dtype=np.int8)
+    rhs = np.random.randint(-128, 128, size=(N, M), dtype=np.int8)
+
+    # 随机生成 bias (int32)
+    bias = np.random.randint(-10000, 10000, size=M, dtype=np.int32)
+    # bias 随机或为 0，这里先简单设为 0
+    # bias = np.zeros(M, dtype=np.int32)
+
+    # 计算累加结果 (int32)
+    sum_result = np.dot(lhs.astype(np.int32), rhs.astype(np.int32))  # [K, M]
+    result = sum_result + bias  # broadcasting
+
+    # 根据结果范围计算 dst_mult / dst_shift
+    dst_mult, dst_shift = compute_requant_params(result)
+
+    # 使用同样公式生成预期输出
+    quantized = requantize_array(result, dst_mult, dst_shift)
+
+    return {
+        'K': K, 'N': N, 'M': M,
+        'lhs': lhs, 'rhs': rhs, 'bias': bias,
+        'result': result,
+        'dst_mult': dst_mult, 'dst_shift': dst_shift,
+        'quantized': quantized,
+    }
+
+
+def generate_chain(length, dependent, max_dim=MAX_DIM, dims=None):
     """
-    使用 CMSIS-NN 公式对整个 acc 数组做 requant：
-      output = (acc * mult + (1 << (shift-1))) / 2^shift
-    其中 / 是算术右移。
+    生成 length 层连续矩阵乘法。dependent 为 True 时各层首尾相接：第 i+1 层的 lhs 即第 i 层的量化输出
+    （K 不变，N 等于上一层的 M）；否则各层数据互相独立。dims=(K, N, M) 时各层使用固定尺寸
+    （相接的链中第 i>0 层为 K x M x M）。返回的各层预期输出即整条链的参考结果。
     """
-    acc_int64 = acc.astype(np.int64)
-    prod = acc_int64 * int(mult)
-    if shift > 0:
-        # 加上舍入项 (1 << (shift-1))
-        prod = prod + (1 << (shift - 1))
-        prod = prod >> shift
-    # shift == 0 时，直接使用 prod
-    prod = np.clip(prod, -128, 127)
-    return prod.astype(np.int8)
-
-# 根据结果范围计算 dst_mult / dst_shift
-dst_mult, dst_shift = compute_requant_params(result)
-
-# 使用同样公式生成预期输出
-quantized = requantize_array(result, dst_mult, dst_shift)
-
-# 输出目录：./eai_csrc
-out_dir = "/home/etc/FPGA/e203_simulator/eai_csrc"
-os.makedirs(out_dir, exist_ok=True)
-c_path = os.path.join(out_dir, "test_case.c")
-h_path = os.path.join(out_dir, "test_case.h")
-debug_path = os.path.join(out_dir, "debug_output.txt")
-
-# 生成调试文件：未经量化的累加结果 (int32)
-with open(debug_path, 'w') as f:
+    if not dependent:
+        return [generate_case(max_dim, dims) for _ in range(length)]
+    layers = [generate_case(max_dim, dims)]
+    for _ in range(length - 1):
+        prev = layers[-1]
+        M = dims[2] if dims is not None else random.randint(MIN_DIM, max_dim)
+        layers.append(generate_case(dims=(prev['K'], prev['M'], M), lhs=prev['quantized']))
+    return layers
+
+
+def write_debug(f, case):
+    """写入一组用例的未量化累加结果 (int32)"""
+    K, N, M = case['K'], case['N'], case['M']
+    result = case['result']
     f.write(f"未经量化的矩阵乘法中间结果 (K={K}, N={N}, M={M})\n")
     f.write("格式: int32 矩阵，每行对应输出的一行\n\n")
     for i in range(K):
         row_str = ' '.join(f'{result[i, j]:8d}' for j in range(M))
         f.write(f"行 {i}: {row_str}\n")
-    f.write(f"\n量化参数: dst_mult={dst_mult}, dst_shift={dst_shift}\n")
-
-# 生成C文件
-with open(c_path, 'w') as f:
-    f.write('#include "test_case.h"\n\n')
-    # LHS
-    f.write('// LHS data (K x N)\n')
-    f.write('int8_t lhs_data[{}] = {{\n'.format(K * N))
-    for i in range(K * N):
-        f.write(f'  {int(lhs.flatten()[i])}')
-        if i < K * N - 1:
-            f.write(',')
-        if (i + 1) % N == 0:
-            f.write('\n')
-        else:
-            f.write(' ')
-    f.write('};\n\n')
-
-    # RHS
-    f.write('// RHS data (N x M, column-major)\n')
-    f.write('int8_t rhs_data[{}] = {{\n'.format(N * M))
-    rhs_flat = rhs.flatten(order='F')  # 列展平
-    for i in range(N * M):
-        f.write(f'  {int(rhs_flat[i])}')
-        if i < N * M - 1:
-            f.write(',')
-        if (i + 1) % N == 0:  # 每列 N 个元素后换行（列优先）
-            f.write('\n')
-        else:
-            f.write(' ')
-    f.write('};\n\n')
+    f.write(f"\n量化参数: dst_mult={case['dst_mult']}, dst_shift={case['dst_shift']}\n")
+
+
+def array_sizes(case, reserve):
+    """各数组的声明长度：--reserve 模式按最大尺寸预留，否则按实际尺寸"""
+    K, N, M = case['K'], case['N'], case['M']
+    if reserve:
+        K = N = M = MAX_DIM
+    return {'lhs': K * N, 'rhs': N * M, 'bias': M, 'dst': K * M}
+
+
+def case_data_bytes(K, N, M):
+    """一组用例在 .test_case_data 中占用的字节数（lhs + rhs + bias + expected，按 4 字节对齐）"""
+    return sum((n + 3) & ~3 for n in (K * N, N * M, 4 * M, K * M))
+
+
+def batch_max_dim(count, dst=False):
+    """
+    批量模式下单个用例的尺寸上限：保证 count 组用例的数据能放进 BATCH_DATA_BUDGET；
+    dst 为 True 时每组另有独立的 K x M 输出缓冲区（--chain）
+    """
+    dim = MAX_DIM
+    while dim > MIN_DIM and count * (case_data_bytes(dim, dim, dim) + dst * dim * dim) > BATCH_DATA_BUDGET:
+        dim -= 1
+    return dim
+
+
+def max_batch(dst=False):
+    """BATCH_DATA_BUDGET 最多能容纳的用例数（均取 MIN_DIM）；超过它时 batch_max_dim() 也放不下，dst 同 batch_max_dim()"""
+    return BATCH_DATA_BUDGET // (case_data_bytes(MIN_DIM, MIN_DIM, MIN_DIM) + dst * MIN_DIM * MIN_DIM)
+
+
+def write_case_data(f, case, sizes, attr, suffix='', lhs=True, place=None, expected=True):
+    """
+    写入一组用例的 lhs/rhs/bias/expected 数组，数组名带 suffix；lhs 为 False 时不写 lhs（由上一层输出提供），
+    place 指定了区域的操作数放入对应段（--place），expected 为 False 时不写预期输出（--dump-dst，由主机比较）
+    """
+    lhs_attr, rhs_attr, bias_attr = (place_attr(place, op, attr) for op in ('lhs', 'rhs', 'bias'))
+    N, M = case['N'], case['M']
+    rhs, bias = case['rhs'], case['bias']
+    quantized = case['quantized']
+    if is_strided(case):
+        # --strided：lhs 逐行、rhs 逐列放入带填充的缓冲区，视图起点为缓冲区内的字节偏移
+        layout, buf_sizes = case_layout(case), buffer_sizes(case)
+        f.write('// LHS data (K x N), row stride {} B, offset {} B\n'.format(layout['lhs_stride'], layout['lhs_offset']))
+        write_c_array(f, 'int8_t lhs_data{}[{}]{}'.format(suffix, buf_sizes['lhs'], lhs_attr),
+                      padded_buffer(case['lhs'], layout['lhs_stride'], layout['lhs_offset']).view(np.int8), 16)
+        f.write('// RHS data (N x M, column-major), column stride {} B, offset {} B\n'.format(
+            layout['rhs_stride'], layout['rhs_offset']))
+        write_c_array(f, 'int8_t rhs_data{}[{}]{}'.format(suffix, buf_sizes['rhs'], rhs_attr),
+                      padded_buffer(rhs, layout['rhs_stride'], layout['rhs_offset'], order='F').view(np.int8), 16)
+    else:
+        # LHS
+        if lhs:
+            f.write('// LHS data (K x N)\n')
+            write_c_array(f, 'int8_t lhs_data{}[{}]{}'.format(suffix, sizes['lhs'], lhs_attr), case['lhs'], N)
+
+        # RHS
+        f.write('// RHS data (N x M, column-major)\n')
+        # 列展平，每列 N 个元素后换行（列优先）
+        write_c_array(f, 'int8_t rhs_data{}[{}]{}'.format(suffix, sizes['rhs'], rhs_attr), rhs, N, order='F')
 
     # Bias
     f.write('// Bias data (length M)\n')
-    f.write('int32_t bias_data[{}] = {{\n'.format(M))
-    for i in range(M):
-        f.write(f'  {int(bias[i])}')
-        if i < M - 1:
-            f.write(',')
-        f.write('\n' if (i + 1) % M == 0 else ' ')
-    f.write('};\n\n')
+    write_c_array(f, 'int32_t bias_data{}[{}]{}'.format(suffix, sizes['bias'], bias_attr), bias, M)
 
     # Expected DST
-    f.write('// Expected DST data (K x M)\n')
-    f.write('int8_t expected_dst_data[{}] = {{\n'.format(K * M))
-    for i in range(K * M):
-        f.write(f'  {int(quantized.flatten()[i])}')
-        if i < K * M - 1:
-            f.write(',')
-        if (i + 1) % M == 0:
-            f.write('\n')
-        else:
-            f.write(' ')
-    f.write('};\n\n')
-
-    # 输出缓冲区（由 Python 固定大小生成）
-    f.write('// DST buffer (K x M), used as output buffer\n')
-    f.write('int8_t dst_data[{}];\n\n'.format(K * M))
-
-    # Config
-    f.write('// Auto-generated matmul config\n')
-    f.write('dsa_matmul_config_t test_config = {\n')
-    f.write('  .lhs_ptr = lhs_data,\n')
-    f.write('  .rhs_ptr = rhs_data,\n')
-    f.write('  .dst_ptr = dst_data,\n')
-    f.write('  .bias_ptr = bias_data,\n')
-    f.write('  .K = %d,\n' % K)
-    f.write('  .N = %d,\n' % N)
-    f.write('  .M = %d,\n' % M)
-    f.write('  .lhs_row_stride = %d,\n' % N)  # 连续行
-    f.write('  .rhs_row_stride = %d,\n' % N)  # 连续行
-    f.write('  .dst_row_stride = %d,\n' % M)  # 连续行
+    if expected:
+        f.write('// Expected DST data (K x M)\n')
+        write_c_array(f, 'int8_t expected_dst_data{}[{}]{}'.format(suffix, sizes['dst'], attr), quantized, M)
+
+
+def write_case_arrays(f, case, attr, suffix='', expected=True):
+    """多用例C文件中一组用例的数组（test_case_cli.write_batch_c_file 调用）"""
+    write_case_data(f, case, array_sizes(case, False), attr, suffix=suffix, expected=expected)
+
+
+def write_config_fields(f, case, suffix='', indent='  ', lhs_ptr=None, dst_ptr='dst_data'):
+    """写入 dsa_matmul_config_t 初始化列表中的各字段；lhs_ptr 默认为 lhs_data<suffix>"""
+    K, N, M = case['K'], case['N'], case['M']
+    if is_strided(case):
+        # --strided：指针为缓冲区内的视图起点，步长含行间填充
+        layout = case_layout(case)
+        f.write(f'{indent}.lhs_ptr = lhs_data{suffix} + %d,\n' % layout['lhs_offset'])
+        f.write(f'{indent}.rhs_ptr = rhs_data{suffix} + %d,\n' % layout['rhs_offset'])
+        f.write(f'{indent}.dst_ptr = {dst_ptr} + %d,\n' % layout['dst_offset'])
+    else:
+        f.write(f'{indent}.lhs_ptr = {lhs_ptr or "lhs_data" + suffix},\n')
+        f.write(f'{indent}.rhs_ptr = rhs_data{suffix},\n')
+        f.write(f'{indent}.dst_ptr = {dst_ptr},\n')
+    f.write(f'{indent}.bias_ptr = bias_data{suffix},\n')
+    f.write(f'{indent}.K = %d,\n' % K)
+    f.write(f'{indent}.N = %d,\n' % N)
+    f.write(f'{indent}.M = %d,\n' % M)
+    layout = case_layout(case)  # 默认为连续行
+    f.write(f'{indent}.lhs_row_stride = %d,\n' % layout['lhs_stride'])
+    f.write(f'{indent}.rhs_row_stride = %d,\n' % layout['rhs_stride'])
+    f.write(f'{indent}.dst_row_stride = %d,\n' % layout['dst_stride'])
     # 数据类型
-    f.write('  .lhs_dtype = DSA_DTYPE_S8,\n')
-    f.write('  .rhs_dtype = DSA_DTYPE_S8,\n')
-    f.write('  .bias_dtype = DSA_DTYPE_S32,\n')
-    f.write('  .out_dtype = DSA_DTYPE_S8,\n')
+    f.write(f'{indent}.lhs_dtype = DSA_DTYPE_S8,\n')
+    f.write(f'{indent}.rhs_dtype = DSA_DTYPE_S8,\n')
+    f.write(f'{indent}.bias_dtype = DSA_DTYPE_S32,\n')
+    f.write(f'{indent}.out_dtype = DSA_DTYPE_S8,\n')
     # 量化模式与零点
-    f.write('  .quant_mode = DSA_QUANT_PER_TENSOR,\n')
-    f.write('  .lhs_offset = 0,\n')
-    f.write('  .rhs_offset = 0,\n')
-    f.write('  .dst_offset = 0,\n')
+    f.write(f'{indent}.quant_mode = DSA_QUANT_PER_TENSOR,\n')
+    f.write(f'{indent}.lhs_offset = 0,\n')
+    f.write(f'{indent}.rhs_offset = 0,\n')
+    f.write(f'{indent}.dst_offset = 0,\n')
     # per-tensor 量化
-    f.write('  .dst_mult = %d,\n' % dst_mult)
-    f.write('  .dst_shift = %d,\n' % dst_shift)
+    f.write(f'{indent}.dst_mult = %d,\n' % case['dst_mult'])
+    f.write(f'{indent}.dst_shift = %d,\n' % case['dst_shift'])
     # per-channel 量化指针（未使用）
-    f.write('  .dst_mult_ptr = NULL,\n')
-    f.write('  .dst_shift_ptr = NULL,\n')
+    f.write(f'{indent}.dst_mult_ptr = NULL,\n')
+    f.write(f'{indent}.dst_shift_ptr = NULL,\n')
     # 激活范围
-    f.write('  .act_min = -128,\n')
-    f.write('  .act_max = 127,\n')
-    f.write('};\n')
-
-# 生成头文件
-with open(h_path, 'w') as f:
-    f.write('#ifndef TEST_CASE_H\n')
-    f.write('#define TEST_CASE_H\n\n')
-    f.write('#include <stdint.h>\n')
-    f.write('#include "dsa_accel.h"\n\n')
-    f.write('extern int8_t lhs_data[%d];\n' % (K * N))
-    f.write('extern int8_t rhs_data[%d];\n' % (N * M))
-    f.write('extern int32_t bias_data[%d];\n' % M)
-    f.write('extern int8_t expected_dst_data[%d];\n' % (K * M))
-    f.write('extern int8_t dst_data[%d];\n' % (K * M))
-    f.write('extern dsa_matmul_config_t test_config;\n\n')
-    f.write('#endif // TEST_CASE_H\n')
+    f.write(f'{indent}.act_min = -128,\n')
+    f.write(f'{indent}.act_max = 127,\n')
+
+
+def write_c_file(case, c_path, reserve=False, operands=True, place=None, expected=True):
+    """
+    生成C文件；operands 为 False 时操作数由 --bin 的 .incbin 汇编桩提供，这里只写配置；
+    place 为 --place 指定的各操作数区域，expected 为 False 时不写预期输出（--dump-dst）
+    """
+    sizes = array_sizes(case, reserve)
+    # 保留段模式下数据放入 .test_case_data，供 split_memory.py --patch 直接改写
+    attr = ' TEST_CASE_SECTION' if reserve else (ALIGNED_ATTR if is_strided(case) else '')
+    with open(c_path, 'w') as f:
+        f.write('#include "test_case.h"\n\n')
+        if reserve:
+            f.write('#define TEST_CASE_SECTION __attribute__((section("%s"), aligned(4)))\n\n' % TEST_CASE_SECTION)
+        if operands:
+            write_case_data(f, case, sizes, attr, place=place, expected=expected)
+        else:
+            f.write('// Operand data is linked from *.bin by test_case_data.S\n\n')
+
+        # 输出缓冲区（由 Python 固定大小生成）
+        if is_strided(case):
+            f.write('// DST buffer (K x M view with row stride and offset), used as output buffer\n')
+            f.write('int8_t dst_data[{}]{};\n\n'.format(buffer_sizes(case)['dst'],
+                                                          place_attr(place, 'dst', ALIGNED_ATTR)))
+        else:
+            f.write('// DST buffer (K x M), used as output buffer\n')
+            f.write('int8_t dst_data[{}]{};\n\n'.format(sizes['dst'], place_attr(place, 'dst')))
+
+        # Config
+        f.write('// Auto-generated matmul config\n')
+        f.write('dsa_matmul_config_t test_config{} = {{\n'.format(attr))
+        write_config_fields(f, case)
+        f.write('};\n')
+
+
+def write_chain_c_file(layers, c_path, dependent):
+    """
+    生成连续矩阵乘法链的C文件：各层数据在 .test_case_data 段，每层有独立的输出缓冲区 chain_dst_<i>，
+    相接的链中第 i+1 层的 lhs_ptr 指向 chain_dst_<i>，test_main.c 依次（或连续发射）执行 test_configs[]。
+    """
+    count = len(layers)
+    attr = ' TEST_CASE_SECTION'
+    with open(c_path, 'w') as f:
+        f.write('#include "test_case.h"\n\n')
+        f.write('#define TEST_CASE_SECTION __attribute__((section("%s"), aligned(4)))\n\n' % TEST_CASE_SECTION)
+        for idx, case in enumerate(layers):
+            f.write(f'// ===== Layer {idx}: K={case["K"]}, N={case["N"]}, M={case["M"]} =====\n')
+            write_case_data(f, case, array_sizes(case, False), attr, suffix=f'_{idx}',
+                            lhs=not (dependent and idx > 0))
+
+        # 各层的输出缓冲区，相接的链中同时作为下一层的输入
+        f.write('// Per-layer DST buffers (K x M)\n')
+        for idx, case in enumerate(layers):
+            f.write('int8_t chain_dst_{}[{}] __attribute__((aligned(4)));\n'.format(idx, case['K'] * case['M']))
+        f.write('\n')
+        f.write('int8_t *const chain_dst_ptrs[{}] = {{\n'.format(count))
+        for idx in range(count):
+            f.write(f'  chain_dst_{idx},\n')
+        f.write('};\n\n')
+
+        # 各层的期望输出
+        f.write('const int8_t *const expected_dst_ptrs[{}] = {{\n'.format(count))
+        for idx in range(count):
+            f.write(f'  expected_dst_data_{idx},\n')
+        f.write('};\n\n')
+
+        # Configs
+        f.write('// Auto-generated matmul configs\n')
+        f.write('dsa_matmul_config_t test_configs[{}]{} = {{\n'.format(count, attr))
+        for idx, case in enumerate(layers):
+            lhs_ptr = f'chain_dst_{idx - 1}' if dependent and idx > 0 else None
+            f.write('  {\n')
+            write_config_fields(f, case, suffix=f'_{idx}', indent='    ', lhs_ptr=lhs_ptr, dst_ptr=f'chain_dst_{idx}')
+            f.write('  },\n')
+        f.write('};\n')
+
+
+def write_h_file(case, h_path, reserve=False, expected=True):
+    """生成头文件；expected 为 False 时定义 TEST_DUMP_DST，test_main.c 不在固件中比较输出"""
+    sizes = array_sizes(case, reserve)
+    expected_size = sizes['dst']
+    if is_strided(case):
+        sizes.update(buffer_sizes(case))  # --strided：lhs/rhs/dst 为带填充的缓冲区（字节）
+    with open(h_path, 'w') as f:
+        f.write('#ifndef TEST_CASE_H\n')
+        f.write('#define TEST_CASE_H\n\n')
+        f.write('#include <stdint.h>\n')
+        f.write('#include "dsa_accel.h"\n\n')
+        if not expected:
+            f.write('#define TEST_DUMP_DST 1\n\n')
+        f.write('extern int8_t lhs_data[%d];\n' % sizes['lhs'])
+        f.write('extern int8_t rhs_data[%d];\n' % sizes['rhs'])
+        f.write('extern int32_t bias_data[%d];\n' % sizes['bias'])
+        if expected:
+            f.write('extern int8_t expected_dst_data[%d];\n' % expected_size)
+        f.write('extern int8_t dst_data[%d];\n' % sizes['dst'])
+        f.write('extern dsa_matmul_config_t test_config;\n\n')
+        f.write('#endif // TEST_CASE_H\n')
+
+
+def write_chain_h_file(layers, h_path, dependent):
+    """生成连续矩阵乘法链的头文件：定义 TEST_CHAIN_LEN，test_main.c 据此测量连续发射的吞吐"""
+    count = len(layers)
+    with open(h_path, 'w') as f:
+        f.write('#ifndef TEST_CASE_H\n')
+        f.write('#define TEST_CASE_H\n\n')
+        f.write('#include <stdint.h>\n')
+        f.write('#include "dsa_accel.h"\n\n')
+        f.write('#define TEST_CHAIN_LEN %d\n' % count)
+        f.write('#define TEST_CHAIN_DEPENDENT %d\n\n' % int(dependent))
+        f.write('extern int8_t *const chain_dst_ptrs[TEST_CHAIN_LEN];\n')
+        f.write('extern const int8_t *const expected_dst_ptrs[TEST_CHAIN_LEN];\n')
+        f.write('extern dsa_matmul_config_t test_configs[TEST_CHAIN_LEN];\n\n')
+        f.write('#endif // TEST_CASE_H\n')
+
+
+def generate_cases(args):
+    """随机生成 --batch 组用例，或 --chain 层连续矩阵乘法（test_case_cli.load_cases 调用）"""
+    if args.chain is not None:
+        return generate_chain(args.chain, args.chain_mode == "dependent", batch_max_dim(args.chain, dst=True))
+    max_dim = batch_max_dim(args.batch) if args.batch > 1 else MAX_DIM
+    return [generate_case(max_dim) for _ in range(args.batch)]
+
+
+def main():
+    parser = build_parser("随机生成 int8 矩阵乘法测试用例 (test_case.c/.h)")
+    parser.add_argument("--chain", type=int, metavar="L",
+                        help="生成 L 层连续矩阵乘法，固件分别逐条执行与连续发射并统计周期数")
+    parser.add_argument("--chain-mode", choices=("dependent", "independent"), default="dependent",
+                        help="dependent：上一层输出作为下一层 lhs（默认）；independent：各层数据独立")
+    args = parser.parse_args()
+    gen = sys.modules[__name__]
+    place = check_options(parser, args, gen)
+    if args.chain is not None and (args.chain < 1 or args.batch > 1 or args.reserve or args.patch_out or args.bin
+                                   or args.strided or args.dump_dst):
+        parser.error("--chain 必须 >= 1，且不能与 --batch/--reserve/--patch-out/--bin/--strided/--dump-dst 同时使用")
+    if not args.from_archive and args.chain is not None and args.chain > max_batch(dst=True):
+        parser.error(f"--chain 最多为 {max_batch(dst=True)}：更多层即使取最小尺寸 {MIN_DIM} "
+                     f"也放不进 BATCH_DATA_BUDGET（{BATCH_DATA_BUDGET} 字节）")
+
+    seed, meta, cases, place = load_cases(parser, args, gen, place, generate_cases)
+    if args.from_archive:
+        chain = meta.get('chain')
+    else:
+        chain = args.chain_mode if args.chain is not None else None
+    check_cases(parser, args, cases, place, chain)
+    record_cases(args, cases, seed, gen, place, chain=chain)
+
+    if chain:
+        os.makedirs(args.out_dir, exist_ok=True)
+        remove_bin_outputs(args.out_dir)
+        write_debug_file(cases, os.path.join(args.out_dir, "debug_output.txt"), write_debug)
+        write_chain_c_file(cases, os.path.join(args.out_dir, "test_case.c"), chain == "dependent")
+        write_chain_h_file(cases, os.path.join(args.out_dir, "test_case.h"), chain == "dependent")
+        return
+    write_outputs(args, cases, place, gen)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,118 +1,90 @@
 import numpy as np
-import os
 import random
+import sys
 
-# 随机生成矩阵尺寸 (128~256)
-K = random.randint(16, 256)
-N = random.randint(16, 256)
-M = random.randint(16, 256)
+from c_array import write_c_array
+from requant import compute_requant_params, compute_requant_params_per_channel, requantize_array
+from test_case_cli import build_parser, check_cases, check_options, load_cases, record_cases, write_outputs
+from test_case_layout import ALIGNED_ATTR, buffer_sizes, case_layout, is_strided, padded_buffer
+from test_case_place import place_attr
+from test_case_patch import TEST_CASE_SECTION
 
-# 随机选择 lhs 数据类型
-lhs_dtype = random.choice([1, 2])  # 1: S8, 2: S16
+# 随机尺寸范围，--reserve 模式按上限预留 .test_case_data 段空间
+MIN_DIM = 16
+MAX_DIM = 256
+# lhs 最大为 S16，保留段按字节预留，S8/S16 用例共用同一段空间
+LHS_RESERVE_BYTES = MAX_DIM * MAX_DIM * 2
 
-# 随机生成 lhs (A)、rhs (B) 的 int8/int16 内容
-if lhs_dtype == 1:  # S8
-    lhs = np.random.randint(-128, 128, size=(K, N), dtype=np.int8)
-else:  # S16
-    lhs = np.random.randint(-32768, 32768, size=(K, N), dtype=np.int16)
-rhs = np.random.randint(-128, 128, size=(N, M), dtype=np.int8)
+# --batch 模式下所有用例数据（.test_case_data，位于 512K 的 extram）的总预算，
+# 其余空间留给 .rodata、共用的 dst_data 及 .bss
+BATCH_DATA_BUDGET = 320 * 1024
 
-# 随机生成 bias (int32)
-bias = np.random.randint(-10000, 10000, size=M, dtype=np.int32)
-# bias 随机或为 0，这里先简单设为 0
-# bias = np.zeros(M, dtype=np.int32)
 
-# 计算累加结果 (int32)
-sum_result = np.dot(lhs.astype(np.int32), rhs.astype(np.int32))  # [K, M]
-result = sum_result + bias  # broadcasting
-
-# 随机选择量化模式
-quant_mode = random.choice([0, 1])  # 0: per-tensor, 1: per-channel
-
-def compute_requant_params(acc: np.ndarray):
-    """
-    根据累加结果范围，生成 dst_mult 和 dst_shift，使得
-      output = (acc * dst_mult + (1 << (shift-1))) >> shift
-    落在 int8 范围内且不完全溢出。
-    """
-    acc_min = int(acc.min())
-    acc_max = int(acc.max())
-    max_abs = max(abs(acc_min), abs(acc_max))
-    if max_abs == 0:
-        # 全 0，任意量化都行，返回恒等
-        return 1, 0
-
-    # 我们使用右移 (shift >= 0)，不进行小数放大，保证简单可靠
-    # 目标：max_abs * mult / 2^shift <= 127 且 mult 尽量大
-    # 先枚举适当范围的 shift，选出最大的 mult
-    best_mult = 1
-    best_shift = 0
-    max_shift = 31  # int32 足够
-    for s in range(max_shift + 1):
-        # mult <= 127 * 2^s / max_abs
-        num = 127 * (1 << s)
-        mult = num // max_abs  # floor
-        if mult < 1:
-            continue
-        # 记录 mult 最大的组合
-        if mult > best_mult:
-            best_mult = mult
-            best_shift = s
-
-    return int(best_mult), int(best_shift)
-
-def compute_requant_params_per_channel(acc: np.ndarray, axis=1):
+def generate_case(max_dim=MAX_DIM, dims=None, lhs_dtype=None, quant_mode=None):
     """
-    Per-channel 量化参数计算，返回 mults 和 shifts 数组。
+    随机生成一组测试数据（随机 lhs 位宽与量化模式）及其预期输出；dims=(K, N, M) 时使用固定尺寸，
+    lhs_dtype / quant_mode 给定时使用固定值（bench_mma.py 扫描用）
     """
-    if axis == 1:  # per-channel on M
-        mults = np.zeros(acc.shape[1], dtype=np.int32)
-        shifts = np.zeros(acc.shape[1], dtype=np.int32)
-        for j in range(acc.shape[1]):
-            mult, shift = compute_requant_params(acc[:, j])
-            mults[j] = mult
-            shifts[j] = shift
-        return mults, shifts
+    if dims is not None:
+        K, N, M = dims
     else:
-        raise ValueError("Unsupported axis")
+        # 随机生成矩阵尺寸 (16~max_dim)
+        K = random.randint(MIN_DIM, max_dim)
+        N = random.randint(MIN_DIM, max_dim)
+        M = random.randint(MIN_DIM, max_dim)
 
-def requantize_array(acc: np.ndarray, mults, shifts) -> np.ndarray:
-    """
-    使用 CMSIS-NN 公式对整个 acc 数组做 requant：
-      output = (acc * mult + (1 << (shift-1))) / 2^shift
-    支持 mults 和 shifts 为标量或数组（广播）。
-    """
-    acc_int64 = acc.astype(np.int64)
-    mults = np.broadcast_to(mults, acc.shape).astype(np.int64)
-    shifts = np.broadcast_to(shifts, acc.shape).astype(np.int32)
-    prod = acc_int64 * mults
-    mask = shifts > 0
-    if np.any(mask):
-        prod[mask] += (1 << (shifts[mask] - 1))
-        prod[mask] >>= shifts[mask]
-    prod = np.clip(prod, -128, 127)
-    return prod.astype(np.int8)
-
-# 根据结果范围计算 dst_mult / dst_shift
-if quant_mode == 0:  # per-tensor
-    dst_mult, dst_shift = compute_requant_params(result)
-    dst_mults = dst_mult
-    dst_shifts = dst_shift
-else:  # per-channel
-    dst_mults, dst_shifts = compute_requant_params_per_channel(result, axis=1)
-
-# 使用同样公式生成预期输出
-quantized = requantize_array(result, dst_mults, dst_shifts)
-
-# 输出目录：./eai_csrc
-out_dir = "/home/etc/FPGA/e203_simulator/eai_csrc"
-os.makedirs(out_dir, exist_ok=True)
-c_path = os.path.join(out_dir, "test_case.c")
-h_path = os.path.join(out_dir, "test_case.h")
-debug_path = os.path.join(out_dir, "debug_output.txt")
-
-# 生成调试文件：未经量化的累加结果 (int32)
-with open(debug_path, 'w') as f:
+    # 随机选择 lhs 数据类型
+    if lhs_dtype is None:
+        lhs_dtype = random.choice([1, 2])  # 1: S8, 2: S16
+
+    # 随机生成 lhs (A)、rhs (B) 的 int8/int16 内容
+    if lhs_dtype == 1:  # S8
+        lhs = np.random.randint(-128, 128, size=(K, N), dtype=np.int8)
+    else:  # S16
+        lhs = np.random.randint(-32768, 32768, size=(K, N), dtype=np.int16)
+    rhs = np.random.randint(-128, 128, size=(N, M), dtype=np.int8)
+
+    # 随机生成 bias (int32)
+    bias = np.random.randint(-10000, 10000, size=M, dtype=np.int32)
+    # bias 随机或为 0，这里先简单设为 0
+    # bias = np.zeros(M, dtype=np.int32)
+
+    # 计算累加结果 (int32)
+    sum_result = np.dot(lhs.astype(np.int32), rhs.astype(np.int32))  # [K, M]
+    result = sum_result + bias  # broadcasting
+
+    # 随机选择量化模式
+    if quant_mode is None:
+        quant_mode = random.choice([0, 1])  # 0: per-tensor, 1: per-channel
+
+    # 根据结果范围计算 dst_mult / dst_shift
+    if quant_mode == 0:  # per-tensor
+        dst_mult, dst_shift = compute_requant_params(result)
+        dst_mults = dst_mult
+        dst_shifts = dst_shift
+    else:  # per-channel
+        dst_mult, dst_shift = 0, 0
+        dst_mults, dst_shifts = compute_requant_params_per_channel(result, axis=1)
+
+    # 使用同样公式生成预期输出
+    quantized = requantize_array(result, dst_mults, dst_shifts)
+
+    return {
+        'K': K, 'N': N, 'M': M,
+        'lhs_dtype': lhs_dtype, 'quant_mode': quant_mode,
+        'lhs': lhs, 'rhs': rhs, 'bias': bias,
+        'result': result,
+        'dst_mult': dst_mult, 'dst_shift': dst_shift,
+        'dst_mults': dst_mults, 'dst_shifts': dst_shifts,
+        'quantized': quantized,
+    }
+
+
+def write_debug(f, case):
+    """写入一组用例的未量化累加结果 (int32) 与量化参数"""
+    K, N, M = case['K'], case['N'], case['M']
+    result = case['result']
+    quant_mode = case['quant_mode']
     f.write(f"未经量化的矩阵乘法中间结果 (K={K}, N={N}, M={M})\n")
     f.write("格式: int32 矩阵，每行对应输出的一行\n\n")
     for i in range(K):
@@ -120,148 +92,231 @@ with open(debug_path, 'w') as f:
         f.write(f"行 {i}: {row_str}\n")
     f.write(f"\n量化模式: {'per-tensor' if quant_mode == 0 else 'per-channel'}\n")
     if quant_mode == 0:
-        f.write(f"量化参数: dst_mult={dst_mult}, dst_shift={dst_shift}\n")
+        f.write(f"量化参数: dst_mult={case['dst_mult']}, dst_shift={case['dst_shift']}\n")
     else:
         f.write("量化参数 (per-channel):\n")
         for j in range(M):
-            f.write(f"  通道 {j}: dst_mult={dst_mults[j]}, dst_shift={dst_shifts[j]}\n")
+            f.write(f"  通道 {j}: dst_mult={case['dst_mults'][j]}, dst_shift={case['dst_shifts'][j]}\n")
 
-# 生成C文件
-with open(c_path, 'w') as f:
-    f.write('#include "test_case.h"\n\n')
-    # LHS
+
+def array_sizes(case, reserve):
+    """各数组的声明长度：--reserve 模式按最大尺寸预留，否则按实际尺寸"""
+    K, N, M = case['K'], case['N'], case['M']
+    if reserve:
+        lhs_size = LHS_RESERVE_BYTES // (1 if case['lhs_dtype'] == 1 else 2)
+        K = N = M = MAX_DIM
+    else:
+        lhs_size = K * N
+    return {'lhs': lhs_size, 'rhs': N * M, 'bias': M, 'dst': K * M}
+
+
+def case_data_bytes(K, N, M):
+    """
+    一组用例在 .test_case_data 中占用的最大字节数（按 S16 lhs 与 per-channel
+    参数估计：lhs + rhs + bias/mult/shift + expected，按 4 字节对齐）
+    """
+    return sum((n + 3) & ~3 for n in (2 * K * N, N * M, 12 * M, K * M))
+
+
+def batch_max_dim(count):
+    """批量模式下单个用例的尺寸上限：保证 count 组用例的数据能放进 BATCH_DATA_BUDGET"""
+    dim = MAX_DIM
+    while dim > MIN_DIM and count * case_data_bytes(dim, dim, dim) > BATCH_DATA_BUDGET:
+        dim -= 1
+    return dim
+
+
+def max_batch():
+    """BATCH_DATA_BUDGET 最多能容纳的用例数（均取 MIN_DIM）；超过它时 batch_max_dim() 也放不下"""
+    return BATCH_DATA_BUDGET // case_data_bytes(MIN_DIM, MIN_DIM, MIN_DIM)
+
+
+def write_case_data(f, case, sizes, attr, suffix='', place=None, expected=True):
+    """
+    写入一组用例的 lhs/rhs/bias/expected 数组，数组名带 suffix；place 指定了区域的操作数放入对应段（--place），
+    expected 为 False 时不写预期输出（--dump-dst，由主机比较）
+    """
+    lhs_attr, rhs_attr, bias_attr = (place_attr(place, op, attr) for op in ('lhs', 'rhs', 'bias'))
+    N, M = case['N'], case['M']
+    lhs_dtype = case['lhs_dtype']
+    lhs, rhs, bias = case['lhs'], case['rhs'], case['bias']
+    quantized = case['quantized']
     lhs_type_str = 'int8_t' if lhs_dtype == 1 else 'int16_t'
-    f.write(f'// LHS data (K x N, {lhs_type_str})\n')
-    f.write(f'{lhs_type_str} lhs_data[{K * N}] = {{\n')
-    for i in range(K * N):
-        f.write(f'  {int(lhs.flatten()[i])}')
-        if i < K * N - 1:
-            f.write(',')
-        if (i + 1) % N == 0:
-            f.write('\n')
-        else:
-            f.write(' ')
-    f.write('};\n\n')
-
-    # RHS
-    f.write('// RHS data (N x M, column-major)\n')
-    f.write('int8_t rhs_data[{}] = {{\n'.format(N * M))
-    rhs_flat = rhs.flatten(order='F')  # 列展平
-    for i in range(N * M):
-        f.write(f'  {int(rhs_flat[i])}')
-        if i < N * M - 1:
-            f.write(',')
-        if (i + 1) % N == 0:  # 每列 N 个元素后换行（列优先）
-            f.write('\n')
-        else:
-            f.write(' ')
-    f.write('};\n\n')
+    if is_strided(case):
+        # --strided：lhs 逐行、rhs 逐列按小端字节放入带填充的缓冲区，视图起点为缓冲区内的字节偏移
+        layout, buf_sizes = case_layout(case), buffer_sizes(case)
+        f.write('// LHS data (K x N, {} as bytes), row stride {} B, offset {} B\n'.format(
+            lhs_type_str, layout['lhs_stride'], layout['lhs_offset']))
+        write_c_array(f, 'int8_t lhs_data{}[{}]{}'.format(suffix, buf_sizes['lhs'], lhs_attr),
+                      padded_buffer(lhs, layout['lhs_stride'], layout['lhs_offset']).view(np.int8), 16)
+        f.write('// RHS data (N x M, column-major), column stride {} B, offset {} B\n'.format(
+            layout['rhs_stride'], layout['rhs_offset']))
+        write_c_array(f, 'int8_t rhs_data{}[{}]{}'.format(suffix, buf_sizes['rhs'], rhs_attr),
+                      padded_buffer(rhs, layout['rhs_stride'], layout['rhs_offset'], order='F').view(np.int8), 16)
+    else:
+        # LHS
+        f.write(f'// LHS data (K x N, {lhs_type_str})\n')
+        write_c_array(f, f'{lhs_type_str} lhs_data{suffix}[{sizes["lhs"]}]{lhs_attr}', lhs, N)
+
+        # RHS
+        f.write('// RHS data (N x M, column-major)\n')
+        # 列展平，每列 N 个元素后换行（列优先）
+        write_c_array(f, 'int8_t rhs_data{}[{}]{}'.format(suffix, sizes['rhs'], rhs_attr), rhs, N, order='F')
 
     # Bias
     f.write('// Bias data (length M)\n')
-    f.write('int32_t bias_data[{}] = {{\n'.format(M))
-    for i in range(M):
-        f.write(f'  {int(bias[i])}')
-        if i < M - 1:
-            f.write(',')
-        f.write('\n' if (i + 1) % M == 0 else ' ')
-    f.write('};\n\n')
+    write_c_array(f, 'int32_t bias_data{}[{}]{}'.format(suffix, sizes['bias'], bias_attr), bias, M)
 
     # Expected DST
-    f.write('// Expected DST data (K x M)\n')
-    f.write('int8_t expected_dst_data[{}] = {{\n'.format(K * M))
-    for i in range(K * M):
-        f.write(f'  {int(quantized.flatten()[i])}')
-        if i < K * M - 1:
-            f.write(',')
-        if (i + 1) % M == 0:
-            f.write('\n')
-        else:
-            f.write(' ')
-    f.write('};\n\n')
-
-    # 输出缓冲区（由 Python 固定大小生成）
-    f.write('// DST buffer (K x M), used as output buffer\n')
-    f.write('int8_t dst_data[{}];\n\n'.format(K * M))
-
-    # DST mult/shift data (per-channel)
-    if quant_mode == 1:
-        f.write('// DST mult data (length M, per-channel)\n')
-        f.write('int32_t dst_mult_data[{}] = {{\n'.format(M))
-        for i in range(M):
-            f.write(f'  {int(dst_mults[i])}')
-            if i < M - 1:
-                f.write(',')
-            f.write('\n')
-        f.write('};\n\n')
-
-        f.write('// DST shift data (length M, per-channel)\n')
-        f.write('int32_t dst_shift_data[{}] = {{\n'.format(M))
-        for i in range(M):
-            f.write(f'  {int(dst_shifts[i])}')
-            if i < M - 1:
-                f.write(',')
-            f.write('\n')
-        f.write('};\n\n')
-
-    # Config
-    f.write('// Auto-generated matmul config\n')
-    f.write('dsa_matmul_config_t test_config = {\n')
-    f.write('  .lhs_ptr = lhs_data,\n')
-    f.write('  .rhs_ptr = rhs_data,\n')
-    f.write('  .dst_ptr = dst_data,\n')
-    f.write('  .bias_ptr = bias_data,\n')
-    f.write('  .K = %d,\n' % K)
-    f.write('  .N = %d,\n' % N)
-    f.write('  .M = %d,\n' % M)
-    # 计算步进（字节）
-    lhs_row_stride = N * (1 if lhs_dtype == 1 else 2)
-    rhs_row_stride = N * 1  # rhs是int8_t
-    dst_row_stride = M * 1  # dst是int8_t
-    f.write('  .lhs_row_stride = %d,\n' % lhs_row_stride)
-    f.write('  .rhs_row_stride = %d,\n' % rhs_row_stride)
-    f.write('  .dst_row_stride = %d,\n' % dst_row_stride)
+    if expected:
+        f.write('// Expected DST data (K x M)\n')
+        write_c_array(f, 'int8_t expected_dst_data{}[{}]{}'.format(suffix, sizes['dst'], attr), quantized, M)
+
+
+def write_channel_params(f, case, sizes, attr, suffix='', place=None):
+    """写入 per-channel 的 dst_mult/dst_shift 数组（per-tensor 用例按标量广播），与 bias 放在同一区域"""
+    attr = place_attr(place, 'bias', attr)
+    M = case['M']
+    dst_mults = np.broadcast_to(case['dst_mults'], M)
+    dst_shifts = np.broadcast_to(case['dst_shifts'], M)
+    f.write('// DST mult data (length M, per-channel)\n')
+    write_c_array(f, 'int32_t dst_mult_data{}[{}]{}'.format(suffix, sizes['bias'], attr), dst_mults, 1)
+
+    f.write('// DST shift data (length M, per-channel)\n')
+    write_c_array(f, 'int32_t dst_shift_data{}[{}]{}'.format(suffix, sizes['bias'], attr), dst_shifts, 1)
+
+
+def write_case_arrays(f, case, attr, suffix='', expected=True):
+    """多用例C文件中一组用例的数组（test_case_cli.write_batch_c_file 调用），per-channel 用例另有 mult/shift"""
+    sizes = array_sizes(case, False)
+    write_case_data(f, case, sizes, attr, suffix=suffix, expected=expected)
+    if case['quant_mode'] == 1:
+        write_channel_params(f, case, sizes, attr, suffix=suffix)
+
+
+def write_config_fields(f, case, suffix='', indent='  '):
+    """写入 dsa_matmul_config_t 初始化列表中的各字段"""
+    K, N, M = case['K'], case['N'], case['M']
+    lhs_dtype, quant_mode = case['lhs_dtype'], case['quant_mode']
+    # 步进（字节）：默认为连续存放，--strided 时含行间填充，指针为缓冲区内的视图起点
+    layout = case_layout(case)
+    if is_strided(case):
+        f.write(f'{indent}.lhs_ptr = lhs_data{suffix} + %d,\n' % layout['lhs_offset'])
+        f.write(f'{indent}.rhs_ptr = rhs_data{suffix} + %d,\n' % layout['rhs_offset'])
+        f.write(f'{indent}.dst_ptr = dst_data + %d,\n' % layout['dst_offset'])
+    else:
+        f.write(f'{indent}.lhs_ptr = lhs_data{suffix},\n')
+        f.write(f'{indent}.rhs_ptr = rhs_data{suffix},\n')
+        f.write(f'{indent}.dst_ptr = dst_data,\n')
+    f.write(f'{indent}.bias_ptr = bias_data{suffix},\n')
+    f.write(f'{indent}.K = %d,\n' % K)
+    f.write(f'{indent}.N = %d,\n' % N)
+    f.write(f'{indent}.M = %d,\n' % M)
+    f.write(f'{indent}.lhs_row_stride = %d,\n' % layout['lhs_stride'])
+    f.write(f'{indent}.rhs_row_stride = %d,\n' % layout['rhs_stride'])
+    f.write(f'{indent}.dst_row_stride = %d,\n' % layout['dst_stride'])
     # 数据类型
     lhs_dtype_macro = 'DSA_DTYPE_S8' if lhs_dtype == 1 else 'DSA_DTYPE_S16'
-    f.write('  .lhs_dtype = %s,\n' % lhs_dtype_macro)
-    f.write('  .rhs_dtype = DSA_DTYPE_S8,\n')
-    f.write('  .bias_dtype = DSA_DTYPE_S32,\n')
-    f.write('  .out_dtype = DSA_DTYPE_S8,\n')
+    f.write(f'{indent}.lhs_dtype = %s,\n' % lhs_dtype_macro)
+    f.write(f'{indent}.rhs_dtype = DSA_DTYPE_S8,\n')
+    f.write(f'{indent}.bias_dtype = DSA_DTYPE_S32,\n')
+    f.write(f'{indent}.out_dtype = DSA_DTYPE_S8,\n')
     # 量化模式与零点
-    f.write('  .quant_mode = %d,\n' % quant_mode)
-    f.write('  .lhs_offset = 0,\n')
-    f.write('  .rhs_offset = 0,\n')
-    f.write('  .dst_offset = 0,\n')
+    f.write(f'{indent}.quant_mode = %d,\n' % quant_mode)
+    f.write(f'{indent}.lhs_offset = 0,\n')
+    f.write(f'{indent}.rhs_offset = 0,\n')
+    f.write(f'{indent}.dst_offset = 0,\n')
     # per-tensor 量化
     if quant_mode == 0:
-        f.write('  .dst_mult = %d,\n' % dst_mult)
-        f.write('  .dst_shift = %d,\n' % dst_shift)
-        f.write('  .dst_mult_ptr = NULL,\n')
-        f.write('  .dst_shift_ptr = NULL,\n')
+        f.write(f'{indent}.dst_mult = %d,\n' % case['dst_mult'])
+        f.write(f'{indent}.dst_shift = %d,\n' % case['dst_shift'])
+        f.write(f'{indent}.dst_mult_ptr = NULL,\n')
+        f.write(f'{indent}.dst_shift_ptr = NULL,\n')
     else:
-        f.write('  .dst_mult = 0,\n')
-        f.write('  .dst_shift = 0,\n')
-        f.write('  .dst_mult_ptr = dst_mult_data,\n')
-        f.write('  .dst_shift_ptr = dst_shift_data,\n')
+        f.write(f'{indent}.dst_mult = 0,\n')
+        f.write(f'{indent}.dst_shift = 0,\n')
+        f.write(f'{indent}.dst_mult_ptr = dst_mult_data{suffix},\n')
+        f.write(f'{indent}.dst_shift_ptr = dst_shift_data{suffix},\n')
     # 激活范围
-    f.write('  .act_min = -128,\n')
-    f.write('  .act_max = 127,\n')
-    f.write('};\n')
-
-# 生成头文件
-with open(h_path, 'w') as f:
-    f.write('#ifndef TEST_CASE_H\n')
-    f.write('#define TEST_CASE_H\n\n')
-    f.write('#include <stdint.h>\n')
-    f.write('#include "dsa_accel.h"\n\n')
-    lhs_type_str = 'int8_t' if lhs_dtype == 1 else 'int16_t'
-    f.write(f'extern {lhs_type_str} lhs_data[{K * N}];\n')
-    f.write('extern int8_t rhs_data[%d];\n' % (N * M))
-    f.write('extern int32_t bias_data[%d];\n' % M)
-    f.write('extern int8_t expected_dst_data[%d];\n' % (K * M))
-    f.write('extern int8_t dst_data[%d];\n' % (K * M))
-    if quant_mode == 1:
-        f.write('extern int32_t dst_mult_data[%d];\n' % M)
-        f.write('extern int32_t dst_shift_data[%d];\n' % M)
-    f.write('extern dsa_matmul_config_t test_config;\n\n')
-    f.write('#endif // TEST_CASE_H\n')
+    f.write(f'{indent}.act_min = -128,\n')
+    f.write(f'{indent}.act_max = 127,\n')
+
+
+def write_c_file(case, c_path, reserve=False, operands=True, place=None, expected=True):
+    """
+    生成C文件；operands 为 False 时操作数由 --bin 的 .incbin 汇编桩提供，这里只写配置；
+    place 为 --place 指定的各操作数区域，expected 为 False 时不写预期输出（--dump-dst）
+    """
+    sizes = array_sizes(case, reserve)
+    # 保留段模式下数据放入 .test_case_data，供 split_memory.py --patch 直接改写
+    attr = ' TEST_CASE_SECTION' if reserve else (ALIGNED_ATTR if is_strided(case) else '')
+    with open(c_path, 'w') as f:
+        f.write('#include "test_case.h"\n\n')
+        if reserve:
+            f.write('#define TEST_CASE_SECTION __attribute__((section("%s"), aligned(4)))\n\n' % TEST_CASE_SECTION)
+        if operands:
+            write_case_data(f, case, sizes, attr, place=place, expected=expected)
+        else:
+            f.write('// Operand data is linked from *.bin by test_case_data.S\n\n')
+
+        # 输出缓冲区（由 Python 固定大小生成）
+        if is_strided(case):
+            f.write('// DST buffer (K x M view with row stride and offset), used as output buffer\n')
+            f.write('int8_t dst_data[{}]{};\n\n'.format(buffer_sizes(case)['dst'],
+                                                          place_attr(place, 'dst', ALIGNED_ATTR)))
+        else:
+            f.write('// DST buffer (K x M), used as output buffer\n')
+            f.write('int8_t dst_data[{}]{};\n\n'.format(sizes['dst'], place_attr(place, 'dst')))
+
+        # DST mult/shift data (per-channel)
+        # 保留段模式下始终生成，后续补丁用例可能切换为 per-channel
+        if operands and (case['quant_mode'] == 1 or reserve):
+            write_channel_params(f, case, sizes, attr, place=place)
+
+        # Config
+        f.write('// Auto-generated matmul config\n')
+        f.write('dsa_matmul_config_t test_config{} = {{\n'.format(attr))
+        write_config_fields(f, case)
+        f.write('};\n')
+
+
+def write_h_file(case, h_path, reserve=False, expected=True):
+    """生成头文件；expected 为 False 时定义 TEST_DUMP_DST，test_main.c 不在固件中比较输出"""
+    sizes = array_sizes(case, reserve)
+    expected_size = sizes['dst']
+    if is_strided(case):
+        sizes.update(buffer_sizes(case))  # --strided：lhs/rhs/dst 为带填充的缓冲区（字节）
+    with open(h_path, 'w') as f:
+        f.write('#ifndef TEST_CASE_H\n')
+        f.write('#define TEST_CASE_H\n\n')
+        f.write('#include <stdint.h>\n')
+        f.write('#include "dsa_accel.h"\n\n')
+        if not expected:
+            f.write('#define TEST_DUMP_DST 1\n\n')
+        lhs_type_str = 'int8_t' if case['lhs_dtype'] == 1 or is_strided(case) else 'int16_t'
+        f.write(f'extern {lhs_type_str} lhs_data[{sizes["lhs"]}];\n')
+        f.write('extern int8_t rhs_data[%d];\n' % sizes['rhs'])
+        f.write('extern int32_t bias_data[%d];\n' % sizes['bias'])
+        if expected:
+            f.write('extern int8_t expected_dst_data[%d];\n' % expected_size)
+        f.write('extern int8_t dst_data[%d];\n' % sizes['dst'])
+        if case['quant_mode'] == 1 or reserve:
+            f.write('extern int32_t dst_mult_data[%d];\n' % sizes['bias'])
+            f.write('extern int32_t dst_shift_data[%d];\n' % sizes['bias'])
+        f.write('extern dsa_matmul_config_t test_config;\n\n')
+        f.write('#endif // TEST_CASE_H\n')
+
+
+def main():
+    parser = build_parser("随机生成 S8/S16 + per-tensor/per-channel 矩阵乘法测试用例")
+    args = parser.parse_args()
+    gen = sys.modules[__name__]
+    place = check_options(parser, args, gen)
+    seed, _, cases, place = load_cases(parser, args, gen, place)
+    check_cases(parser, args, cases, place)
+    record_cases(args, cases, seed, gen, place)
+    write_outputs(args, cases, place, gen)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+MMA 数据通路的逐位精确 Python 模型（rtl/subsys/eai/MMA）
+
+按硬件的分块与累加顺序计算 OA[K, M] = IA[K, N] x W[N, M] + bias 及 requant 输出：
+  ia_loader        lhs 读出后加 lhs_offset 的低 16 位，按 16 位回绕（S8 先符号扩展）
+  ws_systolic_array 每个 N tile（SA_SIZE 行）一次通过阵列：第一个 N tile 的 sum_in 为 bias，其余为 0，
+                   每个单元 sum + lhs * w 饱和到 int32，按 tile 内 n 递增的顺序依次相加
+  shift_accumulator 第一个 N tile 的部分和直接写入（is_init_data），之后的部分和饱和累加
+  vec_requant      cmsis_nn_requantize：64 位乘积，shift > 0 时加舍入项后算术右移（shift 取低 6 位），
+                   shift < 0 时左移，结果取低 32 位；再加 dst_offset（32 位回绕），依次按 act_min/act_max、
+                   int8 限幅
+rhs_offset 在 kernel_loader 中只锁存不参与计算，模型同样忽略。K/M 方向的尾块只影响访存与写回，不改变数值。
+累加不可能饱和时（|bias| + N * max|lhs| * max|w| < 2^31）整块用 np.dot 计算，否则逐个 n 向量化地模拟饱和加法。
+
+用法: python3 mma_model.py --self-check [--trials N]
+        与逐元素的标量 RTL 参考（含饱和/回绕边界）及两个生成器的预期输出比较
+      python3 mma_model.py --archive case.npz [--tile R C]
+        检查存档中的用例（模型输出与预期输出不一致的元素），可打印 OA tile (R, C) 各 N tile 后的部分和
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from test_case_archive import load_case_archive
+
+# 脉动阵列规格（e203_defines.v 中的 SA_SIZE）
+SA_SIZE = 16
+
+INT32_MIN = -(1 << 31)
+INT32_MAX = (1 << 31) - 1
+
+# 固件（dsa_accel.c / 生成器）使用的默认配置
+DEFAULT_CONFIG = {'lhs_offset': 0, 'dst_offset': 0, 'act_min': -128, 'act_max': 127}
+
+
+def _wrap(x, bits):
+    """按 bits 位有符号数回绕（int64 数组）"""
+    half = np.int64(1) << (bits - 1)
+    return ((x + half) & ((half << 1) - 1)) - half
+
+
+def lhs_datapath(lhs, lhs_offset=0):
+    """ia_loader 送入阵列的 16 位数据"""
+    return _wrap(lhs.astype(np.int64) + _wrap(np.int64(lhs_offset), 16), 16)
+
+
+def _tile_sum(ia, w, init):
+    """一个 N tile 通过阵列：init 为 sum_in（bias 或 0），逐个 n 饱和相加"""
+    acc = np.broadcast_to(init, (ia.shape[0], w.shape[1])).astype(np.int64)
+    for n in range(ia.shape[1]):
+        acc += ia[:, n:n + 1] * w[n]
+        np.clip(acc, INT32_MIN, INT32_MAX, out=acc)
+    return acc
+
+
+def accumulate(lhs, rhs, bias, lhs_offset=0, partials=False):
+    """
+    阵列 + 累加器输出的 int32 累加结果 [K, M]；partials=True 时同时返回每个 N tile 累加后的值 [T, K, M]
+    """
+    ia = lhs_datapath(lhs, lhs_offset)
+    w = rhs.astype(np.int64)
+    b = bias.astype(np.int64)
+    N = ia.shape[1]
+    starts = range(0, N, SA_SIZE)
+
+    bound = int(np.abs(b).max(initial=0)) + N * int(np.abs(ia).max(initial=0)) * int(np.abs(w).max(initial=0))
+    exact = bound <= INT32_MAX
+    history = []
+    acc = None
+    for t, n0 in enumerate(starts):
+        n1 = min(n0 + SA_SIZE, N)
+        init = b if t == 0 else 0
+        if exact:
+            tile = np.dot(ia[:, n0:n1], w[n0:n1]) + init
+        else:
+            tile = _tile_sum(ia[:, n0:n1], w[n0:n1], init)
+        acc = tile if t == 0 else np.clip(acc + tile, INT32_MIN, INT32_MAX)
+        if partials:
+            history.append(acc)
+    if acc is None:  # N == 0：只有 bias
+        acc = np.broadcast_to(b, (lhs.shape[0], rhs.shape[1])).copy()
+    acc = acc.astype(np.int32)
+    if partials:
+        return acc, np.array(history, dtype=np.int32).reshape(-1, *acc.shape)
+    return acc
+
+
+def requantize(acc, mults, shifts, dst_offset=0, act_min=-128, act_max=127):
+    """vec_requant 的 cmsis_nn_requantize 与限幅，mults/shifts 为标量（per-tensor）或 [M]（per-channel）"""
+    prod = acc.astype(np.int64) * np.asarray(mults, dtype=np.int64)
+    shifts = np.broadcast_to(np.asarray(shifts, dtype=np.int64), prod.shape)
+    amount = np.where(shifts < 0, -shifts, shifts) & 63
+
+    # shift_amt == 0（shift 为 64 的倍数）时舍入项 1 <<< (0 - 1) 为 0
+    rounding = np.where(amount > 0, np.int64(1) << np.maximum(amount - 1, 0), 0)
+    right = (prod + rounding) >> amount
+    left = prod << amount
+    rq = _wrap(np.where(shifts > 0, right, np.where(shifts < 0, left, prod)), 32)
+
+    rq = _wrap(rq + dst_offset, 32)
+    rq = np.where(rq < act_min, act_min, rq)
+    rq = np.where(rq > act_max, act_max, rq)
+    return np.clip(rq, -128, 127).astype(np.int8)
+
+
+def case_params(case):
+    """用例的 requant 参数：complex 用例 per-channel 时用 dst_mults/dst_shifts"""
+    if case.get('quant_mode') == 1:
+        return case['dst_mults'], case['dst_shifts']
+    return case['dst_mult'], case['dst_shift']
+
+
+def run_case(case, config=None, partials=False):
+    """返回模型的 (累加结果, int8 输出[, 各 N tile 部分和])"""
+    cfg = dict(DEFAULT_CONFIG, **(config or {}))
+    out = accumulate(case['lhs'], case['rhs'], case['bias'], cfg['lhs_offset'], partials=partials)
+    acc = out[0] if partials else out
+    mults, shifts = case_params(case)
+    quantized = requantize(acc, mults, shifts, cfg['dst_offset'], cfg['act_min'], cfg['act_max'])
+    return (acc, quantized, out[1]) if partials else (acc, quantized)
+
+
+def check_case(case):
+    """返回模型输出与用例预期输出不一致的元素坐标 [(k, m), ...]"""
+    _, quantized = run_case(case)
+    return [tuple(map(int, idx)) for idx in np.argwhere(quantized != case['quantized'])]
+
+
+# ========== 自检：逐元素标量参考 ==========
+def _sat32(x):
+    return max(INT32_MIN, min(INT32_MAX, x))
+
+
+def _wrap_int(x, bits):
+    x &= (1 << bits) - 1
+    return x - (1 << bits) if x >> (bits - 1) else x
+
+
+def _reference_element(lhs, rhs, bias, k, m, mult, shift, cfg):
+    """照 RTL 逐元素计算一个输出（Python 整数），用于自检"""
+    N = len(rhs)
+    zp = _wrap_int(cfg['lhs_offset'], 16)
+    acc = 0
+    for t, n0 in enumerate(range(0, N, SA_SIZE)):
+        s = int(bias[m]) if t == 0 else 0
+        for n in range(n0, min(n0 + SA_SIZE, N)):
+            s = _sat32(s + _wrap_int(int(lhs[k][n]) + zp, 16) * int(rhs[n][m]))
+        acc = s if t == 0 else _sat32(acc + s)
+    if N == 0:
+        acc = int(bias[m])
+
+    prod = acc * mult
+    amount = (shift if shift >= 0 else -shift) & 63
+    if shift > 0:
+        rq = (prod + ((1 << (amount - 1)) if amount else 0)) >> amount
+    elif shift < 0:
+        rq = _wrap_int(prod << amount, 64)
+    else:
+        rq = prod
+    rq = _wrap_int(_wrap_int(rq, 32) + cfg['dst_offset'], 32)
+    if rq < cfg['act_min']:
+        rq = cfg['act_min']
+    if rq > cfg['act_max']:
+        rq = cfg['act_max']
+    return max(-128, min(127, rq))
+
+
+def _edge_cases(rng, trials):
+    """随机小尺寸用例，含 S16 满幅、接近 int32 边界的 bias、负 shift 与非零偏移"""
+    for trial in range(trials):
+        K, M = (int(x) for x in rng.integers(1, 20, size=2))
+        N = int(rng.choice([1, 5, SA_SIZE, SA_SIZE + 3, 3 * SA_SIZE + 1, 200]))
+        s16 = bool(rng.integers(2))
+        hi = 32768 if s16 else 128
+        lhs = rng.integers(-hi, hi, size=(K, N)).astype(np.int16 if s16 else np.int8)
+        rhs = rng.integers(-128, 128, size=(N, M)).astype(np.int8)
+        if trial % 3 == 0:  # 满幅数据，促使累加饱和
+            lhs[:] = rng.choice([-hi, hi - 1], size=(K, N))
+            rhs[:] = rng.choice([-128, 127], size=(N, M))
+        bias = rng.choice([0, INT32_MAX, INT32_MIN, int(rng.integers(INT32_MIN, INT32_MAX))],
+                          size=M).astype(np.int32)
+        per_channel = bool(rng.integers(2))
+        size = M if per_channel else None
+        mults = rng.integers(1, 1 << 31, size=size)
+        shifts = rng.integers(-8, 72, size=size)
+        cfg = {
+            'lhs_offset': int(rng.choice([0, 0, 5, -300, 40000])),
+            'dst_offset': int(rng.choice([0, 0, 3, -100])),
+            'act_min': int(rng.choice([-128, -100])),
+            'act_max': int(rng.choice([127, 90])),
+        }
+        yield lhs, rhs, bias, mults, shifts, cfg
+
+
+def self_check(trials=60, seed=0):
+    rng = np.random.default_rng(seed)
+    checked = 0
+    for lhs, rhs, bias, mults, shifts, cfg in _edge_cases(rng, trials):
+        acc = accumulate(lhs, rhs, bias, cfg['lhs_offset'])
+        got = requantize(acc, mults, shifts, cfg['dst_offset'], cfg['act_min'], cfg['act_max'])
+        K, M = got.shape
+        for k in range(K):
+            for m in range(M):
+                mult = int(mults[m] if np.ndim(mults) else mults)
+                shift = int(shifts[m] if np.ndim(shifts) else shifts)
+                exp = _reference_element(lhs, rhs, bias, k, m, mult, shift, cfg)
+                if got[k, m] != exp:
+                    print(f"[FAIL] model != RTL reference at ({k},{m}): {int(got[k, m])} vs {exp} "
+                          f"(K={K}, N={lhs.shape[1]}, M={M}, mult={mult}, shift={shift}, cfg={cfg})")
+                    return 1
+        checked += got.size
+    print(f"[PASS] vectorised model matches the scalar RTL reference over {checked} elements")
+
+    import generate_test_case
+    import generate_test_case_complex
+
+    checked = 0
+    for gen in (generate_test_case, generate_test_case_complex):
+        for _ in range(max(1, trials // 6)):
+            case = gen.generate_case()
+            acc, quantized, history = run_case(case, partials=True)
+            if not np.array_equal(acc, case['result']) or not np.array_equal(quantized, case['quantized']):
+                print(f"[FAIL] {gen.__name__}: model differs from the generator's expected output "
+                      f"(K={case['K']}, N={case['N']}, M={case['M']})")
+                return 1
+            if not np.array_equal(history[-1], acc):
+                print(f"[FAIL] {gen.__name__}: last partial sum differs from the accumulator output")
+                return 1
+            checked += 1
+    print(f"[PASS] model matches generator expected outputs over {checked} cases")
+    return 0
+
+
+def print_tile(case, row_tile, col_tile):
+    """打印 OA tile (row_tile, col_tile) 在每个 N tile 累加后的部分和"""
+    _, _, history = run_case(case, partials=True)
+    r0, c0 = row_tile * SA_SIZE, col_tile * SA_SIZE
+    np.set_printoptions(linewidth=200)
+    for t, acc in enumerate(history):
+        n0 = t * SA_SIZE
+        print(f"-- OA tile ({row_tile},{col_tile}) after N tile {t} (n={n0}..{min(n0 + SA_SIZE, case['N']) - 1})")
+        print(acc[r0:r0 + SA_SIZE, c0:c0 + SA_SIZE])
+
+
+def check_archive(path, tile=None):
+    _, cases = load_case_archive(path)
+    failed = 0
+    for idx, case in enumerate(cases):
+        bad = check_case(case)
+        dims = f"K={case['K']}, N={case['N']}, M={case['M']}"
+        if bad:
+            failed += 1
+            k, m = bad[0]
+            print(f"[CASE {idx}] {len(bad)} mismatches ({dims}), first @({k},{m})")
+        else:
+            print(f"[CASE {idx}] model matches expected output ({dims})")
+        if tile is not None:
+            print_tile(case, *tile)
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MMA 数据通路逐位精确模型")
+    parser.add_argument("--self-check", action="store_true", help="与标量 RTL 参考及生成器预期输出比较")
+    parser.add_argument("--trials", type=int, default=60, help="自检的随机用例数")
+    parser.add_argument("--seed", type=int, default=0, help="自检的随机种子")
+    parser.add_argument("--archive", metavar="PATH", help="检查 .npz 用例存档")
+    parser.add_argument("--tile", type=int, nargs=2, metavar=("R", "C"),
+                        help="配合 --archive 打印 OA tile (R, C) 各 N tile 后的部分和")
+    args = parser.parse_args()
+    if args.self_check:
+        return self_check(args.trials, args.seed)
+    if args.archive:
+        return check_archive(args.archive, args.tile)
+    parser.print_help()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""
+MMA 周期数解析模型：按 RTL 的分块与访存方式统计特征量，周期数 = 各特征量 x 系数之和
+
+特征量（SA_SIZE = 16，ICB 总线 32 位，各加载器共享仲裁器，按带宽串行计）：
+  const        固定开销：CSR 配置、NICE 指令发射与返回
+  passes       阵列通过次数 = K tile x M tile x N tile；每次需预装 16 行权重并填充/排空流水
+  rows         送入阵列的 IA 行数 = K x M tile x N tile（每行一拍）
+  read_beats   读总线拍数：ia_loader（每个 M tile 重读 IA）、kernel_loader（每个 K tile 重读权重，列优先存放）、
+               bias_loader 与 per-channel 参数（每个 OA tile 一次突发），按行/列起始地址的字对齐计
+  write_beats  oa_writer 写回拍数（逐行写回 OA tile 的有效列）
+  oa_tiles     OA tile 数：requant 参数/偏置装载握手与 tile 收尾
+系数可由 --calibrate 按仿真测得的周期数（bench_mma.py 的 bench.json）用最小二乘拟合，保存在 PARAMS_FILE。
+
+用法: python3 mma_perf_model.py --predict 64x64x64 [128x32x256 ...] [--dtype s8|s16] [--quant per-tensor|per-channel]
+                                [--lhs-stride B] [--rhs-stride B] [--dst-stride B] [--offsets L R D]
+      python3 mma_perf_model.py --calibrate bench.json [...] [--params PATH]
+      python3 mma_perf_model.py --self-check
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from mma_model import SA_SIZE
+
+BUS_BYTES = 4
+
+FEATURES = ('const', 'passes', 'rows', 'read_beats', 'write_beats', 'oa_tiles')
+
+# 未校准时的名义系数：每拍 1 周期，每次通过约 3 x SA_SIZE（权重预装、data_setup 斜移、累加器排空）
+DEFAULT_PARAMS = {
+    'const': 200.0,
+    'passes': 3.0 * SA_SIZE,
+    'rows': 1.0,
+    'read_beats': 1.0,
+    'write_beats': 1.0,
+    'oa_tiles': 2.0 * SA_SIZE,
+}
+PARAMS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mma_perf_params.json")
+
+DTYPES = {'s8': 1, 's16': 2}
+QUANT_MODES = {'per-tensor': 0, 'per-channel': 1}
+LHS_BYTES = {1: 1, 2: 2}
+
+
+def _tiles(n):
+    """[(起点, 长度), ...]，最后一块为余数"""
+    return [(s, min(SA_SIZE, n - s)) for s in range(0, n, SA_SIZE)]
+
+
+def _beats(starts, length):
+    """从各起始字节地址读/写 length 字节所需的总线拍数（起点非字对齐时多一拍）"""
+    starts = np.asarray(starts, dtype=np.int64)
+    return int(((starts % BUS_BYTES + length + BUS_BYTES - 1) // BUS_BYTES).sum())
+
+
+def features(K, N, M, lhs_dtype=1, quant_mode=0, lhs_stride=None, rhs_stride=None, dst_stride=None,
+             lhs_offset=0, rhs_offset=0, dst_offset=0):
+    """
+    返回特征量字典。步长单位为字节：lhs 行步长（默认 N x 元素字节）、rhs 列步长（权重列优先存放，默认 N）、
+    dst 行步长（默认 M）；offset 为各视图起点相对字对齐的字节偏移（test_case_layout.py 的跨步布局）
+    """
+    lb = LHS_BYTES[lhs_dtype]
+    lhs_stride = N * lb if lhs_stride is None else lhs_stride
+    rhs_stride = N if rhs_stride is None else rhs_stride
+    dst_stride = M if dst_stride is None else dst_stride
+    k_tiles, n_tiles, m_tiles = _tiles(K), _tiles(N), _tiles(M)
+
+    rows_k = np.arange(K, dtype=np.int64) * lhs_stride + lhs_offset
+    ia = sum(_beats(rows_k + n0 * lb, cols * lb) for n0, cols in n_tiles)
+    cols_m = np.arange(M, dtype=np.int64) * rhs_stride + rhs_offset
+    kernel = sum(_beats(cols_m + n0, rows) for n0, rows in n_tiles)
+    params = M * (3 if quant_mode == 1 else 1)  # bias（+ mult/shift）各 M 个 32 位字
+    read_beats = ia * len(m_tiles) + (kernel + params) * len(k_tiles)
+
+    rows_dst = np.arange(K, dtype=np.int64) * dst_stride + dst_offset
+    write_beats = sum(_beats(rows_dst + m0, lanes) for m0, lanes in m_tiles)
+
+    passes = len(k_tiles) * len(m_tiles) * len(n_tiles)
+    return {
+        'const': 1,
+        'passes': passes,
+        'rows': K * len(m_tiles) * len(n_tiles),
+        'read_beats': read_beats,
+        'write_beats': write_beats,
+        'oa_tiles': len(k_tiles) * len(m_tiles),
+    }
+
+
+def bus_bytes(**kwargs):
+    """一次矩阵乘法在 ICB 总线上读写的字节数（read_beats + write_beats 拍，每拍 BUS_BYTES 字节），参数同 features()"""
+    feats = features(**kwargs)
+    return BUS_BYTES * (feats['read_beats'] + feats['write_beats'])
+
+
+def load_params(path=PARAMS_FILE):
+    """读取校准后的系数，文件不存在时使用名义系数"""
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return dict(DEFAULT_PARAMS, **json.load(f)['params'])
+    return dict(DEFAULT_PARAMS)
+
+
+def predict(params, **kwargs):
+    feats = features(**kwargs)
+    return sum(params[name] * feats[name] for name in FEATURES)
+
+
+def _point_kwargs(row):
+    """bench.json 中一行对应的 features() 参数（bench_mma.py --strided 的点带各视图的步长与偏移）"""
+    kwargs = {key: row[key] for key in ('K', 'N', 'M', 'lhs_dtype', 'quant_mode')}
+    for key in ('lhs_stride', 'rhs_stride', 'dst_stride', 'lhs_offset', 'rhs_offset', 'dst_offset'):
+        if row.get(key) is not None:
+            kwargs[key] = row[key]
+    return kwargs
+
+
+def calibrate(rows):
+    """
+    最小二乘拟合系数（以相对误差为目标，各点按 1/cycles 加权），返回 (params, 各点相对误差)。
+    rows 为 bench.json 中带 cycles 的点
+    """
+    A = np.array([[features(**_point_kwargs(row))[name] for name in FEATURES] for row in rows], dtype=np.float64)
+    y = np.array([row['cycles'] for row in rows], dtype=np.float64)
+    coef, *_ = np.linalg.lstsq(A / y[:, None], np.ones_like(y), rcond=None)
+    params = dict(zip(FEATURES, (float(c) for c in coef)))
+    errors = (A @ coef - y) / y
+    return params, errors
+
+
+def load_bench_rows(paths):
+    rows = []
+    for path in paths:
+        with open(path) as f:
+            # 只用通过的点：[PERF] 在结果检查之前输出，失败或异常的点也可能带周期数；
+            # --chain 的点是整条链的周期数，不参与单条指令的拟合
+            rows += [row for row in json.load(f)['points']
+                     if row.get('result') == 'pass' and row.get('cycles') and not row.get('chain')]
+    return rows
+
+
+def parse_shape(text):
+    try:
+        K, N, M = (int(v) for v in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"形状应为 KxNxM: {text}")
+    return K, N, M
+
+
+def self_check(seed=0):
+    """用已知系数加 1% 噪声合成周期数，校准应恢复到几个百分点以内"""
+    rng = np.random.default_rng(seed)
+    truth = {'const': 350.0, 'passes': 41.0, 'rows': 1.5, 'read_beats': 1.25, 'write_beats': 2.0, 'oa_tiles': 60.0}
+    rows = []
+    for _ in range(60):
+        K, N, M = (int(v) for v in rng.integers(1, 300, size=3))
+        kwargs = {'K': K, 'N': N, 'M': M, 'lhs_dtype': int(rng.integers(1, 3)), 'quant_mode': int(rng.integers(2))}
+        if rng.integers(3) == 0:
+            kwargs['lhs_stride'] = kwargs['N'] * kwargs['lhs_dtype'] + int(rng.integers(1, 8))
+        cycles = predict(truth, **kwargs) * (1 + rng.normal(0, 0.01))
+        rows.append(dict(kwargs, cycles=cycles))
+    params, errors = calibrate(rows)
+    worst = float(np.abs(errors).max())
+    print(f"[INFO] fitted: " + ", ".join(f"{k}={params[k]:.3g} (true {truth[k]:.3g})" for k in FEATURES))
+    if worst > 0.05:
+        print(f"[FAIL] worst relative error after calibration {worst * 100:.2f}%")
+        return 1
+    print(f"[PASS] calibration on synthetic data: worst relative error {worst * 100:.2f}%")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MMA 周期数解析模型")
+    parser.add_argument("--predict", type=parse_shape, nargs="+", metavar="KxNxM", help="预测给定形状的周期数")
+    parser.add_argument("--dtype", choices=sorted(DTYPES), default='s8', help="lhs 位宽")
+    parser.add_argument("--quant", choices=list(QUANT_MODES), default='per-tensor', help="量化模式")
+    parser.add_argument("--lhs-stride", type=int, help="lhs 行步长（字节）")
+    parser.add_argument("--rhs-stride", type=int, help="rhs 列步长（字节）")
+    parser.add_argument("--dst-stride", type=int, help="dst 行步长（字节）")
+    parser.add_argument("--offsets", type=int, nargs=3, default=(0, 0, 0), metavar=("LHS", "RHS", "DST"),
+                        help="lhs/rhs/dst 视图起点相对字对齐的字节偏移")
+    parser.add_argument("--calibrate", nargs="+", metavar="BENCH_JSON", help="用 bench_mma.py 的报告拟合系数")
+    parser.add_argument("--params", default=PARAMS_FILE, help=f"系数文件（默认 {PARAMS_FILE}）")
+    parser.add_argument("--self-check", action="store_true", help="在合成数据上检查校准")
+    args = parser.parse_args()
+
+    if args.self_check:
+        return self_check()
+    if args.calibrate:
+        rows = load_bench_rows(args.calibrate)
+        if len(rows) < len(FEATURES):
+            parser.error(f"至少需要 {len(FEATURES)} 个带周期数的点，当前 {len(rows)} 个")
+        params, errors = calibrate(rows)
+        for row, err in zip(rows, errors):
+            print(f"{row.get('key', '')}: measured {row['cycles']}, error {err * 100:+.2f}%")
+        print(f"mean |error| {np.abs(errors).mean() * 100:.2f}%, worst {np.abs(errors).max() * 100:.2f}%")
+        with open(args.params, 'w') as f:
+            json.dump({'params': params, 'points': len(rows),
+                       'worst_error': float(np.abs(errors).max())}, f, indent=2)
+        print(f"系数已保存: {args.params}")
+        return 0
+    if args.predict:
+        params = load_params(args.params)
+        for K, N, M in args.predict:
+            cycles = predict(params, K=K, N=N, M=M, lhs_dtype=DTYPES[args.dtype],
+                             quant_mode=QUANT_MODES[args.quant], lhs_stride=args.lhs_stride,
+                             rhs_stride=args.rhs_stride, dst_stride=args.dst_stride,
+                             lhs_offset=args.offsets[0], rhs_offset=args.offsets[1], dst_offset=args.offsets[2])
+            print(f"{K}x{N}x{M}: {cycles:.0f} cycles, {K * N * M / cycles:.3f} MACs/cycle")
+        return 0
+    parser.print_help()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
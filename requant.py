@@ -0,0 +1,243 @@
+"""
+Requant 参数计算与 golden 输出量化 - 供 generate_test_case.py / generate_test_case_complex.py 共用
+
+用法: python3 requant.py --self-check [--trials N]
+  对随机与边界累加值比较向量化的 per-channel 搜索与逐通道标量搜索、
+  分块 requantize_array 与原先整块广播的实现，要求逐位一致。
+"""
+
+import argparse
+import sys
+import tracemalloc
+
+import numpy as np
+
+MAX_SHIFT = 31  # int32 足够
+
+# requantize_array 每块处理的元素数（int64 暂存约 8MB），与输出尺寸无关
+REQUANT_BLOCK_ELEMS = 1 << 20
+
+# 127 * 2^s，s = 0..MAX_SHIFT（int64 不会溢出）
+_SHIFTED_127 = np.int64(127) << np.arange(MAX_SHIFT + 1, dtype=np.int64)
+
+
+def compute_requant_params(acc: np.ndarray):
+    """
+    根据累加结果范围，生成 dst_mult 和 dst_shift，使得
+      output = (acc * dst_mult + (1 << (shift-1))) >> shift
+    落在 int8 范围内且不完全溢出。
+    """
+    acc_min = int(acc.min())
+    acc_max = int(acc.max())
+    max_abs = max(abs(acc_min), abs(acc_max))
+    if max_abs == 0:
+        # 全 0，任意量化都行，返回恒等
+        return 1, 0
+
+    # 我们使用右移 (shift >= 0)，不进行小数放大，保证简单可靠
+    # 目标：max_abs * mult / 2^shift <= 127 且 mult 尽量大
+    # 先枚举适当范围的 shift，选出最大的 mult
+    best_mult = 1
+    best_shift = 0
+    for s in range(MAX_SHIFT + 1):
+        # mult <= 127 * 2^s / max_abs
+        num = 127 * (1 << s)
+        mult = num // max_abs  # floor
+        if mult < 1:
+            continue
+        # 记录 mult 最大的组合
+        if mult > best_mult:
+            best_mult = mult
+            best_shift = s
+
+    return int(best_mult), int(best_shift)
+
+
+def compute_requant_params_per_channel(acc: np.ndarray, axis=1):
+    """
+    Per-channel 量化参数计算，返回 mults 和 shifts 数组。
+    一次性对所有通道求 max_abs 并查表，结果与逐通道调用 compute_requant_params 逐位一致：
+    floor(127 * 2^s / max_abs) 随 s 单调不减，标量搜索的结果即 s = 31 时的 mult，
+    shift 为首个取到该 mult 的 s；mult <= 1（含 max_abs == 0）时保持初值 (1, 0)。
+    与原实现一样，mult 超出 int32（max_abs < 127）时抛出 OverflowError。
+    """
+    if axis != 1:  # per-channel on M
+        raise ValueError("Unsupported axis")
+
+    max_abs = np.maximum(acc.max(axis=0).astype(np.int64), -acc.min(axis=0).astype(np.int64))
+    table = _SHIFTED_127[None, :] // np.maximum(max_abs, 1)[:, None]  # [M, 32]
+    mults = table[:, MAX_SHIFT]
+    shifts = np.argmax(table == mults[:, None], axis=1)
+
+    identity = (mults <= 1) | (max_abs == 0)
+    mults = np.where(identity, 1, mults)
+    if mults.size and mults.max() > np.iinfo(np.int32).max:
+        raise OverflowError(f"Python integer {int(mults.max())} out of bounds for int32")
+    mults = mults.astype(np.int32)
+    shifts = np.where(identity, 0, shifts).astype(np.int32)
+    return mults, shifts
+
+
+def _block_rows(param, r0, r1):
+    """参数为二维（逐元素）时取出当前行块，否则按列/标量广播"""
+    return param[r0:r1] if param.ndim == 2 else param
+
+
+def requantize_array(acc: np.ndarray, mults, shifts, block_elems=REQUANT_BLOCK_ELEMS) -> np.ndarray:
+    """
+    使用 CMSIS-NN 公式对整个 acc 数组做 requant：
+      output = (acc * mult + (1 << (shift-1))) / 2^shift
+    其中 / 是算术右移，shift == 0 时舍入项为 0（即直接使用 acc * mult）。
+    支持 mults 和 shifts 为标量或数组（广播）。
+    按行分块在同一块 int64 暂存区内原地计算（ufunc out=），峰值内存只有输出本身加一块暂存。
+    """
+    acc = np.asarray(acc)
+    mults = np.asarray(mults, dtype=np.int64)
+    shifts = np.asarray(shifts, dtype=np.int64)
+    rounding = np.where(shifts > 0, np.int64(1) << np.maximum(shifts - 1, 0), 0)
+
+    out = np.empty(acc.shape, dtype=np.int8)
+    acc2 = acc.reshape(-1, acc.shape[-1]) if acc.ndim != 2 else acc
+    out2 = out.reshape(acc2.shape)
+    rows, cols = acc2.shape
+    if out.size == 0:
+        return out
+
+    block_rows = max(1, block_elems // cols)
+    scratch = np.empty((min(block_rows, rows), cols), dtype=np.int64)
+    for r0 in range(0, rows, block_rows):
+        r1 = min(r0 + block_rows, rows)
+        buf = scratch[:r1 - r0]
+        np.multiply(acc2[r0:r1], _block_rows(mults, r0, r1), out=buf)
+        np.add(buf, _block_rows(rounding, r0, r1), out=buf)
+        np.right_shift(buf, _block_rows(shifts, r0, r1), out=buf)
+        np.clip(buf, -128, 127, out=buf)
+        out2[r0:r1] = buf
+    return out
+
+
+def _requantize_reference(acc: np.ndarray, mults, shifts) -> np.ndarray:
+    """原实现：广播为整块 int64 后用布尔掩码处理 shift > 0，用于自检"""
+    acc_int64 = acc.astype(np.int64)
+    mults = np.broadcast_to(mults, acc.shape).astype(np.int64)
+    shifts = np.broadcast_to(shifts, acc.shape).astype(np.int32)
+    prod = acc_int64 * mults
+    mask = shifts > 0
+    if np.any(mask):
+        prod[mask] += (1 << (shifts[mask] - 1))
+        prod[mask] >>= shifts[mask]
+    prod = np.clip(prod, -128, 127)
+    return prod.astype(np.int8)
+
+
+def _per_channel_reference(acc: np.ndarray):
+    """逐通道标量搜索（原实现），用于自检"""
+    mults = np.zeros(acc.shape[1], dtype=np.int32)
+    shifts = np.zeros(acc.shape[1], dtype=np.int32)
+    for j in range(acc.shape[1]):
+        mults[j], shifts[j] = compute_requant_params(acc[:, j])
+    return mults, shifts
+
+
+def _self_check_cases(trials, rng):
+    """随机累加值（不同量级）与边界情况"""
+    int32_min, int32_max = np.iinfo(np.int32).min, np.iinfo(np.int32).max
+    edges = np.array([0, 1, -1, 2, 126, 127, -127, 128, -128, 254, 255, 256,
+                      1 << 16, (1 << 16) + 1, 127 << 20, (127 << 20) + 1,
+                      1 << 30, int32_max, int32_min, int32_min + 1], dtype=np.int64)
+    # 每列只有一个非零值（其余为 0），覆盖 max_abs 取自 min 或 max 的情况
+    single = np.zeros((3, edges.size), dtype=np.int64)
+    single[1] = edges
+    yield single.astype(np.int32)
+    # 去掉会使 mult 溢出 int32 的小 max_abs，其余通道需逐位一致
+    valid = edges[(edges == 0) | (np.abs(edges) >= 127)]
+    single = np.zeros((3, valid.size), dtype=np.int64)
+    single[1] = valid
+    yield single.astype(np.int32)
+    yield np.zeros((4, 7), dtype=np.int32)
+    yield np.full((2, 3), int32_min, dtype=np.int32)
+
+    for _ in range(trials):
+        K = int(rng.integers(1, 64))
+        M = int(rng.integers(1, 256))
+        bound = int(2 ** rng.uniform(0, 31))
+        yield rng.integers(-bound, bound + 1, size=(K, M), dtype=np.int64).astype(np.int32)
+
+
+def _raises_overflow(func, acc):
+    try:
+        func(acc)
+    except OverflowError:
+        return True
+    return False
+
+
+def self_check(trials=200, seed=0):
+    rng = np.random.default_rng(seed)
+    checked = 0
+    for acc in _self_check_cases(trials, rng):
+        # 原实现在 max_abs < 127 时 mult 超出 int32 而抛出 OverflowError，向量化实现须一致
+        if _raises_overflow(_per_channel_reference, acc):
+            if not _raises_overflow(compute_requant_params_per_channel, acc):
+                print(f"[FAIL] scalar search overflows int32 but vectorised does not: {acc.tolist()}")
+                return 1
+            continue
+        expected = _per_channel_reference(acc)
+        actual = compute_requant_params_per_channel(acc, axis=1)
+        for name, exp, act in zip(("mults", "shifts"), expected, actual):
+            if act.dtype != exp.dtype or not np.array_equal(act, exp):
+                bad = int(np.flatnonzero(act != exp)[0])
+                print(f"[FAIL] {name} mismatch at channel {bad}: "
+                      f"vectorised={act[bad]}, scalar={exp[bad]}, column={acc[:, bad].tolist()}")
+                return 1
+        checked += acc.shape[1]
+    print(f"[PASS] per-channel requant params bit-exact over {checked} channels")
+
+    checked = 0
+    for _ in range(trials):
+        K = int(rng.integers(1, 96))
+        M = int(rng.integers(1, 160))
+        bound = int(2 ** rng.uniform(0, 31))
+        acc = rng.integers(-bound, bound + 1, size=(K, M), dtype=np.int64).astype(np.int32)
+        if rng.integers(2):
+            # per-tensor：标量参数（含 shift == 0）
+            params = (int(rng.integers(1, 1 << 31)), int(rng.integers(0, MAX_SHIFT + 1)))
+        else:
+            # per-channel：随机混入 shift == 0 的通道
+            params = (rng.integers(1, 1 << 31, size=M).astype(np.int32),
+                      np.where(rng.integers(4, size=M) == 0, 0, rng.integers(0, MAX_SHIFT + 1, size=M)).astype(np.int32))
+        block = int(rng.choice([1, 7, M, REQUANT_BLOCK_ELEMS]))
+        expected = _requantize_reference(acc, *params)
+        actual = requantize_array(acc, *params, block_elems=block)
+        if actual.dtype != expected.dtype or not np.array_equal(actual, expected):
+            print(f"[FAIL] requantize_array mismatch (K={K}, M={M}, block_elems={block})")
+            return 1
+        checked += acc.size
+    print(f"[PASS] requantize_array bit-exact over {checked} elements")
+
+    # 峰值内存对比（tracemalloc 统计 numpy 的数据分配）
+    acc = rng.integers(-(1 << 30), 1 << 30, size=(1024, 1024), dtype=np.int64).astype(np.int32)
+    mults, shifts = compute_requant_params_per_channel(acc)
+    for name, func in (("broadcast", _requantize_reference), ("fused", requantize_array)):
+        tracemalloc.start()
+        func(acc, mults, shifts)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"[INFO] {name:>9} requant peak memory for 1024x1024: {peak / (1 << 20):.1f} MiB")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Requant 参数计算自检")
+    parser.add_argument("--self-check", action="store_true", help="比较向量化与标量 per-channel 搜索")
+    parser.add_argument("--trials", type=int, default=200, help="随机累加矩阵数量")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+    if not args.self_check:
+        parser.print_help()
+        return 0
+    return self_check(args.trials, args.seed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
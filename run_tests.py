@@ -1,44 +1,397 @@
+import argparse
+import hashlib
+import importlib
+import itertools
+import json
+import multiprocessing
 import subprocess
 import os
+import re
 import shutil
 import time
 import signal
 import sys
 import select  # 新增导入
 
+from mma_model import check_case
+from shrink_case import case_cost, shrink_candidates
+from test_case_archive import ARCHIVE_SUFFIX, case_seed, load_case_archive, new_seed, save_case_archive
+from test_case_dump import read_dump, report_dump
+
 # 配置参数
+SIM_ROOT_DIR = "/home/etc/FPGA/e203_simulator"
 NUM_ITERATIONS = 500  # 循环次数，可调整
-LOG_DIR = "/home/etc/FPGA/e203_simulator/test_logs"
-EXCEPTION_DIR = "/home/etc/FPGA/e203_simulator/exception_cases"
-TIMEOUT_SECONDS = 300  # 5分钟超时
+LOG_DIR = os.path.join(SIM_ROOT_DIR, "test_logs")
+EXCEPTION_DIR = os.path.join(SIM_ROOT_DIR, "exception_cases")
+WORKER_ROOT_DIR = os.path.join(SIM_ROOT_DIR, "build", "workers")  # 并行模式下各 worker 的独立沙箱
+GENERATOR = "generate_test_case.py"
+TIMEOUT_SECONDS = 300  # 关闭心跳看门狗（--no-heartbeat）时的无输出超时
+TARGET = "main"
+
+# Verilator 模型：以 RTL 与 testbench 源码的哈希为键，每次回归只编译一次
+HW_SRC_DIR = os.path.join(SIM_ROOT_DIR, "deps", "hardware-level", "src", "e203", "hbirdv2")
+MODEL_SRC_DIRS = [os.path.join(HW_SRC_DIR, "rtl"), os.path.join(HW_SRC_DIR, "tb_verilator")]
+MODEL_HASH_FILE = os.path.join(SIM_ROOT_DIR, "build", "e203_model.sha256")
+SIM_EXEC = os.path.join(SIM_ROOT_DIR, "build", "e203_exec_verilator", "Vtb_top")
+
+# --data-only：固件只编译一次，之后的用例以补丁形式直接改写内存镜像
+SPLIT_MEMORY = os.path.join(SIM_ROOT_DIR, "deps", "tools", "split_memory.py")
+# 与 make.conf 中 LINKER_SCRIPT 的默认值一致，改写镜像时按同一 MEMORY 块划分区域
+LINKER_SCRIPT = os.path.join(SIM_ROOT_DIR, "deps", "software-level", "libs", "SoC", "hbirdv2", "Board",
+                             "mcu200t", "Source", "GCC", "gcc_hbirdv2_ilm.ld")
+PATCH_FILE = "case_patch.json"
+
+# --dump-dst：固件不比较输出，testbench 在 tb_dump_dst() 入口把 dst_data 写入仿真目录下的 DUMP_FILE
+# （每个用例一行十六进制），仿真结束后按存档中的用例在主机上比较，地址与长度取自 ELF 符号表
+DUMP_MARKER = "tb_dump_dst"
+DUMP_FILE = "dst_dump.hex"
+
+# 每轮用例的种子由回归种子（--seed）与轮次派生，生成器同时写出 .npz 存档；
+# 未通过的轮次把存档保存到异常目录（case_<i>.npz），用 --replay 重新生成并仿真
+ARCHIVE_FILE = "case_archive" + ARCHIVE_SUFFIX
+REPLAY_DIR = "replay"
+# --shrink：候选存档与日志写入 <log_dir>/shrink，最终的最小复现用例为 minimal.npz
+SHRINK_DIR = "shrink"
+SHRINK_RESULT = "minimal" + ARCHIVE_SUFFIX
+
+# --batch：固件逐用例输出 "[CASE i] PASS/FAIL ..."，据此把结果归属到各个用例
+CASE_RESULT_RE = re.compile(r'^\[CASE (\d+)\] (PASS|FAIL)')
+
+# 固件每个错误元素输出一行 "[FAIL] ... @(r,c)"，累计到该行数即判定失败并终止仿真（0 表示不提前终止）
+FAIL_TAG = "[FAIL]"
+MAX_FAIL_LINES = 20
 
-os.makedirs(LOG_DIR, exist_ok=True)
-os.makedirs(EXCEPTION_DIR, exist_ok=True)
+# 看门狗：仿真器以 +heartbeat=<cycles> 每隔若干周期输出 "[HEARTBEAT] cycle=<n> instret=<n>"，
+# 据此区分“卡死”（无心跳 / 指令数停滞 / 周期超出预算）与“慢但在推进”。
+# 固件打印由 UART 模型逐字符写出，整行的心跳可能插在一行固件输出中间，因此在行内任意位置查找
+HEARTBEAT_CYCLES = 100000
+HEARTBEAT_RE = re.compile(r'\[HEARTBEAT\] cycle=(\d+) instret=(\d+)\n?')
+DIMS_RE = re.compile(r'Matrix dimensions: K=(\d+), N=(\d+), M=(\d+)')
+# 周期预算 = 固定开销（启动、打印、结果比对）+ 每个 MAC 的周期数，按固件打印的矩阵尺寸逐用例累加
+CYCLE_BUDGET_BASE = 20000000
+CYCLES_PER_MAC = 2
+# 指令数连续这么多周期不增长判定为卡死（如等待加速器响应）；加速器工作期间 csrr mcycle 等待 OITF 清空，
+# 指令数同样不增长（如 --chain 连续发射后最后一次 dsa_matmul_execute() 等整条链完成），阈值按已知的 MAC 数放大
+STALL_CYCLES = 5000000
+# 无任何输出的时间上限：首个心跳前为 STARTUP_SECONDS（装载镜像、复位），
+# 之后为心跳间隔按实测仿真速度换算时间的 HEARTBEAT_SILENCE_FACTOR 倍（不少于 MIN_SILENCE_SECONDS）
+STARTUP_SECONDS = 60
+HEARTBEAT_SILENCE_FACTOR = 10
+MIN_SILENCE_SECONDS = 5
+# 墙钟截止时间 = STARTUP_SECONDS + 周期预算 / 实测仿真速度 × DEADLINE_MARGIN
+DEADLINE_MARGIN = 2
 
-def run_iteration(iteration_id, run_log):
-    message = f"开始第 {iteration_id} 轮测试..."
+# 复制到 worker 沙箱中的用例源文件（编译产物 *.o/*.d 不复制）
+CSRC_IGNORE = shutil.ignore_patterns("*.o", "*.d", "*.S", "*.bak", "*" + ARCHIVE_SUFFIX)
+
+
+def log_message(run_log, message):
     print(message)
     run_log.write(message + '\n')
     run_log.flush()
-    
-    # 调用 generate_test_case.py
+
+
+def default_workspace():
+    """串行模式：直接使用仓库内的 eai_csrc 与 build 目录，与原流程一致"""
+    return {
+        'name': 'main',
+        'csrc_dir': os.path.join(SIM_ROOT_DIR, "eai_csrc"),
+        'c_build_dir': os.path.join(SIM_ROOT_DIR, "build", "c_compiled"),
+        'sim_out_dir': os.path.join(SIM_ROOT_DIR, "build", "sim_out"),
+    }
+
+
+def create_workspace(slot):
+    """
+    为并行 worker 创建独立沙箱：用例源码、固件编译目录、仿真输出目录各自独立，
+    只共享已编译好的 Verilator 模型（只读）。
+    """
+    ws_dir = os.path.join(WORKER_ROOT_DIR, f"w{slot}")
+    ws = {
+        'name': f"w{slot}",
+        'csrc_dir': os.path.join(ws_dir, "eai_csrc"),
+        'c_build_dir': os.path.join(ws_dir, "c_compiled"),
+        'sim_out_dir': os.path.join(ws_dir, "sim_out"),
+    }
+    if os.path.isdir(ws['csrc_dir']):
+        shutil.rmtree(ws['csrc_dir'])
+    shutil.copytree(os.path.join(SIM_ROOT_DIR, "eai_csrc"), ws['csrc_dir'], ignore=CSRC_IGNORE)
+    os.makedirs(ws['c_build_dir'], exist_ok=True)
+    return ws
+
+
+def hash_model_sources():
+    """计算 RTL（含 rtl/subsys/eai）与 tb_verilator 源码的 sha256"""
+    digest = hashlib.sha256()
+    for src_dir in MODEL_SRC_DIRS:
+        for root, dirs, files in os.walk(src_dir):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, HW_SRC_DIR).encode('utf-8'))
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+def prepare_model(run_log, force=False):
+    """
+    编译 e203 Verilator 模型。源码哈希与上次编译一致且可执行文件存在时直接复用，
+    否则清掉 build 下的 testbench 副本和 compile.flg 后重新 make e203。
+    """
+    model_hash = hash_model_sources()
+    if not force and os.path.isfile(SIM_EXEC) and os.path.isfile(MODEL_HASH_FILE):
+        with open(MODEL_HASH_FILE, 'r') as f:
+            if f.read().strip() == model_hash:
+                log_message(run_log, f"准备阶段: 模型未变化 ({model_hash[:12]})，复用 {SIM_EXEC}")
+                return True
+
+    # make e203 只在 build/e203_tb 不存在时复制 testbench，源码变化后需要删掉旧副本
+    shutil.rmtree(os.path.join(SIM_ROOT_DIR, "build", "e203_tb"), ignore_errors=True)
+    flag = os.path.join(SIM_ROOT_DIR, "build", "compile.flg")
+    if os.path.exists(flag):
+        os.remove(flag)
+    if not run_make_step(run_log, "e203"):
+        return False
+    with open(MODEL_HASH_FILE, 'w') as f:
+        f.write(model_hash + '\n')
+    return True
+
+
+def run_make_step(run_log, target):
+    log_message(run_log, f"准备阶段: make {target} ...")
+    proc = subprocess.run(["make", target], cwd=SIM_ROOT_DIR,
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8')
+    if proc.returncode != 0:
+        log_message(run_log, proc.stdout)
+        log_message(run_log, f"准备阶段 make {target} 失败 (返回码 {proc.returncode})")
+        return False
+    return True
+
+
+def prepare_campaign(run_log, rebuild_model=False):
+    """
+    回归开始前的准备：编译一次 Verilator 模型，并在主目录编译一次固件，
+    使 SDK 公共目标文件（生成在 SDK 源码旁）提前就绪，避免并行时多个 worker 同时写入。
+    """
+    return prepare_model(run_log, force=rebuild_model) and run_make_step(run_log, "compile_c")
+
+
+def stop_process(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def join_heartbeat(partial, line):
+    """
+    去掉 line 中的心跳并还原被它截断的固件输出行，如 "[CASE 3] PA[HEARTBEAT] cycle=... instret=...\n"
+    之后的 "SS K=...\n"。partial 为上一行被截断的前半段，返回 (完整的固件行或 None, 心跳匹配或 None, 新的 partial)
+    """
+    line = partial + line
+    match = HEARTBEAT_RE.search(line)
+    if match is None:
+        return line, None, ''
+    text = line[:match.start()] + line[match.end():]
+    if text and not text.endswith('\n'):
+        return None, match, text
+    return text or None, match, ''
+
+
+def firmware_lines(lines):
+    """逐行产出仿真日志中的固件输出：去掉心跳，被心跳截断的行拼接完整"""
+    partial = ''
+    for line in lines:
+        text, _, partial = join_heartbeat(partial, line)
+        if text is not None:
+            yield text
+    if partial:
+        yield partial
+
+
+def new_verdict():
+    return {'result': "unknown", 'finished': False, 'fail_lines': 0, 'cases': {},
+            'macs': 0, 'cycle': None, 'instret': None, 'partial': ''}
+
+
+def classify_line(verdict, line):
+    """
+    随输出逐行更新结论：心跳、结果汇总行、逐用例结果行、[FAIL] 行计数以及 "Test Finished."；
+    被心跳截断的固件行等下一行拼接完整后再判断
+    """
+    line, beat, verdict['partial'] = join_heartbeat(verdict['partial'], line)
+    if beat:
+        verdict['cycle'], verdict['instret'] = int(beat.group(1)), int(beat.group(2))
+    if line is None:
+        return
+    if "All tests passed!" in line:
+        verdict['result'] = "pass"
+    elif "tests failed" in line:
+        verdict['result'] = "fail"
+    if FAIL_TAG in line:
+        verdict['fail_lines'] += 1
+    match = CASE_RESULT_RE.match(line)
+    if match:
+        verdict['cases'][int(match.group(1))] = match.group(2).lower()
+    match = DIMS_RE.search(line)
+    if match:
+        k, n, m = (int(v) for v in match.groups())
+        verdict['macs'] += k * n * m
+    if "Test Finished." in line:
+        verdict['finished'] = True
+
+
+def cycle_budget(verdict):
+    return CYCLE_BUDGET_BASE + CYCLES_PER_MAC * verdict['macs']
+
+
+def stall_limit(verdict):
+    """指令数停滞的周期上限：不少于 STALL_CYCLES，且容得下已打印尺寸的全部矩阵乘法（与周期预算同一口径）"""
+    return max(STALL_CYCLES, CYCLES_PER_MAC * verdict['macs'])
+
+
+def new_watchdog(start_time):
+    return {'start': start_time, 'last_output': start_time, 'last_beat': None,
+            'stall_instret': None, 'stall_cycle': 0}
+
+
+def watchdog_on_heartbeat(watchdog, verdict, ws, now):
+    """收到心跳：校准仿真速度（周期/秒，按工作区平滑），并检查指令数停滞与周期预算"""
+    cycle, instret = verdict['cycle'], verdict['instret']
+    if watchdog['last_beat'] is not None:
+        last_cycle, last_time = watchdog['last_beat']
+        if now > last_time and cycle > last_cycle:
+            sample = (cycle - last_cycle) / (now - last_time)
+            ws['sim_rate'] = sample if not ws.get('sim_rate') else 0.7 * ws['sim_rate'] + 0.3 * sample
+    watchdog['last_beat'] = (cycle, now)
+
+    if instret != watchdog['stall_instret']:
+        watchdog['stall_instret'] = instret
+        watchdog['stall_cycle'] = cycle
+    elif cycle - watchdog['stall_cycle'] >= stall_limit(verdict):
+        return f"指令数 {instret} 已 {cycle - watchdog['stall_cycle']} 个周期未增长"
+    if cycle > cycle_budget(verdict):
+        return f"仿真周期 {cycle} 超出预算 {cycle_budget(verdict)}（{verdict['macs']} MACs）"
+    return None
+
+
+def watchdog_check(watchdog, verdict, ws, now):
+    """无输出时间与墙钟截止时间检查，返回卡死原因或 None"""
+    rate = ws.get('sim_rate')
+    silence = now - watchdog['last_output']
+    if watchdog['last_beat'] is None or not rate:
+        if silence > STARTUP_SECONDS:
+            return f"{silence:.0f} 秒无输出（未收到心跳）"
+        return None
+    limit = max(MIN_SILENCE_SECONDS, HEARTBEAT_SILENCE_FACTOR * HEARTBEAT_CYCLES / rate)
+    if silence > limit:
+        return f"{silence:.0f} 秒无心跳（上限 {limit:.0f} 秒，仿真速度 {rate:.0f} 周期/秒）"
+    deadline = STARTUP_SECONDS + cycle_budget(verdict) / rate * DEADLINE_MARGIN
+    if now - watchdog['start'] > deadline:
+        return f"运行 {now - watchdog['start']:.0f} 秒超出截止时间 {deadline:.0f} 秒"
+    return None
+
+
+def run_iteration(iteration_id, run_log, campaign, ws):
+    result, case_results = run_case(iteration_id, run_log, campaign, ws)
+    if result != "pass":
+        keep_case_archive(iteration_id, campaign, ws)
+    return result, case_results
+
+
+def run_case(iteration_id, run_log, campaign, ws):
+    source_archive = campaign['archives'].get(iteration_id)
+    if source_archive:
+        log_message(run_log, f"开始第 {iteration_id} 轮测试... ({ws['name']}) 存档 {source_archive}")
+    else:
+        seed = case_seed(campaign['seed'], iteration_id)
+        log_message(run_log, f"开始第 {iteration_id} 轮测试... ({ws['name']}) seed={seed}")
+
+    # 数据补丁模式：本工作区固件已按保留段编译过，只需生成补丁并改写镜像
+    patch_only = campaign['data_only'] and ws.get('firmware_ready', False)
+    patch_path = os.path.join(ws['c_build_dir'], PATCH_FILE)
+    case_file = patch_path if patch_only else os.path.join(ws['csrc_dir'], "test_case.c")
+
+    # 调用测试用例生成脚本
+    archive = os.path.join(ws['csrc_dir'], ARCHIVE_FILE)
+    if os.path.exists(archive):
+        os.remove(archive)  # 生成失败时不保存上一轮的存档
+    gen_cmd = [sys.executable, campaign['generator'], "--out-dir", ws['csrc_dir'], "--archive", archive]
+    if source_archive:
+        gen_cmd += ["--from-archive", os.path.abspath(source_archive)]
+    else:
+        gen_cmd += ["--seed", str(seed)]
+    if campaign['batch'] > 1:
+        gen_cmd += ["--batch", str(campaign['batch'])]
+    if campaign['bin']:
+        gen_cmd.append("--bin")
+    if campaign['strided']:
+        gen_cmd.append("--strided")
+    if campaign['dump_dst']:
+        gen_cmd.append("--dump-dst")
+    if campaign['data_only']:
+        gen_cmd.append("--reserve")
+    if patch_only:
+        gen_cmd += ["--patch-out", patch_path]
     try:
-        subprocess.run([sys.executable, "generate_test_case.py"], check=True, cwd="/home/etc/FPGA/e203_simulator")
+        subprocess.run(gen_cmd, check=True, cwd=SIM_ROOT_DIR)
     except subprocess.CalledProcessError as e:
-        message = f"生成测试用例失败: {e}"
-        print(message)
-        run_log.write(message + '\n')
-        run_log.flush()
-        return "exception", None
-    
-    # 运行 make sim，实时捕获输出
-    log_path = os.path.join(LOG_DIR, f"log_{iteration_id}.txt")
+        log_message(run_log, f"生成测试用例失败: {e}")
+        return "exception", {}
+
+    if campaign['screen']:
+        # 仿真前用逐位精确模型检查预期输出，模型与预期不一致的用例硬件必然无法通过，不再仿真
+        for c, case in enumerate(load_case_archive(archive)[1]):
+            bad = check_case(case)
+            if bad:
+                log_message(run_log, f"第 {iteration_id} 轮用例 {c} 未通过模型筛查: "
+                                     f"{len(bad)} 个元素与预期不一致，首个 @{bad[0]}，跳过仿真")
+                return "screened", {}
+
+    log_path = os.path.join(campaign['log_dir'], f"log_{iteration_id}.txt")
     with open(log_path, 'w', encoding='utf-8') as log_file:
-        process = subprocess.Popen(["make", "sim"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd="/home/etc/FPGA/e203_simulator", text=True, encoding='utf-8')
-        
+        if patch_only:
+            # 按 ELF 符号地址改写 .test_case_data 段并重新分割镜像，不调用工具链
+            program = os.path.join(ws['c_build_dir'], TARGET)
+            build = subprocess.run([sys.executable, SPLIT_MEMORY, f"{program}.elf",
+                                    "--patch", patch_path, "--cache", "--bin",
+                                    "--ld", LINKER_SCRIPT],
+                                   stdout=log_file, stderr=subprocess.STDOUT, cwd=SIM_ROOT_DIR)
+        else:
+            # 编译固件（输出到当前工作区）
+            build = subprocess.run(["make", "compile_c",
+                                    f"C_SRC_DIR={ws['csrc_dir']}", f"C_BUILD_DIR={ws['c_build_dir']}"],
+                                   stdout=log_file, stderr=subprocess.STDOUT, cwd=SIM_ROOT_DIR)
+        if build.returncode != 0:
+            log_message(run_log, f"第 {iteration_id} 轮固件{'镜像改写' if patch_only else '编译'}失败。")
+            return "exception", {}
+        ws['firmware_ready'] = True
+        log_file.flush()
+
+        # 直接启动已编译好的仿真器（不再经过 make run），实时捕获输出
+        program = os.path.join(ws['c_build_dir'], TARGET)
+        shutil.rmtree(ws['sim_out_dir'], ignore_errors=True)
+        os.makedirs(ws['sim_out_dir'])
+        sim_cmd = [SIM_EXEC, f"+itcm_init={program}", "+mem_bin"]
+        if campaign['heartbeat']:
+            sim_cmd.append(f"+heartbeat={HEARTBEAT_CYCLES}")
+        if campaign['dump_dst']:
+            try:
+                sim_cmd += dump_plusargs(program, os.path.join(ws['sim_out_dir'], DUMP_FILE))
+            except (subprocess.CalledProcessError, ValueError, KeyError) as e:
+                log_message(run_log, f"第 {iteration_id} 轮读取 {DUMP_MARKER}/dst_data 符号失败: {e}")
+                return "exception", {}
+        process = subprocess.Popen(sim_cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   cwd=ws['sim_out_dir'], text=True, encoding='utf-8')
+
         last_output_time = time.time()
-        finished = False
+        watchdog = new_watchdog(last_output_time)
+        verdict = new_verdict()
+        max_fail_lines = campaign['max_fail_lines']
         while True:
+            hang = None
             # 非阻塞等待输出，最多1秒
             ready, _, _ = select.select([process.stdout], [], [], 1.0)
             if ready:
@@ -48,58 +401,364 @@ def run_iteration(iteration_id, run_log):
                 log_file.write(line)
                 log_file.flush()  # 确保实时写入
                 last_output_time = time.time()  # 更新最后输出时间
-                if "Test Finished." in line:
-                    finished = True
-                    process.terminate()
-                    try:
-                        process.wait(timeout=5)
-                    except subprocess.TimeoutExpired:
-                        process.kill()
+                watchdog['last_output'] = last_output_time
+                beat = verdict['cycle']
+                classify_line(verdict, line)
+                if campaign['heartbeat'] and verdict['cycle'] != beat:
+                    hang = watchdog_on_heartbeat(watchdog, verdict, ws, last_output_time)
+                if verdict['finished']:
+                    stop_process(process)
                     break
-            else:
+                if max_fail_lines and verdict['fail_lines'] >= max_fail_lines:
+                    # 结果已确定为失败，不必等待剩余的错误元素逐行输出
+                    log_file.write(f"[RUNNER] {verdict['fail_lines']} 行 {FAIL_TAG}，提前终止仿真\n")
+                    log_message(run_log, f"第 {iteration_id} 轮出现 {verdict['fail_lines']} 行 {FAIL_TAG}，提前终止仿真。")
+                    stop_process(process)
+                    return "fail", verdict['cases']
+            elif not campaign['heartbeat']:
                 # 没有输出，检查超时
-                if time.time() - last_output_time > TIMEOUT_SECONDS:
-                    message = f"第 {iteration_id} 轮 5分钟无输出，终止进程。"
-                    print(message)
-                    run_log.write(message + '\n')
-                    run_log.flush()
-                    process.terminate()
-                    try:
-                        process.wait(timeout=5)
-                    except subprocess.TimeoutExpired:
-                        process.kill()
-                    # 保存异常用例
-                    shutil.copy("/home/etc/FPGA/e203_simulator/eai_csrc/test_case.c", os.path.join(EXCEPTION_DIR, f"exception_{iteration_id}.c"))
-                    return "exception", None
-    
+                if time.time() - last_output_time > campaign['timeout']:
+                    hang = f"{campaign['timeout']} 秒无输出"
+
+            if campaign['heartbeat'] and hang is None:
+                hang = watchdog_check(watchdog, verdict, ws, time.time())
+            if hang:
+                log_file.write(f"[RUNNER] 判定为卡死: {hang}\n")
+                log_message(run_log, f"第 {iteration_id} 轮判定为卡死（{hang}），终止进程。")
+                stop_process(process)
+                # 保存异常用例
+                save_exception_case(iteration_id, campaign, ws, case_file)
+                return "exception", {}
+
     # 如果没有找到 "Test Finished."，也标记为异常
-    if not finished:
-        return "exception", None
-    
-    # 读取完整 log 内容用于结果检查
-    with open(log_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # 检查结果
-    if "All tests passed!" in content:
-        result = "pass"
-    elif "tests failed" in content:
-        result = "fail"
+    if not verdict['finished']:
+        return "exception", {}
+
+    if campaign['dump_dst']:
+        return check_dump(iteration_id, run_log, ws, verdict, archive, log_path)
+    return verdict['result'], verdict['cases']
+
+
+def dump_plusargs(program, dump_path):
+    """--dump-dst：从 ELF 读取 tb_dump_dst() 入口与 dst_data 的地址和大小，组成 testbench 的 +dump_* 参数"""
+    symbols = subprocess.run([sys.executable, SPLIT_MEMORY, f"{program}.elf", "--symbols", DUMP_MARKER, "dst_data"],
+                             capture_output=True, text=True, check=True, cwd=SIM_ROOT_DIR)
+    symbols = json.loads(symbols.stdout)
+    addr, size = symbols['dst_data']
+    return [f"+dump_pc={symbols[DUMP_MARKER][0]:x}", f"+dump_addr={addr:x}", f"+dump_len={size}",
+            f"+dump_file={dump_path}"]
+
+
+def check_dump(iteration_id, run_log, ws, verdict, archive, log_path):
+    """
+    --dump-dst：按存档中的用例逐个比较导出的 dst_data，错误行与热力图追加到仿真日志。
+    固件只报告状态码错误（[CASE i] FAIL），其余用例的结果由主机比较决定
+    """
+    cases = load_case_archive(archive)[1]
+    dump_path = os.path.join(ws['sim_out_dir'], DUMP_FILE)
+    try:
+        dumps = read_dump(dump_path)
+    except (OSError, ValueError) as e:
+        log_message(run_log, f"第 {iteration_id} 轮读取导出文件失败: {e}")
+        return "exception", {}
+    if len(dumps) != len(cases):
+        log_message(run_log, f"第 {iteration_id} 轮导出 {len(dumps)} 次，应为 {len(cases)} 次（每个用例一次）")
+        return "exception", {}
+
+    case_results = dict(verdict['cases'])
+    with open(log_path, 'a', encoding='utf-8') as log_file:
+        log_file.write(f"[RUNNER] 主机比较 {dump_path}\n")
+        for c, (case, dump) in enumerate(zip(cases, dumps)):
+            try:
+                result, lines = report_dump(c, case, dump)
+            except ValueError as e:
+                result, lines = "fail", [f"{FAIL_TAG} case {c}: {e}"]
+            log_file.write(''.join(line + "\n" for line in lines))
+            case_results.setdefault(c, result)
+
+    failed = sorted(c for c, r in case_results.items() if r != "pass")
+    if failed:
+        log_message(run_log, f"第 {iteration_id} 轮主机比较未通过的用例: {','.join(map(str, failed))}"
+                             f"（错误分布见 {log_path}）")
+    return ("fail" if failed or verdict['result'] == "fail" else "pass"), case_results
+
+
+def save_exception_case(iteration_id, campaign, ws, case_file):
+    """保存异常用例；--bin 模式下操作数不在 test_case.c 中，整个用例目录一并保存"""
+    if campaign['bin']:
+        shutil.copytree(ws['csrc_dir'], os.path.join(campaign['exception_dir'], f"exception_{iteration_id}"),
+                        ignore=shutil.ignore_patterns("*.o", "*.d"), dirs_exist_ok=True)
+        return
+    ext = os.path.splitext(case_file)[1]
+    shutil.copy(case_file, os.path.join(campaign['exception_dir'], f"exception_{iteration_id}{ext}"))
+
+
+def keep_case_archive(iteration_id, campaign, ws):
+    """保存未通过轮次的用例存档（生成失败时可能不存在）"""
+    archive = os.path.join(ws['csrc_dir'], ARCHIVE_FILE)
+    if os.path.exists(archive):
+        shutil.copy(archive, os.path.join(campaign['exception_dir'], f"case_{iteration_id}{ARCHIVE_SUFFIX}"))
+
+
+# ========== 并行 worker ==========
+_worker = {}
+
+
+def _init_worker(slot_queue, campaign):
+    # 忽略 Ctrl-C，由主进程统一终止进程池
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    slot = slot_queue.get()
+    _worker['campaign'] = campaign
+    _worker['ws'] = create_workspace(slot)
+    _worker['run_log'] = open(os.path.join(campaign['log_dir'], f"run_log_w{slot}.txt"), 'w', encoding='utf-8')
+
+
+def _run_worker_iteration(iteration_id):
+    result, case_results = run_iteration(iteration_id, _worker['run_log'], _worker['campaign'], _worker['ws'])
+    # 日志内容已保存在 log_<i>.txt 中，只把逐用例结果传回主进程
+    return iteration_id, result, case_results
+
+
+def iterate_results(campaign, jobs, run_log, iterations=None):
+    """按轮次顺序产出 (iteration_id, result, case_results)，jobs > 1 时各轮在进程池中并行执行"""
+    if iterations is None:
+        iterations = range(1, campaign['iterations'] + 1)
+    if jobs <= 1:
+        ws = default_workspace()
+        for i in iterations:
+            result, case_results = run_iteration(i, run_log, campaign, ws)
+            yield i, result, case_results
+        return
+
+    slot_queue = multiprocessing.Queue()
+    for slot in range(jobs):
+        slot_queue.put(slot)
+    with multiprocessing.Pool(processes=jobs, initializer=_init_worker, initargs=(slot_queue, campaign)) as pool:
+        # imap 保持轮次顺序，汇总结果与串行模式一致
+        for item in pool.imap(_run_worker_iteration, iterations, chunksize=1):
+            yield item
+
+
+def replay(args, generator, replay_dir):
+    """重新生成并仿真单轮用例，日志与未通过时的存档写入 replay_dir"""
+    campaign = {
+        'generator': generator,
+        'log_dir': replay_dir,
+        'exception_dir': replay_dir,
+        'iterations': 1,
+        'timeout': TIMEOUT_SECONDS,
+        'data_only': args.data_only,
+        'batch': args.batch,
+        'bin': args.bin,
+        'strided': args.strided,
+        'dump_dst': args.dump_dst,
+        'max_fail_lines': args.max_fail_lines,
+        'heartbeat': not args.no_heartbeat,
+        'screen': args.screen,
+        'seed': args.seed,
+        'archives': {},
+    }
+    if args.replay.endswith(ARCHIVE_SUFFIX):
+        # 生成器与用例形态以存档为准
+        meta, cases = load_case_archive(args.replay)
+        campaign.update(generator=meta['generator'], data_only=meta['reserve'], batch=len(cases),
+                        bin=meta['bin'], archives={1: args.replay})
+        iteration_id = 1
     else:
-        result = "unknown"
-    
-    return result, content
+        iteration_id = int(args.replay)
+    os.makedirs(replay_dir, exist_ok=True)
+
+    with open(os.path.join(replay_dir, "run_log.txt"), 'w', encoding='utf-8') as run_log:
+        if not prepare_campaign(run_log, rebuild_model=args.rebuild_model):
+            return 1
+        result, case_results = run_iteration(iteration_id, run_log, campaign, default_workspace())
+        failed_cases = sorted(c for c, r in case_results.items() if r != "pass")
+        detail = f", 未通过用例: {','.join(map(str, failed_cases))}" if failed_cases else ""
+        log_message(run_log, f"复现完成: {result}{detail}，日志: "
+                             f"{os.path.join(replay_dir, f'log_{iteration_id}.txt')}")
+    return 0 if result == "pass" else 1
+
+
+def shrink(args, generator, shrink_dir):
+    """
+    缩小失败用例：每一步把当前用例的全部候选（shrink_case.shrink_candidates）写成单用例存档并行仿真，
+    在结果与原用例相同（fail 或 exception）的候选中取代价最小的继续，直到没有候选仍然失败。
+    第 0 步单独仿真存档中的每个用例，确定要缩小的用例及其失败类型。
+    """
+    meta, cases = load_case_archive(args.shrink)
+    meta = dict(meta, batch=1)
+    campaign = {
+        'generator': meta['generator'],
+        'log_dir': shrink_dir,
+        'exception_dir': shrink_dir,
+        'iterations': 0,
+        'timeout': TIMEOUT_SECONDS,
+        'data_only': meta['reserve'],
+        'batch': 1,
+        'bin': meta['bin'],
+        'strided': False,  # 布局随存档中的用例
+        'dump_dst': args.dump_dst,
+        'max_fail_lines': args.max_fail_lines,
+        'heartbeat': not args.no_heartbeat,
+        'screen': False,
+        'seed': meta['seed'],
+        'archives': {},
+    }
+    os.makedirs(shrink_dir, exist_ok=True)
+    run_log = open(os.path.join(shrink_dir, "run_log.txt"), 'w', encoding='utf-8')
+    if not prepare_campaign(run_log, rebuild_model=args.rebuild_model):
+        run_log.close()
+        return 1
+
+    candidates = [(f"用例 {c}", case) for c, case in enumerate(cases)]
+    current, expected = None, None
+    next_id = 1
+    for round_id in itertools.count():
+        if not candidates:
+            break
+        ids = list(range(next_id, next_id + len(candidates)))
+        next_id += len(candidates)
+        campaign['archives'] = {}
+        for i, (label, case) in zip(ids, candidates):
+            path = os.path.join(shrink_dir, f"case_{i}{ARCHIVE_SUFFIX}")
+            save_case_archive(path, [case], meta)
+            campaign['archives'][i] = path
+        log_message(run_log, f"第 {round_id} 步: 并行仿真 {len(candidates)} 个候选（第 {ids[0]}~{ids[-1]} 次）")
+
+        failing = []
+        for i, result, _ in iterate_results(campaign, args.jobs, run_log, iterations=ids):
+            label, case = candidates[i - ids[0]]
+            log_message(run_log, f"  [{i}] {label} (K={case['K']}, N={case['N']}, M={case['M']}): {result}")
+            if result != "pass" and (expected is None or result == expected):
+                failing.append((case_cost(case), i, label, case, result))
+        if not failing:
+            break
+        _, best_id, label, current, expected = min(failing, key=lambda item: item[:2])
+        shutil.copy(campaign['archives'][best_id], os.path.join(shrink_dir, SHRINK_RESULT))
+        log_message(run_log, f"第 {round_id} 步采用 [{best_id}] {label}")
+        candidates = shrink_candidates(current, meta.get('min_dim', 1))
+
+    if current is None:
+        log_message(run_log, f"{args.shrink} 中的用例均未复现失败，无法缩小")
+        run_log.close()
+        return 1
+    log_message(run_log, f"缩小完成（{expected}）: K={current['K']}, N={current['N']}, M={current['M']}, "
+                         f"存档 {os.path.join(shrink_dir, SHRINK_RESULT)}（可用 --replay 复现）")
+    run_log.close()
+    return 0
+
+
+def main(generator=GENERATOR, log_dir=LOG_DIR, exception_dir=EXCEPTION_DIR):
+    parser = argparse.ArgumentParser(description="随机矩阵乘法回归测试")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="并行 worker 数（默认 1，串行）")
+    parser.add_argument("-n", "--iterations", type=int, default=NUM_ITERATIONS, help="测试轮数")
+    parser.add_argument("--rebuild-model", action="store_true", help="忽略模型哈希，强制重新编译 Verilator 模型")
+    parser.add_argument("--data-only", action="store_true",
+                        help="每个工作区只编译一次固件，后续用例仅改写测试数据段（不调用 RISC-V 工具链）")
+    parser.add_argument("--batch", type=int, default=1, metavar="N",
+                        help="每次仿真验证 N 组用例（默认 1），准确率按用例统计")
+    parser.add_argument("--bin", action="store_true",
+                        help="操作数以 .bin + .incbin 方式链接，大尺寸用例的固件编译时间基本恒定")
+    parser.add_argument("--strided", action="store_true",
+                        help="操作数与输出放入带随机行填充和字节偏移的缓冲区，验证非默认步长与非对齐访问")
+    parser.add_argument("--dump-dst", action="store_true",
+                        help="固件不保存预期输出也不逐元素比较，由 testbench 导出 dst_data，在主机上比较并输出错误热力图")
+    parser.add_argument("--no-heartbeat", action="store_true",
+                        help=f"关闭心跳看门狗，回退到固定的 {TIMEOUT_SECONDS} 秒无输出超时")
+    parser.add_argument("--max-fail-lines", type=int, default=MAX_FAIL_LINES, metavar="N",
+                        help=f"出现 N 行 {FAIL_TAG} 即判定失败并终止仿真（默认 {MAX_FAIL_LINES}，0 表示不提前终止；"
+                             "--batch 下剩余用例计为未通过）")
+    parser.add_argument("--screen", action="store_true",
+                        help="仿真前用 mma_model.py 检查预期输出，模型判定不可能通过的轮次跳过仿真，不计入准确率")
+    parser.add_argument("--seed", type=int,
+                        help="回归种子（默认随机选取，记录在 summary.txt 中），各轮用例种子由它与轮次派生")
+    parser.add_argument("--replay", metavar="ARCHIVE|ITER",
+                        help="只重新生成并仿真一轮：.npz 用例存档，或轮次号（需同时给出原回归的 --seed 及相同的选项）")
+    parser.add_argument("--shrink", metavar="ARCHIVE",
+                        help="缩小 .npz 存档中的失败用例（尺寸、数据、量化模式），每一步的候选按 -j 并行仿真")
+    args = parser.parse_args()
+    if args.batch < 1:
+        parser.error("--batch 必须 >= 1")
+    if args.batch > 1 and args.data_only:
+        parser.error("--batch 不能与 --data-only 同时使用")
+    # 与生成器的检查一致，在回归开始前报错，而不是每一轮都在链接时 extram 溢出
+    max_cases = importlib.import_module(os.path.splitext(os.path.basename(generator))[0]).max_batch()
+    if args.batch > max_cases:
+        parser.error(f"--batch 最多为 {max_cases}：更多用例即使取最小尺寸也放不进生成器的 BATCH_DATA_BUDGET")
+    if args.bin and (args.batch > 1 or args.data_only):
+        parser.error("--bin 不能与 --batch/--data-only 同时使用")
+    if args.strided and (args.bin or args.data_only):
+        parser.error("--strided 不能与 --bin/--data-only 同时使用")
+    if args.dump_dst and (args.bin or args.data_only):
+        parser.error("--dump-dst 不能与 --bin/--data-only 同时使用")
+    if args.replay is not None and not args.replay.endswith(ARCHIVE_SUFFIX) and args.seed is None:
+        parser.error("--replay <轮次> 需要原回归的 --seed")
+
+    if args.replay is not None and args.shrink:
+        parser.error("--replay 不能与 --shrink 同时使用")
+
+    if args.shrink:
+        return shrink(args, generator, os.path.join(log_dir, SHRINK_DIR))
+    if args.replay is not None:
+        return replay(args, generator, os.path.join(log_dir, REPLAY_DIR))
+
+    os.makedirs(log_dir, exist_ok=True)
+    os.makedirs(exception_dir, exist_ok=True)
+    seed = args.seed if args.seed is not None else new_seed()
+
+    campaign = {
+        'generator': generator,
+        'log_dir': log_dir,
+        'exception_dir': exception_dir,
+        'iterations': args.iterations,
+        'timeout': TIMEOUT_SECONDS,
+        'data_only': args.data_only,
+        'batch': args.batch,
+        'bin': args.bin,
+        'strided': args.strided,
+        'dump_dst': args.dump_dst,
+        'max_fail_lines': args.max_fail_lines,
+        'heartbeat': not args.no_heartbeat,
+        'screen': args.screen,
+        'seed': seed,
+        'archives': {},
+    }
 
-def main():
     pass_count = 0
     total_count = 0
-    summary_log = os.path.join(LOG_DIR, "summary.txt")
-    run_log_path = os.path.join(LOG_DIR, "run_log.txt")
+    screened_count = 0
+    accuracy = 0
+    summary_log = os.path.join(log_dir, "summary.txt")
+    run_log_path = os.path.join(log_dir, "run_log.txt")
     run_log = open(run_log_path, 'w', encoding='utf-8')
-    
+
+    if not prepare_campaign(run_log, rebuild_model=args.rebuild_model):
+        run_log.close()
+        return 1
+
     with open(summary_log, 'w') as summary:
-        for i in range(1, NUM_ITERATIONS + 1):
-            result, content = run_iteration(i, run_log)
+        summary.write(f"回归种子: {seed}（复现第 i 轮: --replay i --seed {seed}，其余选项与本次相同）\n")
+        log_message(run_log, f"回归种子: {seed}")
+        for i, result, case_results in iterate_results(campaign, args.jobs, run_log):
+            if result == "screened":
+                screened_count += 1
+                summary.write(f"第 {i} 轮: {result}（模型筛查未通过，未仿真）\n")
+                summary.flush()
+                continue
+            if args.batch > 1:
+                # 按用例统计：未输出结果行的用例（超时、异常等）计为未通过
+                case_pass = sum(1 for r in case_results.values() if r == "pass")
+                failed_cases = sorted(c for c in range(args.batch) if case_results.get(c) != "pass")
+                total_count += args.batch
+                pass_count += case_pass
+                accuracy = (pass_count / total_count) * 100 if total_count > 0 else 0
+                detail = f", 未通过用例: {','.join(map(str, failed_cases))}" if failed_cases else ""
+                summary.write(f"第 {i} 轮: {result}, 用例通过 {case_pass}/{args.batch}{detail}, "
+                              f"当前准确率: {accuracy:.2f}%\n")
+                summary.flush()
+                log_message(run_log, f"第 {i} 轮完成: {result}, 用例通过 {case_pass}/{args.batch}, 准确率: {accuracy:.2f}%")
+                continue
+
             total_count += 1
             if result == "pass":
                 pass_count += 1
@@ -107,21 +766,20 @@ def main():
                 pass_count += 0  # 不增加
             elif result == "exception":
                 pass_count += 0
-            
+
             accuracy = (pass_count / total_count) * 100 if total_count > 0 else 0
             summary.write(f"第 {i} 轮: {result}, 当前准确率: {accuracy:.2f}%\n")
-            message = f"第 {i} 轮完成: {result}, 准确率: {accuracy:.2f}%"
-            print(message)
-            run_log.write(message + '\n')
-            run_log.flush()
-        
-        summary.write(f"\n最终总结: 总轮数 {total_count}, 通过 {pass_count}, 准确率 {accuracy:.2f}%\n")
-        message = f"测试完成。最终准确率: {accuracy:.2f}%"
-        print(message)
-        run_log.write(message + '\n')
-        run_log.flush()
-    
+            summary.flush()
+            log_message(run_log, f"第 {i} 轮完成: {result}, 准确率: {accuracy:.2f}%")
+
+        unit = "用例数" if args.batch > 1 else "轮数"
+        summary.write(f"\n最终总结: 总{unit} {total_count}, 通过 {pass_count}, 准确率 {accuracy:.2f}%\n")
+        if screened_count:
+            summary.write(f"模型筛查跳过 {screened_count} 轮（用例存档见 {exception_dir}）\n")
+        log_message(run_log, f"测试完成。最终准确率: {accuracy:.2f}%")
+
     run_log.close()
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
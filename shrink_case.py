@@ -0,0 +1,153 @@
+"""
+失败用例缩小 - run_tests.py --shrink 使用
+
+由当前用例派生一组更简单的候选：缩小 K/N/M（保留原数据的左上角）、lhs/rhs 清零或只保留绝对值最大的
+一个元素、bias 清零、per-channel 改为 per-tensor、S16 lhs 截断为 S8。候选按与生成器相同的公式重新计算
+requant 参数与预期输出；run_tests.py 并行仿真每一步的候选，取仍然失败且代价最小的一个继续缩小。
+
+用法: python3 shrink_case.py --self-check [--trials N]
+  对两个生成器的随机用例检查 finish_case() 重算的结果与生成器逐位一致。
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from requant import compute_requant_params, compute_requant_params_per_channel, requantize_array
+
+INT32_MAX = np.iinfo(np.int32).max
+
+# 生成器计算的派生字段，finish_case() 重新计算后逐位比较
+DERIVED_KEYS = ('result', 'dst_mult', 'dst_shift', 'dst_mults', 'dst_shifts', 'quantized')
+
+
+def finish_case(case):
+    """
+    由 lhs/rhs/bias 与量化模式重新计算尺寸、result、requant 参数与预期输出，返回新用例；
+    requant 乘数超出 int32（累加值过小）时返回 None，这样的候选固件无法表示。
+    """
+    case = dict(case)
+    lhs, rhs, bias = case['lhs'], case['rhs'], case['bias']
+    case['K'], case['N'] = lhs.shape
+    case['M'] = rhs.shape[1]
+    result = np.dot(lhs.astype(np.int32), rhs.astype(np.int32)) + bias
+    case['result'] = result
+
+    if case.get('quant_mode') == 1:  # per-channel（只有 complex 用例带 quant_mode）
+        try:
+            mults, shifts = compute_requant_params_per_channel(result, axis=1)
+        except OverflowError:
+            return None
+        case.update(dst_mult=0, dst_shift=0, dst_mults=mults, dst_shifts=shifts)
+    else:
+        mults, shifts = compute_requant_params(result)
+        if mults > INT32_MAX:
+            return None
+        case.update(dst_mult=mults, dst_shift=shifts)
+        if 'quant_mode' in case:
+            case.update(dst_mults=mults, dst_shifts=shifts)
+    case['quantized'] = requantize_array(result, mults, shifts)
+    return case
+
+
+def case_cost(case):
+    """候选的优先级：先比 MAC 数（决定仿真时间），再比非零元素数与量化/位宽的复杂度"""
+    nonzero = sum(int(np.count_nonzero(case[key])) for key in ('lhs', 'rhs', 'bias'))
+    return (case['K'] * case['N'] * case['M'], nonzero,
+            case.get('quant_mode', 0), case.get('lhs_dtype', 1))
+
+
+def _single_nonzero(array):
+    """只保留绝对值最大的一个元素；已不超过一个非零元素时返回 None"""
+    if np.count_nonzero(array) <= 1:
+        return None
+    index = np.unravel_index(np.argmax(np.abs(array.astype(np.int32))), array.shape)
+    single = np.zeros_like(array)
+    single[index] = array[index]
+    return single
+
+
+def _smaller_dims(value, min_dim):
+    """某一维的候选尺寸：最小值、折半、减一"""
+    return sorted({d for d in (min_dim, (value + min_dim) // 2, value - 1) if min_dim <= d < value})
+
+
+def shrink_candidates(case, min_dim):
+    """返回 [(描述, 候选用例), ...]，候选均比 case 更简单且已重新计算预期输出"""
+    K, N, M = case['K'], case['N'], case['M']
+    raw = []
+
+    def resized(k, n, m):
+        return dict(case, lhs=case['lhs'][:k, :n], rhs=case['rhs'][:n, :m], bias=case['bias'][:m])
+
+    for k in _smaller_dims(K, min_dim):
+        raw.append((f"K={k}", resized(k, N, M)))
+    for n in _smaller_dims(N, min_dim):
+        raw.append((f"N={n}", resized(K, n, M)))
+    for m in _smaller_dims(M, min_dim):
+        raw.append((f"M={m}", resized(K, N, m)))
+    halves = [max(min_dim, d // 2) for d in (K, N, M)]
+    if halves != [K, N, M]:
+        raw.append(("K/N/M={}/{}/{}".format(*halves), resized(*halves)))
+
+    for key in ('lhs', 'rhs', 'bias'):
+        if np.any(case[key]):
+            raw.append((f"{key}=0", dict(case, **{key: np.zeros_like(case[key])})))
+    for key in ('lhs', 'rhs'):
+        single = _single_nonzero(case[key])
+        if single is not None:
+            raw.append((f"{key} 单个非零元素", dict(case, **{key: single})))
+
+    if case.get('quant_mode') == 1:
+        raw.append(("per-tensor", dict(case, quant_mode=0)))
+    if case.get('lhs_dtype') == 2:
+        raw.append(("lhs S16->S8", dict(case, lhs_dtype=1, lhs=np.clip(case['lhs'], -128, 127).astype(np.int8))))
+
+    candidates = []
+    for label, candidate in raw:
+        candidate = finish_case(candidate)
+        if candidate is not None:
+            candidates.append((label, candidate))
+    return candidates
+
+
+def self_check(trials=20):
+    import generate_test_case
+    import generate_test_case_complex
+
+    checked = 0
+    for gen in (generate_test_case, generate_test_case_complex):
+        for _ in range(trials):
+            case = gen.generate_case()
+            rebuilt = finish_case(case)
+            for key in DERIVED_KEYS:
+                if key not in case:
+                    continue
+                exp, act = np.asarray(case[key]), np.asarray(rebuilt[key])
+                if exp.shape != act.shape or not np.array_equal(exp, act):
+                    print(f"[FAIL] {gen.__name__}: {key} differs after finish_case "
+                          f"(K={case['K']}, N={case['N']}, M={case['M']})")
+                    return 1
+            for label, candidate in shrink_candidates(case, gen.MIN_DIM):
+                if case_cost(candidate) >= case_cost(case) or min(candidate[d] for d in 'KNM') < gen.MIN_DIM:
+                    print(f"[FAIL] {gen.__name__}: candidate '{label}' is not simpler than the case")
+                    return 1
+            checked += 1
+    print(f"[PASS] finish_case matches the generators over {checked} cases")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="失败用例缩小：候选生成自检")
+    parser.add_argument("--self-check", action="store_true", help="检查重算的预期输出与生成器一致")
+    parser.add_argument("--trials", type=int, default=20, help="每个生成器的随机用例数")
+    args = parser.parse_args()
+    if not args.self_check:
+        parser.print_help()
+        return 0
+    return self_check(args.trials)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
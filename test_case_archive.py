@@ -0,0 +1,72 @@
+"""
+测试用例存档与随机种子 - generate_test_case*.py --seed/--archive/--from-archive 与 run_tests.py --replay 使用
+
+每个用例由记录下来的种子加生成参数确定；存档为压缩 .npz：
+  meta      JSON 字符串：存档版本、生成器、种子、生成参数以及各用例的标量字段（尺寸、lhs 位宽、量化模式等）
+  c<i>_<键> 各用例的数组（lhs/rhs/bias/quantized 及 per-channel 参数），dtype 与形状原样保存
+未量化的累加结果 result 可由 lhs/rhs/bias 重新算出，不写入存档。
+"""
+
+import json
+import os
+import random
+
+import numpy as np
+
+ARCHIVE_VERSION = 1
+ARCHIVE_SUFFIX = ".npz"
+SEED_BITS = 32
+
+
+def new_seed():
+    """未指定 --seed 时使用的随机种子"""
+    return int.from_bytes(os.urandom(SEED_BITS // 8), 'little')
+
+
+def seed_generators(seed):
+    """同时设置 random 与 np.random，生成器内部的调用顺序不变，相同种子得到相同用例"""
+    random.seed(seed)
+    np.random.seed(seed % (1 << SEED_BITS))
+
+
+def case_seed(campaign_seed, iteration_id):
+    """回归中第 iteration_id 轮的用例种子，由回归种子唯一确定"""
+    return (campaign_seed * 1000003 + iteration_id) % (1 << SEED_BITS)
+
+
+def save_case_archive(path, cases, meta):
+    """把一组用例写入 .npz 存档，meta 为生成器、种子及生成参数"""
+    arrays = {}
+    scalars = []
+    for i, case in enumerate(cases):
+        fields = {}
+        for key, value in case.items():
+            if key == 'result':
+                continue
+            if isinstance(value, np.ndarray):
+                arrays[f"c{i}_{key}"] = value
+            else:
+                fields[key] = int(value)
+        scalars.append(fields)
+    header = dict(meta, version=ARCHIVE_VERSION, cases=scalars)
+    with open(path, 'wb') as f:
+        np.savez_compressed(f, meta=np.array(json.dumps(header)), **arrays)
+
+
+def load_case_archive(path):
+    """读取 .npz 存档，返回 (meta, cases)；cases 与生成器 generate_case() 的返回值格式一致"""
+    with np.load(path) as data:
+        meta = json.loads(str(data['meta']))
+        if meta.get('version') != ARCHIVE_VERSION:
+            raise ValueError(f"{path}: unsupported archive version {meta.get('version')}")
+        cases = []
+        for i, fields in enumerate(meta['cases']):
+            case = dict(fields)
+            prefix = f"c{i}_"
+            for key in data.files:
+                if key.startswith(prefix):
+                    case[key[len(prefix):]] = data[key]
+            acc = np.dot(case['lhs'].astype(np.int32), case['rhs'].astype(np.int32))
+            case['result'] = acc + case['bias']
+            cases.append(case)
+    return meta, cases
@@ -0,0 +1,53 @@
+"""
+测试用例二进制输出 - generate_test_case*.py --bin 使用
+
+把操作数写成小端 .bin 文件，再生成一个汇编桩 test_case_data.S 用 .incbin 链接进固件，
+符号名与 C 初始化列表方式一致（test_case.h 不变）。大尺寸用例无需 GCC 解析几百 KB
+的十进制初始化列表，固件编译时间与矩阵尺寸基本无关。
+"""
+
+import os
+
+import numpy as np
+
+from test_case_patch import TEST_CASE_SECTION
+
+STUB_FILE = "test_case_data.S"
+BIN_SUFFIX = ".bin"
+
+
+def remove_bin_outputs(out_dir):
+    """删除上一次 --bin 模式留下的汇编桩和 .bin 文件，避免与 C 初始化列表重复定义符号"""
+    if not os.path.isdir(out_dir):
+        return
+    for name in os.listdir(out_dir):
+        if name == STUB_FILE or name.endswith(BIN_SUFFIX):
+            os.remove(os.path.join(out_dir, name))
+
+
+def write_bin_blobs(out_dir, arrays):
+    """
+    arrays: [(symbol, array, dtype, order), ...]
+    每个数组写为 <symbol>.bin，并生成 .incbin 汇编桩（放入 .test_case_data 段）。
+    """
+    remove_bin_outputs(out_dir)
+    lines = [
+        '/* Auto-generated by generate_test_case*.py --bin, do not edit */\n',
+        '    .section %s, "aw"\n' % TEST_CASE_SECTION,
+    ]
+    for symbol, array, dtype, order in arrays:
+        bin_path = os.path.abspath(os.path.join(out_dir, symbol + BIN_SUFFIX))
+        arr = np.asarray(array).astype(np.dtype(dtype).newbyteorder('<'))
+        with open(bin_path, 'wb') as f:
+            f.write(arr.tobytes(order=order))
+        lines += [
+            '\n',
+            '    .balign 4\n',
+            '    .global %s\n' % symbol,
+            '    .type %s, @object\n' % symbol,
+            '%s:\n' % symbol,
+            '    .incbin "%s"\n' % bin_path,
+            '    .size %s, . - %s\n' % (symbol, symbol),
+        ]
+    with open(os.path.join(out_dir, STUB_FILE), 'w') as f:
+        f.write(''.join(lines))
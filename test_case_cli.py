@@ -0,0 +1,213 @@
+"""
+生成器命令行 - generate_test_case.py 与 generate_test_case_complex.py 共用
+
+两个生成器共同的选项、选项间的互斥检查、存档的保存与重放（--archive / --from-archive），以及按单用例 /
+多用例写出 test_case.c/.h 的流程都在这里。生成器以模块 gen 传入（与 bench_test_case_gen.py 相同），
+只提供各自的数据生成与 C 代码输出：generate_case()、write_debug()、write_case_arrays()、
+write_config_fields()、write_c_file()、write_h_file()，以及 MIN_DIM / MAX_DIM / BATCH_DATA_BUDGET、
+batch_max_dim()、max_batch()。
+"""
+
+import argparse
+import os
+
+from test_case_archive import load_case_archive, new_seed, save_case_archive, seed_generators
+from test_case_bin import remove_bin_outputs, write_bin_blobs
+from test_case_layout import ALIGNED_ATTR, buffer_sizes, is_strided, random_layout
+from test_case_patch import TEST_CASE_SECTION, operand_arrays, write_patch
+from test_case_place import format_placement, parse_placement
+
+# 默认输出目录：./eai_csrc
+DEFAULT_OUT_DIR = "/home/etc/FPGA/e203_simulator/eai_csrc"
+
+
+def build_parser(description):
+    """两个生成器共同的选项"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--out-dir", default=DEFAULT_OUT_DIR, help="输出目录，默认为 ./eai_csrc")
+    parser.add_argument("--reserve", action="store_true",
+                        help="测试数据放入 .test_case_data 保留段并按最大尺寸预留空间")
+    parser.add_argument("--patch-out", metavar="PATH",
+                        help="只生成数据补丁文件（配合 split_memory.py --patch），不生成 C 源码")
+    parser.add_argument("--batch", type=int, default=1, metavar="N",
+                        help="一次生成 N 组用例（test_configs[]），由固件在一次仿真中依次验证")
+    parser.add_argument("--bin", action="store_true",
+                        help="操作数写为 .bin 文件并通过 .incbin 汇编桩链接，test_case.c 只含配置")
+    parser.add_argument("--seed", type=int,
+                        help="随机种子，默认随机选取；相同种子与参数生成相同用例")
+    parser.add_argument("--archive", metavar="PATH",
+                        help="同时把生成的用例保存为 .npz 存档（run_tests.py --replay 使用）")
+    parser.add_argument("--from-archive", metavar="PATH",
+                        help="从 .npz 存档读取用例而不是随机生成，用例数由存档决定（忽略 --batch）")
+    parser.add_argument("--strided", action="store_true",
+                        help="操作数与输出放入带随机行填充和字节偏移的缓冲区（非默认步长、非对齐起点）")
+    parser.add_argument("--place", metavar="OP=REGION[,...]",
+                        help="把单用例的 lhs/rhs/bias/dst 固定到 ilm/ram/extram，如 lhs=ilm,dst=ram；"
+                             "默认沿用 --from-archive 存档中的放置方式")
+    parser.add_argument("--dump-dst", action="store_true",
+                        help="不生成预期输出，固件执行后由 testbench 导出 dst_data，run_tests.py --dump-dst 在主机上比较")
+    return parser
+
+
+def check_options(parser, args, gen):
+    """生成用例之前的选项检查，返回 --place 指定的放置方式（未指定时为 None）"""
+    try:
+        place = parse_placement(args.place) if args.place else None
+    except ValueError as e:
+        parser.error(str(e))
+    if args.batch < 1:
+        parser.error("--batch 必须 >= 1")
+    if not args.from_archive and args.batch > gen.max_batch():
+        parser.error(f"--batch 最多为 {gen.max_batch()}：更多用例即使取最小尺寸 {gen.MIN_DIM} "
+                     f"也放不进 BATCH_DATA_BUDGET（{gen.BATCH_DATA_BUDGET} 字节）")
+    if args.batch > 1 and (args.reserve or args.patch_out):
+        parser.error("--batch 不能与 --reserve/--patch-out 同时使用")
+    if args.bin and (args.batch > 1 or args.reserve or args.patch_out):
+        parser.error("--bin 不能与 --batch/--reserve/--patch-out 同时使用")
+    if args.strided and (args.reserve or args.patch_out or args.bin):
+        parser.error("--strided 不能与 --reserve/--patch-out/--bin 同时使用")
+    if args.dump_dst and (args.reserve or args.patch_out or args.bin):
+        parser.error("--dump-dst 不能与 --reserve/--patch-out/--bin 同时使用")
+    return place
+
+
+def load_cases(parser, args, gen, place, generate=None):
+    """
+    从 --from-archive 读取用例（未指定 --place 时沿用存档中的放置方式），或按 --seed 随机生成 --batch 组用例
+    （generate(args) 给出时代替默认的生成方式，如 --chain）；返回 (种子, 存档 meta（随机生成时为 {}）, 用例列表, 放置方式)
+    """
+    if args.from_archive:
+        meta, cases = load_case_archive(args.from_archive)
+        if place is None and meta.get('place'):
+            place = parse_placement(meta['place'])
+        if len(cases) > 1 and (args.reserve or args.patch_out or args.bin):
+            parser.error("多用例存档不能与 --reserve/--patch-out/--bin 同时使用")
+        return meta['seed'], meta, cases, place
+
+    seed = args.seed if args.seed is not None else new_seed()
+    seed_generators(seed)
+    if generate is not None:
+        cases = generate(args)
+    else:
+        max_dim = gen.batch_max_dim(args.batch) if args.batch > 1 else gen.MAX_DIM
+        cases = [gen.generate_case(max_dim) for _ in range(args.batch)]
+    if args.strided:
+        cases = [dict(case, **random_layout(case)) for case in cases]
+    return seed, {}, cases, place
+
+
+def check_cases(parser, args, cases, place, chain=None):
+    """用例确定之后（含存档中的布局、放置方式与链）的检查"""
+    if any(is_strided(case) for case in cases) and (args.reserve or args.patch_out or args.bin):
+        parser.error("跨步布局的存档不能与 --reserve/--patch-out/--bin 同时使用")
+    # 多用例数据按 BATCH_DATA_BUDGET（extram）预算，放入其他区域会超出区域长度，放置只用于单用例
+    if place and (chain or len(cases) > 1 or args.reserve or args.patch_out or args.bin):
+        parser.error("--place（或存档中的放置方式）只用于单用例，不能与 --batch/--chain/--reserve/--patch-out/--bin "
+                     "或多用例存档同时使用")
+    if args.dump_dst and chain:
+        parser.error("--dump-dst 不能用于连续矩阵乘法链的存档")
+
+
+def record_cases(args, cases, seed, gen, place, **meta):
+    """输出种子，给出 --archive 时保存存档（meta 为生成器额外记录的字段，如 chain）"""
+    print(f"seed={seed}")
+    if args.archive:
+        os.makedirs(os.path.dirname(args.archive) or '.', exist_ok=True)
+        save_case_archive(args.archive, cases, dict({
+            'generator': os.path.basename(gen.__file__), 'seed': seed,
+            'batch': len(cases), 'reserve': args.reserve, 'bin': args.bin, 'min_dim': gen.MIN_DIM,
+            'place': format_placement(place) if place else None,
+        }, **meta))
+
+
+def write_debug_file(cases, debug_path, write_debug):
+    """生成调试文件：未经量化的累加结果 (int32)，多用例时依次写入；write_debug(f, case) 写一组用例"""
+    with open(debug_path, 'w') as f:
+        for idx, case in enumerate(cases):
+            if len(cases) > 1:
+                if idx > 0:
+                    f.write("\n")
+                f.write(f"===== 用例 {idx} =====\n")
+            write_debug(f, case)
+
+
+def write_batch_c_file(cases, c_path, gen, expected=True):
+    """
+    生成多用例C文件：各用例数据紧凑排列在 .test_case_data 段（extram），
+    共用一块按最大 K x M 分配的 dst_data，test_main.c 依次执行 test_configs[]；
+    expected 为 False 时不写预期输出（--dump-dst）。
+    """
+    count = len(cases)
+    dst_size = max(buffer_sizes(case)['dst'] for case in cases)
+    attr = ' TEST_CASE_SECTION'
+    with open(c_path, 'w') as f:
+        f.write('#include "test_case.h"\n\n')
+        f.write('#define TEST_CASE_SECTION __attribute__((section("%s"), aligned(4)))\n\n' % TEST_CASE_SECTION)
+        for idx, case in enumerate(cases):
+            f.write(f'// ===== Case {idx}: K={case["K"]}, N={case["N"]}, M={case["M"]} =====\n')
+            gen.write_case_arrays(f, case, attr, suffix=f'_{idx}', expected=expected)
+
+        # 输出缓冲区（各用例共用；--strided 时按最大的视图分配）
+        f.write('// DST buffer (max K x M over all cases), shared by all cases\n')
+        dst_attr = ALIGNED_ATTR if is_strided(cases[0]) else ''
+        f.write('int8_t dst_data[{}]{};\n\n'.format(dst_size, dst_attr))
+
+        # 各用例的期望输出
+        if expected:
+            f.write('const int8_t *const expected_dst_ptrs[{}] = {{\n'.format(count))
+            for idx in range(count):
+                f.write(f'  expected_dst_data_{idx},\n')
+            f.write('};\n\n')
+
+        # Configs
+        f.write('// Auto-generated matmul configs\n')
+        f.write('dsa_matmul_config_t test_configs[{}]{} = {{\n'.format(count, attr))
+        for idx, case in enumerate(cases):
+            f.write('  {\n')
+            gen.write_config_fields(f, case, suffix=f'_{idx}', indent='    ')
+            f.write('  },\n')
+        f.write('};\n')
+
+
+def write_batch_h_file(cases, h_path, expected=True):
+    """生成多用例头文件：定义 TEST_CASE_COUNT，test_main.c 据此按批次执行；expected 为 False 时定义 TEST_DUMP_DST"""
+    count = len(cases)
+    dst_size = max(buffer_sizes(case)['dst'] for case in cases)
+    with open(h_path, 'w') as f:
+        f.write('#ifndef TEST_CASE_H\n')
+        f.write('#define TEST_CASE_H\n\n')
+        f.write('#include <stdint.h>\n')
+        f.write('#include "dsa_accel.h"\n\n')
+        f.write('#define TEST_CASE_COUNT %d\n\n' % count)
+        if not expected:
+            f.write('#define TEST_DUMP_DST 1\n\n')
+        f.write('extern int8_t dst_data[%d];\n' % dst_size)
+        if expected:
+            f.write('extern const int8_t *const expected_dst_ptrs[TEST_CASE_COUNT];\n')
+        f.write('extern dsa_matmul_config_t test_configs[TEST_CASE_COUNT];\n\n')
+        f.write('#endif // TEST_CASE_H\n')
+
+
+def write_outputs(args, cases, place, gen):
+    """写出 test_case.c/.h 与调试文件（多用例为 test_configs[]）；单用例给出 --patch-out 时只写数据补丁"""
+    expected = not args.dump_dst
+    if args.patch_out:
+        write_patch(cases[0], args.patch_out)
+        return
+
+    out_dir = args.out_dir
+    os.makedirs(out_dir, exist_ok=True)
+    c_path = os.path.join(out_dir, "test_case.c")
+    h_path = os.path.join(out_dir, "test_case.h")
+    if args.bin:
+        write_bin_blobs(out_dir, operand_arrays(cases[0]))
+    else:
+        remove_bin_outputs(out_dir)
+    write_debug_file(cases, os.path.join(out_dir, "debug_output.txt"), gen.write_debug)
+    if len(cases) > 1:
+        write_batch_c_file(cases, c_path, gen, expected=expected)
+        write_batch_h_file(cases, h_path, expected=expected)
+    else:
+        gen.write_c_file(cases[0], c_path, reserve=args.reserve, operands=not args.bin, place=place,
+                         expected=expected)
+        gen.write_h_file(cases[0], h_path, reserve=args.reserve, expected=expected)
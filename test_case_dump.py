@@ -0,0 +1,92 @@
+"""
+主机侧输出比较 - run_tests.py --dump-dst 使用
+
+generate_test_case*.py --dump-dst 生成的固件不保存预期输出，每个用例执行后调用 tb_dump_dst()，testbench
+在该函数入口把整个 dst_data 以十六进制写为导出文件的一行（tb_top.v 的 +dump_*）。这里逐行取出用例的
+K x M 输出视图（按 test_case_layout.py 的步长与偏移）与存档中的预期输出比较，检查视图之外的保护字节
+（test_main.c 的 DST_GUARD）未被改写，并把错误元素的分布画成字符热力图写入日志。
+"""
+
+import numpy as np
+
+from test_case_layout import DST_TAIL, case_layout
+
+# 与 test_main.c 的 DST_GUARD 一致：执行前视图及其后 DST_TAIL 字节填为该值
+DST_GUARD = 0xA5
+# 日志中逐个列出的错误元素（保护字节）上限
+MAX_REPORT = 20
+# 热力图最多这么多行/列字符，矩阵更大时每格合并多个元素
+HEAT_MAP_ROWS = 32
+HEAT_MAP_COLS = 64
+# 按格内错误比例由低到高，空格表示该格全部正确
+HEAT_MAP_CHARS = " .:-=+*#%@"
+
+
+def read_dump(path):
+    """读取导出文件，返回每次导出的 uint8 数组（第 i 行即第 i 个用例）"""
+    with open(path) as f:
+        return [np.frombuffer(bytes.fromhex(line.strip()), dtype=np.uint8) for line in f if line.strip()]
+
+
+def compare_dump(case, dump):
+    """
+    比较一次导出与用例的预期输出，返回 (错误掩码 K x M, 实际输出 K x M, 被改写的保护字节偏移)。
+    导出比输出视图短时抛出 ValueError
+    """
+    K, M = case['K'], case['M']
+    layout = case_layout(case)
+    index = layout['dst_offset'] + np.arange(K)[:, None] * layout['dst_stride'] + np.arange(M)[None, :]
+    view_end = int(index[-1, -1]) + 1
+    if len(dump) < view_end:
+        raise ValueError(f"导出 {len(dump)} 字节，少于输出视图的 {view_end} 字节")
+    actual = dump[index].view(np.int8)
+    mismatch = actual != np.asarray(case['quantized'], dtype=np.int8).reshape(K, M)
+
+    guard_end = min(view_end + DST_TAIL, len(dump))
+    outside = np.ones(guard_end, dtype=bool)
+    outside[index.ravel()] = False
+    guard = np.flatnonzero(outside & (dump[:guard_end] != DST_GUARD))
+    return mismatch, actual, guard
+
+
+def heat_map(mismatch):
+    """错误掩码的字符热力图（行列表），每格为 rs x cs 个元素中错误元素的比例"""
+    K, M = mismatch.shape
+    rs, cs = -(-K // HEAT_MAP_ROWS), -(-M // HEAT_MAP_COLS)
+    rows, cols = -(-K // rs), -(-M // cs)
+
+    def cell_sum(values):
+        padded = np.zeros((rows * rs, cols * cs), dtype=np.int64)
+        padded[:K, :M] = values
+        return padded.reshape(rows, rs, cols, cs).sum(axis=(1, 3))
+
+    errors, total = cell_sum(mismatch), cell_sum(np.ones_like(mismatch))
+    top = len(HEAT_MAP_CHARS) - 1
+    levels = np.where(errors > 0, np.minimum(1 + errors * (top - 1) // total, top), 0)
+    width = len(str(K - 1))
+    lines = [f"每格 {rs} x {cs} 个元素，' ' 全部正确，'{HEAT_MAP_CHARS[1]}'~'{HEAT_MAP_CHARS[-1]}' 错误比例由低到高",
+             ' ' * width + ' +' + '-' * cols + '+']
+    for r in range(rows):
+        lines.append(f"{r * rs:>{width}} |" + ''.join(HEAT_MAP_CHARS[v] for v in levels[r]) + '|')
+    lines.append(' ' * width + ' +' + '-' * cols + '+')
+    return lines
+
+
+def report_dump(case_id, case, dump):
+    """比较一个用例并生成日志行，返回 ("pass"/"fail", 行列表)；错误行带 [FAIL]，与固件比较的格式一致"""
+    K, N, M = case['K'], case['N'], case['M']
+    mismatch, actual, guard = compare_dump(case, dump)
+    expected = np.asarray(case['quantized'], dtype=np.int8).reshape(K, M)
+    lines = []
+    for r, c in np.argwhere(mismatch)[:MAX_REPORT]:
+        lines.append(f"[FAIL] DST result verification @({r},{c}): "
+                     f"0x{int(actual[r, c]) & 0xFF:02X} != 0x{int(expected[r, c]) & 0xFF:02X}")
+    for offset in guard[:MAX_REPORT]:
+        lines.append(f"[FAIL] DST guard byte overwritten @dst_data+{offset}: 0x{dump[offset]:02X}")
+    errors = int(mismatch.sum())
+    if not errors and not len(guard):
+        return "pass", lines + [f"[HOST {case_id}] PASS K={K} N={N} M={M}"]
+    lines.append(f"[HOST {case_id}] FAIL K={K} N={N} M={M} mismatches={errors}/{K * M} guard={len(guard)}")
+    if errors:
+        lines += heat_map(mismatch)
+    return "fail", lines
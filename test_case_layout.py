@@ -0,0 +1,99 @@
+"""
+跨步/非对齐布局 - generate_test_case*.py --strided 与 bench_mma.py --strided 使用
+
+把操作数放进更大的带填充缓冲区，与 TFLM 中作为子视图的张量相同：lhs 每行、rhs 每列（权重列优先存放）
+之间留随机字节的填充，视图起点相对 4 字节对齐带随机偏移（S16 lhs 保持 2 字节对齐），dst 同样写入
+带填充与偏移的视图。步长与偏移均以字节计，作为标量字段存入用例（随存档保存），预期输出仍按稠密的
+K x M 计算；固件按 dst_row_stride 比较输出，并检查视图之外的字节没有被改写。
+填充字节为固定的非零图案，加速器若读到填充会算错，结果与 --from-archive 重放一致。
+"""
+
+import random
+
+import numpy as np
+
+# 每行（列）额外填充的最大字节数
+MAX_PAD = 16
+# 视图起点相对 4 字节对齐的最大偏移
+MAX_OFFSET = 3
+
+# dst 缓冲区在视图之后多留的字节，与 test_main.c 的 DST_GUARD_TAIL 一致，固件据此检查写回越界
+DST_TAIL = 4
+# 带偏移的缓冲区按 4 字节对齐声明，偏移才是相对字对齐的实际偏移
+ALIGNED_ATTR = ' __attribute__((aligned(4)))'
+
+LAYOUT_KEYS = ('lhs_stride', 'lhs_offset', 'rhs_stride', 'rhs_offset', 'dst_stride', 'dst_offset')
+
+
+def lhs_bytes(case):
+    """lhs 元素字节数：只有 complex 用例带 lhs_dtype（2 = S16）"""
+    return 2 if case.get('lhs_dtype') == 2 else 1
+
+
+def dense_layout(case):
+    """连续存放、起点对齐的布局（生成器的默认布局）"""
+    N, M = case['N'], case['M']
+    return {'lhs_stride': N * lhs_bytes(case), 'lhs_offset': 0,
+            'rhs_stride': N, 'rhs_offset': 0,
+            'dst_stride': M, 'dst_offset': 0}
+
+
+def random_layout(case):
+    """随机行填充与起点偏移；S16 lhs 的步长与偏移取 2 的倍数"""
+    N, M = case['N'], case['M']
+    eb = lhs_bytes(case)
+    return {'lhs_stride': (N + random.randint(0, MAX_PAD // eb)) * eb,
+            'lhs_offset': random.randint(0, MAX_OFFSET // eb) * eb,
+            'rhs_stride': N + random.randint(0, MAX_PAD),
+            'rhs_offset': random.randint(0, MAX_OFFSET),
+            'dst_stride': M + random.randint(0, MAX_PAD),
+            'dst_offset': random.randint(0, MAX_OFFSET)}
+
+
+def is_strided(case):
+    return 'lhs_stride' in case
+
+
+def case_layout(case):
+    """用例的布局：--strided 生成的用例带 LAYOUT_KEYS，否则为稠密布局"""
+    if is_strided(case):
+        return {key: case[key] for key in LAYOUT_KEYS}
+    return dense_layout(case)
+
+
+def view_bytes(rows, row_bytes, stride, offset):
+    """带偏移与步长的视图在缓冲区中占用的字节数"""
+    return offset + (rows - 1) * stride + row_bytes
+
+
+def pad_pattern(size):
+    """填充图案：非零且逐字节变化，不依赖随机数状态"""
+    return ((np.arange(size, dtype=np.int64) * 37 + 0x5A) & 0xFF).astype(np.uint8)
+
+
+def padded_buffer(array, stride, offset, order='C'):
+    """
+    把二维数组按小端字节放入带填充的缓冲区，返回 uint8 数组。
+    order='C' 时逐行放置（lhs），order='F' 时逐列放置（rhs 列优先）
+    """
+    rows = np.asarray(array)
+    if order == 'F':
+        rows = rows.T
+    raw = np.ascontiguousarray(rows.astype(rows.dtype.newbyteorder('<'))).view(np.uint8)
+    raw = raw.reshape(rows.shape[0], -1)
+    count, row_bytes = raw.shape
+    buf = pad_pattern(view_bytes(count, row_bytes, stride, offset))
+    for r in range(count):
+        start = offset + r * stride
+        buf[start:start + row_bytes] = raw[r]
+    return buf
+
+
+def buffer_sizes(case):
+    """各缓冲区的字节数（lhs / rhs / dst）；稠密布局即 K x N、N x M、K x M 个元素"""
+    K, N, M = case['K'], case['N'], case['M']
+    layout = case_layout(case)
+    tail = DST_TAIL if is_strided(case) else 0
+    return {'lhs': view_bytes(K, N * lhs_bytes(case), layout['lhs_stride'], layout['lhs_offset']),
+            'rhs': view_bytes(M, N, layout['rhs_stride'], layout['rhs_offset']),
+            'dst': view_bytes(K, M, layout['dst_stride'], layout['dst_offset']) + tail}
@@ -0,0 +1,113 @@
+"""
+测试用例数据补丁 - 配合 deps/tools/split_memory.py --patch 使用
+
+生成器以 --reserve 模式编译出一次固件后（测试数据位于 .test_case_data 保留段，
+按最大尺寸预留空间），后续用例只需生成补丁文件，由 split_memory.py 按 ELF 中的
+符号地址直接改写内存镜像，无需再调用 RISC-V 工具链。
+
+补丁文件为 JSON，每个条目为以下两种之一：
+  {"symbol": 符号名, "offset": 字节偏移, "data": 十六进制字节串}
+  {"symbol": 符号名, "offset": 字节偏移, "addr_of": 另一符号名}   # 写入 32 位地址
+"""
+
+import json
+import struct
+
+import numpy as np
+
+from test_case_layout import lhs_bytes
+
+PATCH_FORMAT = "e203-test-case-patch"
+PATCH_VERSION = 1
+
+# 保留段名称，需与链接脚本中的 .test_case_data 一致
+TEST_CASE_SECTION = ".test_case_data"
+
+# dsa_matmul_config_t 字段布局（RV32 下全部为 4 字节，顺序与 dsa_accel.h 一致）
+DSA_CONFIG_FIELDS = [
+    'lhs_ptr', 'rhs_ptr', 'dst_ptr', 'bias_ptr',
+    'K', 'N', 'M',
+    'lhs_row_stride', 'rhs_row_stride', 'dst_row_stride',
+    'lhs_dtype', 'rhs_dtype', 'bias_dtype', 'out_dtype',
+    'quant_mode', 'lhs_offset', 'rhs_offset', 'dst_offset',
+    'dst_mult', 'dst_shift',
+    'dst_mult_ptr', 'dst_shift_ptr',
+    'act_min', 'act_max',
+]
+
+# 与 dsa_dtype_t 枚举一致
+DSA_DTYPE_S8 = 1
+DSA_DTYPE_S16 = 2
+DSA_DTYPE_S32 = 3
+
+
+def array_entry(symbol, array, dtype=None, order='C'):
+    """把 numpy 数组按小端字节序展开为补丁条目"""
+    arr = np.asarray(array)
+    if dtype is not None:
+        arr = arr.astype(dtype)
+    arr = arr.astype(arr.dtype.newbyteorder('<'))
+    return {'symbol': symbol, 'offset': 0, 'data': arr.tobytes(order=order).hex()}
+
+
+def config_entries(symbol, fields):
+    """
+    生成 dsa_matmul_config_t 的补丁条目。
+    fields: 字段名 -> int，指针字段可为符号名（由 split_memory.py 解析地址）或 None。
+    """
+    entries = []
+    data = bytearray()
+    for idx, name in enumerate(DSA_CONFIG_FIELDS):
+        value = fields[name]
+        if isinstance(value, str):
+            entries.append({'symbol': symbol, 'offset': idx * 4, 'addr_of': value})
+            value = 0
+        elif value is None:
+            value = 0
+        data += struct.pack('<I', int(value) & 0xFFFFFFFF)
+    entries.insert(0, {'symbol': symbol, 'offset': 0, 'data': data.hex()})
+    return entries
+
+
+def write_patch_file(path, entries):
+    with open(path, 'w') as f:
+        json.dump({'format': PATCH_FORMAT, 'version': PATCH_VERSION, 'entries': entries}, f)
+
+
+def operand_arrays(case):
+    """
+    各操作数数组 (符号名, 数组, 小端类型, 展平顺序)，供 --patch-out 与 --bin 使用；
+    S16 lhs 与 per-channel mult/shift 只出现在 complex 用例中
+    """
+    arrays = [
+        ('lhs_data', case['lhs'], '<i2' if lhs_bytes(case) == 2 else '<i1', 'C'),
+        ('rhs_data', case['rhs'], '<i1', 'F'),  # 列优先
+        ('bias_data', case['bias'], '<i4', 'C'),
+        ('expected_dst_data', case['quantized'], '<i1', 'C'),
+    ]
+    if case.get('quant_mode') == 1:
+        arrays.append(('dst_mult_data', case['dst_mults'], '<i4', 'C'))
+        arrays.append(('dst_shift_data', case['dst_shifts'], '<i4', 'C'))
+    return arrays
+
+
+def write_patch(case, patch_path):
+    """生成数据补丁：只改写 .test_case_data 段，固件无需重新编译"""
+    K, N, M = case['K'], case['N'], case['M']
+    per_channel = case.get('quant_mode') == 1
+    entries = [array_entry(symbol, array, dtype, order=order)
+               for symbol, array, dtype, order in operand_arrays(case)]
+    entries += config_entries('test_config', {
+        'lhs_ptr': 'lhs_data', 'rhs_ptr': 'rhs_data', 'dst_ptr': 'dst_data', 'bias_ptr': 'bias_data',
+        'K': K, 'N': N, 'M': M,
+        'lhs_row_stride': N * lhs_bytes(case),
+        'rhs_row_stride': N, 'dst_row_stride': M,
+        'lhs_dtype': DSA_DTYPE_S16 if lhs_bytes(case) == 2 else DSA_DTYPE_S8, 'rhs_dtype': DSA_DTYPE_S8,
+        'bias_dtype': DSA_DTYPE_S32, 'out_dtype': DSA_DTYPE_S8,
+        'quant_mode': int(per_channel), 'lhs_offset': 0, 'rhs_offset': 0, 'dst_offset': 0,
+        'dst_mult': case['dst_mult'], 'dst_shift': case['dst_shift'],
+        'dst_mult_ptr': 'dst_mult_data' if per_channel else None,
+        'dst_shift_ptr': 'dst_shift_data' if per_channel else None,
+        'act_min': -128, 'act_max': 127,
+    })
+    write_patch_file(patch_path, entries)
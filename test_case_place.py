@@ -0,0 +1,106 @@
+"""
+操作数放置 - generate_test_case*.py --place 与 bench_mma.py --placements 使用
+
+把 lhs / rhs / bias（含 per-channel mult/shift）/ dst 分别固定到某个存储区域，对应链接脚本
+gcc_hbirdv2_ilm.ld 中的输出段：
+  ilm     .dsa_ilm     0x80000000，与指令共用 ITCM
+  ram     .dsa_ram     0x90000000，DTCM，随 .data 由启动代码从 ILM 拷贝
+  extram  .dsa_extram  0x00080000，外部 RAM
+只用于单用例，未指定的操作数保持生成器原来的位置（.data/.bss）；--batch / --chain 的数据按 extram 的
+BATCH_DATA_BUDGET 预算，生成器拒绝与 --place 同时使用。
+放置方式写成 "lhs=ilm,rhs=extram,bias=ram,dst=ram"，随存档的 meta 保存，--from-archive 时沿用。
+footprint() / overflow_regions() 按各区域的长度（链接脚本 MEMORY 块）检查一组用例能否放下。
+"""
+
+import itertools
+
+from test_case_layout import buffer_sizes
+
+PLACE_SECTIONS = {'ilm': '.dsa_ilm', 'ram': '.dsa_ram', 'extram': '.dsa_extram'}
+PLACE_OPERANDS = ('lhs', 'rhs', 'bias', 'dst')
+# 各区域中不能给测试数据用的字节：ILM 放固件代码与只读数据，RAM 顶部为 16K 栈（__stack_size）
+# 与固件自身的 .data，extram 放 .rodata_extram 与固件自身的 .bss
+REGION_RESERVE = {'ilm': 64 * 1024, 'ram': 20 * 1024, 'extram': 16 * 1024}
+
+
+def parse_placement(text):
+    """"lhs=ilm,dst=ram" -> {'lhs': 'ilm', 'dst': 'ram'}，格式错误时抛出 ValueError"""
+    placement = {}
+    for item in text.split(','):
+        operand, _, region = item.strip().partition('=')
+        if operand not in PLACE_OPERANDS or region not in PLACE_SECTIONS:
+            raise ValueError(f"放置方式应为 <{'|'.join(PLACE_OPERANDS)}>=<{'|'.join(PLACE_SECTIONS)}>，"
+                             f"以逗号分隔: {text}")
+        placement[operand] = region
+    return placement
+
+
+def format_placement(placement):
+    """按 PLACE_OPERANDS 的顺序写回 "lhs=ilm,rhs=..." 形式"""
+    return ','.join(f"{op}={placement[op]}" for op in PLACE_OPERANDS if op in placement)
+
+
+def all_placements():
+    """四个操作数在三个区域上的全部组合（81 种）"""
+    regions = sorted(PLACE_SECTIONS)
+    return [dict(zip(PLACE_OPERANDS, combo)) for combo in itertools.product(regions, repeat=len(PLACE_OPERANDS))]
+
+
+def place_attr(placement, operand, default=''):
+    """operand 的数组声明属性：指定了区域时放入对应段（4 字节对齐），否则为 default"""
+    region = (placement or {}).get(operand)
+    if region is None:
+        return default
+    return ' __attribute__((section("%s"), aligned(4)))' % PLACE_SECTIONS[region]
+
+
+def operand_bytes(case, expected=True):
+    """
+    用例各数组的字节数（按 4 字节对齐）：bias 含 complex 用例的 per-channel mult/shift，
+    expected 为 False 时不含预期输出（--dump-dst）
+    """
+    sizes = buffer_sizes(case)
+    M = case['M']
+    result = {'lhs': sizes['lhs'], 'rhs': sizes['rhs'], 'bias': (12 if 'dst_mults' in case else 4) * M,
+              'dst': sizes['dst']}
+    if expected:
+        result['expected'] = case['K'] * M
+    return {name: (size + 3) & ~3 for name, size in result.items()}
+
+
+def footprint(cases, data_region, placement=None, expected=True, shared_dst=True):
+    """
+    cases 在各区域占用的字节数。未指定放置的初始化数组在 data_region：单用例为 'ram'（.data），
+    --batch / --chain 为 'extram'（.test_case_data）；未指定放置的 dst 在 .bss（extram），
+    shared_dst 为 True 时各用例共用一个（取最大），否则每个用例一个（--chain）。
+    放在 ram 的数组由启动代码从 ILM 拷贝，初值同时占用 ILM 的加载空间
+    """
+    usage = dict.fromkeys(PLACE_SECTIONS, 0)
+
+    def add(operand, size, default):
+        region = (placement or {}).get(operand, default)
+        usage[region] += size
+        if region == 'ram':
+            usage['ilm'] += size
+
+    dst_sizes = []
+    for case in cases:
+        sizes = operand_bytes(case, expected)
+        dst_sizes.append(sizes.pop('dst'))
+        for operand, size in sizes.items():
+            add(operand, size, data_region)
+    add('dst', max(dst_sizes) if shared_dst else sum(dst_sizes), 'extram')
+    return usage
+
+
+def overflow_regions(usage, lengths):
+    """
+    usage 中超出可用空间（区域长度减 REGION_RESERVE）的区域，返回 ["ram 需要 x 字节，可用 y 字节", ...]；
+    lengths 为区域名 -> 长度（链接脚本 MEMORY 块的 LENGTH）
+    """
+    errors = []
+    for region, used in usage.items():
+        available = lengths[region] - REGION_RESERVE[region]
+        if used > available:
+            errors.append(f"{region} 需要 {used} 字节，可用 {available} 字节")
+    return errors